@@ -0,0 +1,115 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.24;
+
+import { RoflAggregatorV3Interface } from "./RoflAggregatorV3Interface.sol";
+import { Subcall } from "@oasisprotocol/sapphire-contracts/contracts/Subcall.sol";
+
+// Aggregator storing each round in a single storage slot.
+//
+// Readers see the same RoflAggregatorV3Interface as of SimpleAggregator.
+// Answers must fit into int128 and timestamps into uint64, which covers
+// prices with the oracle's 10 decimals and second-resolution timestamps.
+// The round ID isn't stored, since it is the key of the round.
+contract PackedAggregator is RoflAggregatorV3Interface {
+    // Version reported by version(), which tells the oracle to submit
+    // rounds with submitPackedObservation.
+    uint256 public constant VERSION = 2;
+
+    error ValueOutOfRange();
+
+    // Configuration.
+    string public description;
+
+    // Packed into a single slot, which is also read by onlyTEE on every
+    // submission.
+    uint80 public latestRoundId;
+    uint8 public decimals;
+    bytes21 private roflAppId;
+
+    // Observations.
+    struct Round {
+        int128 answer;     // Price for the pair in predefined decimals.
+        uint64 startedAt;  // The timestamp when the round started.
+        uint64 updatedAt;  // The timestamp when the answer was computed.
+    }
+
+    mapping(uint80 => Round) private rounds;
+
+    // Checks whether the transaction was signed by the ROFL's app key inside
+    // TEE.
+    modifier onlyTEE() {
+        Subcall.roflEnsureAuthorizedOrigin(roflAppId);
+        _;
+    }
+
+    constructor(bytes21 _roflAppID) {
+        roflAppId = _roflAppID;
+    }
+
+    // Returns the App ID of ROFL.
+    function getRoflAppId() external view returns (bytes21) {
+        return roflAppId;
+    }
+
+    function version() external pure override returns (uint256) {
+        return VERSION;
+    }
+
+    // Submits a round in compact calldata, a single word packing from the
+    // most significant bits:
+    //   - roundId (32 bits),
+    //   - updatedAt - startedAt (32 bits),
+    //   - updatedAt (64 bits),
+    //   - answer as two's complement int128 (128 bits).
+    function submitPackedObservation(uint256 _packed) external onlyTEE {
+        uint64 updatedAt = uint64(_packed >> 128);
+        _store(uint80(_packed >> 224), Round({
+            answer: int128(uint128(_packed)),
+            startedAt: updatedAt - uint64(uint32(_packed >> 192)),
+            updatedAt: updatedAt
+        }));
+    }
+
+    // Submits a round like SimpleAggregator, e.g. through
+    // PriceFeedDirectory.submitObservations.
+    function submitObservation(uint80 _roundId, int256 _answer, uint256 _startedAt, uint256 _updatedAt) external onlyTEE {
+        if (_answer < type(int128).min || _answer > type(int128).max || _startedAt > type(uint64).max || _updatedAt > type(uint64).max) {
+            revert ValueOutOfRange();
+        }
+        _store(_roundId, Round({
+            answer: int128(_answer),
+            startedAt: uint64(_startedAt),
+            updatedAt: uint64(_updatedAt)
+        }));
+    }
+
+    function _store(uint80 _roundId, Round memory _round) private {
+        rounds[_roundId] = _round;
+
+        if (_roundId > latestRoundId) {
+            latestRoundId = _roundId;
+        }
+    }
+
+    function setDescription(string memory _description) external onlyTEE {
+        description = _description;
+    }
+
+    function setDecimals(uint8 _decimals) external onlyTEE {
+        decimals = _decimals;
+    }
+
+    function setRoflAppID(bytes21 _roflAppID) external onlyTEE {
+        roflAppId = _roflAppID;
+    }
+
+    function getRoundData(uint80 _roundId) external view override returns (uint80 roundId, int256 ans, uint256 startedAt, uint256 updatedAt, uint80 answeredInRound) {
+        Round memory round = rounds[_roundId];
+        return (_roundId, round.answer, round.startedAt, round.updatedAt, _roundId);
+    }
+
+    function latestRoundData() external view override returns (uint80 roundId, int256 ans, uint256 startedAt, uint256 updatedAt, uint80 answeredInRound) {
+        Round memory round = rounds[latestRoundId];
+        return (latestRoundId, round.answer, round.startedAt, round.updatedAt, latestRoundId);
+    }
+}
@@ -4,6 +4,7 @@ pragma solidity 0.8.24;
 import "forge-std/console.sol";
 import { Subcall } from "@oasisprotocol/sapphire-contracts/contracts/Subcall.sol";
 
+import { PackedAggregator } from "./PackedAggregator.sol";
 import { RoflAggregatorV3Interface } from "./RoflAggregatorV3Interface.sol";
 import { SimpleAggregator } from "./SimpleAggregator.sol";
 
@@ -19,6 +20,15 @@ contract PriceFeedDirectory {
 
     event FeedAdded(address indexed aggregator, string appProviderChainPair);
 
+    // Observation of a single aggregator feed submitted in a batch.
+    struct FeedObservation {
+        SimpleAggregator feed;
+        uint80 roundId;
+        int256 answer;
+        uint256 startedAt;
+        uint256 updatedAt;
+    }
+
     // Maps the hashed and lowercase hex-encoded app ID (without leading 0x), price provider hostname, (optional) chain and trading pair (or contract address without leading 0x) separated by / to the data feed.
     // Key examples:
     // - keccak256("005a216eb7f450bcc1f534a7575fb33d611b463fa2/bitstamp.net/btc_usd")
@@ -46,6 +56,17 @@ contract PriceFeedDirectory {
     // @param agg (optional) App-specific price aggregator smart contract. If zero, a new SimpleAggregator instance will be created.
     // @param discoverable Add the price aggregator contract to a public list of discoverable price aggregators.
     function addFeed(string calldata providerChainPair, RoflAggregatorV3Interface agg, bool discoverable) external {
+        _addFeed(providerChainPair, agg, discoverable, false);
+    }
+
+    // Adds a new PackedAggregator feed, storing each round in a single slot.
+    // @param providerChainPair See addFeed.
+    // @param discoverable See addFeed.
+    function addPackedFeed(string calldata providerChainPair, bool discoverable) external {
+        _addFeed(providerChainPair, RoflAggregatorV3Interface(address(0)), discoverable, true);
+    }
+
+    function _addFeed(string calldata providerChainPair, RoflAggregatorV3Interface agg, bool discoverable, bool packed) private {
         bytes21 roflAppId = Subcall.getRoflAppId();
 
         if (address(agg) != address(0) && roflAppId != agg.getRoflAppId()) {
@@ -69,7 +90,7 @@ contract PriceFeedDirectory {
 
         // Deploy new contract, if instance not provided.
         if (address(agg)==address(0)) {
-            agg = new SimpleAggregator(roflAppId);
+            agg = packed ? RoflAggregatorV3Interface(new PackedAggregator(roflAppId)) : RoflAggregatorV3Interface(new SimpleAggregator(roflAppId));
         }
 
         feeds[key] = agg;
@@ -81,4 +102,15 @@ contract PriceFeedDirectory {
 
         emit FeedAdded(address(agg), appProviderChainPair);
     }
+
+    // Submits observations to many aggregator feeds in a single transaction.
+    // Each aggregator checks on its own that the transaction was signed by
+    // its ROFL app inside TEE, so a feed of another app reverts the batch.
+    // @param observations Rounds to submit, at most one per feed.
+    function submitObservations(FeedObservation[] calldata observations) external {
+        for (uint256 i = 0; i < observations.length; ++i) {
+            FeedObservation calldata o = observations[i];
+            o.feed.submitObservation(o.roundId, o.answer, o.startedAt, o.updatedAt);
+        }
+    }
 }
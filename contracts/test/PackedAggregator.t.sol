@@ -0,0 +1,145 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+import "../src/PriceFeedDirectory.sol";
+import {Test, console} from "forge-std/Test.sol";
+import {SapphireTest} from "@oasisprotocol-sapphire-foundry-0.1.2/BaseSapphireTest.sol";
+
+contract PackedAggregatorTest is SapphireTest {
+    SimpleAggregator public simpleAggr;
+    PackedAggregator public packedAggr;
+
+    int256 constant ANSWER = 60000 * 1e10; // $60,000 with 10 decimals.
+
+    function setUp() public override {
+        super.setUp();
+        vm.warp(1_700_000_000);
+        simpleAggr = new SimpleAggregator(bytes21(0));
+        packedAggr = new PackedAggregator(bytes21(0));
+    }
+
+    // Mirrors pack_round of the oracle.
+    function _pack(uint80 roundId, int256 answer, uint256 startedAt, uint256 updatedAt) internal pure returns (uint256) {
+        return uint256(roundId) << 224 | (updatedAt - startedAt) << 192 | updatedAt << 128 | uint256(uint128(int128(answer)));
+    }
+
+    function _assertRound(uint80 queried, uint80 roundId, int256 answer, uint256 startedAt, uint256 updatedAt) internal view {
+        (uint80 storedRoundId, int256 storedAns, uint256 storedStarted, uint256 storedUpdated, uint80 storedInRound) = packedAggr.latestRoundData();
+        if (queried != 0) {
+            (storedRoundId, storedAns, storedStarted, storedUpdated, storedInRound) = packedAggr.getRoundData(queried);
+        }
+        assertEq(storedRoundId, roundId, "roundId mismatch");
+        assertEq(storedAns, answer, "answer mismatch");
+        assertEq(storedStarted, startedAt, "started timestamp mismatch");
+        assertEq(storedUpdated, updatedAt, "updated timestamp mismatch");
+        assertEq(storedInRound, roundId, "answeredInRound mismatch");
+    }
+
+    function test_submitPackedObservation() public {
+        packedAggr.submitPackedObservation(_pack(100, ANSWER, block.timestamp - 60, block.timestamp));
+        _assertRound(0, 100, ANSWER, block.timestamp - 60, block.timestamp);
+        _assertRound(100, 100, ANSWER, block.timestamp - 60, block.timestamp);
+
+        // Negative answers survive the two's complement packing.
+        packedAggr.submitPackedObservation(_pack(101, -ANSWER, block.timestamp, block.timestamp + 1));
+        _assertRound(0, 101, -ANSWER, block.timestamp, block.timestamp + 1);
+
+        // An older round doesn't replace the latest one.
+        packedAggr.submitPackedObservation(_pack(99, 1, 1, 2));
+        _assertRound(0, 101, -ANSWER, block.timestamp, block.timestamp + 1);
+        _assertRound(99, 99, 1, 1, 2);
+        assertEq(packedAggr.version(), packedAggr.VERSION(), "version mismatch");
+    }
+
+    function test_submitObservation() public {
+        packedAggr.submitObservation(7, ANSWER, block.timestamp - 1, block.timestamp);
+        _assertRound(0, 7, ANSWER, block.timestamp - 1, block.timestamp);
+
+        vm.expectRevert(PackedAggregator.ValueOutOfRange.selector);
+        packedAggr.submitObservation(8, int256(type(int128).max) + 1, 0, 0);
+        vm.expectRevert(PackedAggregator.ValueOutOfRange.selector);
+        packedAggr.submitObservation(8, ANSWER, 0, uint256(type(uint64).max) + 1);
+    }
+
+    function test_addPackedFeed() public {
+        PriceFeedDirectory priceFeed = new PriceFeedDirectory();
+        priceFeed.addPackedFeed("bitstamp.net/btc/usd", false);
+        bytes32 hash = keccak256("000000000000000000000000000000000000000000/bitstamp.net/btc/usd");
+        RoflAggregatorV3Interface feed = priceFeed.feeds(hash);
+        assertEq(feed.version(), 2, "not a packed feed");
+
+        // Batched submissions go through the compatible submitObservation.
+        PriceFeedDirectory.FeedObservation[] memory obs = new PriceFeedDirectory.FeedObservation[](1);
+        obs[0] = PriceFeedDirectory.FeedObservation(SimpleAggregator(address(feed)), 3, ANSWER, block.timestamp - 1, block.timestamp);
+        priceFeed.submitObservations(obs);
+        (uint80 roundId, int256 ans, , , ) = feed.latestRoundData();
+        assertEq(roundId, 3, "roundId mismatch");
+        assertEq(ans, ANSWER, "answer mismatch");
+    }
+
+    // Gas of the first and a following round of a new feed with each
+    // variant, including the intrinsic transaction and calldata cost. The
+    // test_gas_* tests do the same work, so that `forge snapshot
+    // --match-contract PackedAggregatorTest` compares them in .gas-snapshot.
+    function _submitSimple(SimpleAggregator aggr, uint80 roundId) internal returns (uint256) {
+        bytes memory data = abi.encodeCall(SimpleAggregator.submitObservation, (roundId, ANSWER, block.timestamp - 60, block.timestamp));
+        uint256 gasBefore = gasleft();
+        aggr.submitObservation(roundId, ANSWER, block.timestamp - 60, block.timestamp);
+        return gasBefore - gasleft() + 21000 + _calldataGas(data);
+    }
+
+    function _submitPacked(PackedAggregator aggr, uint80 roundId) internal returns (uint256) {
+        bytes memory data = abi.encodeCall(PackedAggregator.submitObservation, (roundId, ANSWER, block.timestamp - 60, block.timestamp));
+        uint256 gasBefore = gasleft();
+        aggr.submitObservation(roundId, ANSWER, block.timestamp - 60, block.timestamp);
+        return gasBefore - gasleft() + 21000 + _calldataGas(data);
+    }
+
+    function _submitPackedCalldata(PackedAggregator aggr, uint80 roundId) internal returns (uint256) {
+        uint256 packed = _pack(roundId, ANSWER, block.timestamp - 60, block.timestamp);
+        bytes memory data = abi.encodeCall(PackedAggregator.submitPackedObservation, (packed));
+        uint256 gasBefore = gasleft();
+        aggr.submitPackedObservation(packed);
+        return gasBefore - gasleft() + 21000 + _calldataGas(data);
+    }
+
+    function test_gas_simple() public {
+        _submitSimple(simpleAggr, 1);
+        _submitSimple(simpleAggr, 2);
+    }
+
+    function test_gas_packed() public {
+        _submitPacked(packedAggr, 1);
+        _submitPacked(packedAggr, 2);
+    }
+
+    function test_gas_packedCalldata() public {
+        _submitPackedCalldata(packedAggr, 1);
+        _submitPackedCalldata(packedAggr, 2);
+    }
+
+    function test_gas_compare() public {
+        PackedAggregator compactAggr = new PackedAggregator(bytes21(0));
+        uint256 simpleFirst = _submitSimple(simpleAggr, 1);
+        uint256 simpleNext = _submitSimple(simpleAggr, 2);
+        uint256 packedFirst = _submitPacked(packedAggr, 1);
+        uint256 packedNext = _submitPacked(packedAggr, 2);
+        uint256 compactFirst = _submitPackedCalldata(compactAggr, 1);
+        uint256 compactNext = _submitPackedCalldata(compactAggr, 2);
+
+        console.log("gas of the first round, simple:", simpleFirst);
+        console.log("gas of the first round, packed:", packedFirst);
+        console.log("gas of the first round, packed calldata:", compactFirst);
+        console.log("gas of a following round, simple:", simpleNext);
+        console.log("gas of a following round, packed:", packedNext);
+        console.log("gas of a following round, packed calldata:", compactNext);
+        assertLt(packedNext, simpleNext, "packed storage not cheaper");
+        assertLt(compactNext, packedNext, "packed calldata not cheaper");
+    }
+
+    function _calldataGas(bytes memory data) internal pure returns (uint256 gas) {
+        for (uint256 i = 0; i < data.length; ++i) {
+            gas += data[i] == 0 ? 4 : 16;
+        }
+    }
+}
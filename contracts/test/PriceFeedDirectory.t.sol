@@ -84,4 +84,64 @@ contract PriceFeedDirectoryTest is SapphireTest {
         assertEq(storedStarted, started, "started timestamp mismatch");
         assertEq(storedUpdated, updated, "updated timestamp mismatch");
     }
+
+    function test_submitObservations() public {
+        SimpleAggregator simpleAggr2 = new SimpleAggregator(bytes21(0));
+        PriceFeedDirectory.FeedObservation[] memory obs = new PriceFeedDirectory.FeedObservation[](2);
+        obs[0] = PriceFeedDirectory.FeedObservation(simpleAggr, 100, 50000 * 1e8, block.timestamp-1, block.timestamp);
+        obs[1] = PriceFeedDirectory.FeedObservation(simpleAggr2, 7, 3000 * 1e8, block.timestamp-2, block.timestamp-1);
+
+        priceFeed.submitObservations(obs);
+
+        (uint80 storedRoundId, int256 storedAns, uint256 storedStarted, uint256 storedUpdated, ) = simpleAggr.latestRoundData();
+        assertEq(storedRoundId, 100, "roundId mismatch");
+        assertEq(storedAns, 50000 * 1e8, "answer mismatch");
+        assertEq(storedStarted, block.timestamp-1, "started timestamp mismatch");
+        assertEq(storedUpdated, block.timestamp, "updated timestamp mismatch");
+
+        (storedRoundId, storedAns, storedStarted, storedUpdated, ) = simpleAggr2.latestRoundData();
+        assertEq(storedRoundId, 7, "roundId mismatch");
+        assertEq(storedAns, 3000 * 1e8, "answer mismatch");
+        assertEq(storedStarted, block.timestamp-2, "started timestamp mismatch");
+        assertEq(storedUpdated, block.timestamp-1, "updated timestamp mismatch");
+    }
+
+    // Compares the total gas of submitting observations for many feeds in
+    // separate transactions and in a single batch, including the intrinsic
+    // transaction and calldata cost.
+    function test_submitObservations_gas() public {
+        uint256 numFeeds = 30;
+        PriceFeedDirectory.FeedObservation[] memory obs = new PriceFeedDirectory.FeedObservation[](numFeeds);
+        for (uint256 i = 0; i < numFeeds; ++i) {
+            obs[i] = PriceFeedDirectory.FeedObservation(new SimpleAggregator(bytes21(0)), 1, int256(1000 + i) * 1e10, block.timestamp-1, block.timestamp);
+        }
+        // Initialize latestRoundId of all feeds, so both variants below update existing slots.
+        priceFeed.submitObservations(obs);
+
+        uint256 individualGas = 0;
+        for (uint256 i = 0; i < numFeeds; ++i) {
+            bytes memory data = abi.encodeCall(SimpleAggregator.submitObservation, (2, obs[i].answer, obs[i].startedAt, obs[i].updatedAt));
+            uint256 gasBefore = gasleft();
+            obs[i].feed.submitObservation(2, obs[i].answer, obs[i].startedAt, obs[i].updatedAt);
+            individualGas += gasBefore - gasleft() + 21000 + _calldataGas(data);
+        }
+
+        for (uint256 i = 0; i < numFeeds; ++i) {
+            obs[i].roundId = 3;
+        }
+        bytes memory batchData = abi.encodeCall(PriceFeedDirectory.submitObservations, (obs));
+        uint256 batchGasBefore = gasleft();
+        priceFeed.submitObservations(obs);
+        uint256 batchGas = batchGasBefore - gasleft() + 21000 + _calldataGas(batchData);
+
+        console.log("gas per feed, individual txs:", individualGas / numFeeds);
+        console.log("gas per feed, batched tx:", batchGas / numFeeds);
+        assertLt(batchGas, individualGas, "batch not cheaper");
+    }
+
+    function _calldataGas(bytes memory data) internal pure returns (uint256 gas) {
+        for (uint256 i = 0; i < data.length; ++i) {
+            gas += data[i] == 0 ? 4 : 16;
+        }
+    }
 }
@@ -0,0 +1,47 @@
+import json
+import resource
+import sys
+import tempfile
+import time
+
+
+def main():
+    """
+    Imports and constructs PriceOracle in this fresh interpreter and prints
+    the seconds each took and the peak RSS as JSON.
+
+    Run as `python -m bench.ColdStart <pairs>` by Harness.measure_cold_start.
+    """
+    pairs = int(sys.argv[1])
+    modules = len(sys.modules)
+    start = time.perf_counter()
+    from src.PriceOracle import PriceOracle
+    imported = time.perf_counter()
+
+    from .Contracts import DIRECTORY_ADDRESS, seed_state_dir
+    exchanges = ("binance.com", "binance.us", "kraken.com", "coinbase.com", "bitstamp.net")
+    with tempfile.TemporaryDirectory() as state_dir:
+        seed_state_dir(state_dir)
+        start_construct = time.perf_counter()
+        PriceOracle(
+            None,
+            DIRECTORY_ADDRESS,
+            "sapphire-localnet",
+            ",".join(f"{exchanges[i % len(exchanges)]}/t{i}/usd" for i in range(pairs)),
+            "",
+            10,
+            60,
+            state_dir=state_dir,
+        )
+        constructed = time.perf_counter()
+
+    print(json.dumps({
+        "import_seconds": imported - start,
+        "construct_seconds": constructed - start_construct,
+        "modules": len(sys.modules) - modules,
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }))
+
+
+if __name__ == '__main__':
+    main()
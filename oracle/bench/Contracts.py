@@ -0,0 +1,68 @@
+import json
+import os
+
+from src.StateCache import StateCache
+
+DIRECTORY_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+
+
+def _function(name: str, inputs: list[str], outputs: list[str], mutability: str = "view") -> dict:
+    return {
+        "type": "function",
+        "name": name,
+        "inputs": [{"name": f"arg{i}", "type": t} for i, t in enumerate(inputs)],
+        "outputs": [{"name": f"out{i}", "type": t} for i, t in enumerate(outputs)],
+        "stateMutability": mutability,
+    }
+
+
+# ABI fragments used when the contracts haven't been built with forge.
+CONTRACT_ABIS = {
+    "SimpleAggregator": [
+        _function("decimals", [], ["uint8"]),
+        _function("description", [], ["string"]),
+        _function("latestRoundData", [], ["uint80", "int256", "uint256", "uint256", "uint80"]),
+        _function("setDecimals", ["uint8"], [], "nonpayable"),
+        _function("setDescription", ["string"], [], "nonpayable"),
+        _function("submitObservation", ["uint80", "int256", "uint256", "uint256"], [], "nonpayable"),
+        _function("version", [], ["uint256"]),
+    ],
+    "PackedAggregator": [
+        _function("decimals", [], ["uint8"]),
+        _function("description", [], ["string"]),
+        _function("latestRoundData", [], ["uint80", "int256", "uint256", "uint256", "uint80"]),
+        _function("setDecimals", ["uint8"], [], "nonpayable"),
+        _function("setDescription", ["string"], [], "nonpayable"),
+        _function("submitObservation", ["uint80", "int256", "uint256", "uint256"], [], "nonpayable"),
+        _function("submitPackedObservation", ["uint256"], [], "nonpayable"),
+        _function("version", [], ["uint256"]),
+    ],
+    "PriceFeedDirectory": [
+        _function("feeds", ["bytes32"], ["address"]),
+        _function("addFeed", ["string", "address", "bool"], [], "nonpayable"),
+        _function("addPackedFeed", ["string", "bool"], [], "nonpayable"),
+        {
+            "type": "function",
+            "name": "submitObservations",
+            "inputs": [{"name": "observations", "type": "tuple[]", "components": [
+                {"name": "feed", "type": "address"},
+                {"name": "roundId", "type": "uint80"},
+                {"name": "answer", "type": "int256"},
+                {"name": "startedAt", "type": "uint256"},
+                {"name": "updatedAt", "type": "uint256"},
+            ]}],
+            "outputs": [],
+            "stateMutability": "nonpayable",
+        },
+    ],
+}
+
+
+def seed_state_dir(state_dir: str):
+    """Seeds the ABIs in the state cache, so that the oracle doesn't depend on forge build artifacts"""
+    with open(os.path.join(state_dir, "state.json"), "w") as file:
+        json.dump({
+            "version": StateCache.VERSION,
+            "contracts": {name: {"mtime": None, "abi": abi, "bytecode": "0x"} for name, abi in CONTRACT_ABIS.items()},
+            "feeds": {},
+        }, file)
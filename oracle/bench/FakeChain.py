@@ -0,0 +1,78 @@
+import asyncio
+import time
+import typing
+from eth_abi import encode
+from web3 import Web3
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+
+
+def _selector(signature: str) -> str:
+    return Web3.keccak(text=signature)[:4].hex()
+
+
+class FakeChainProvider(JSONBaseProvider):
+    """
+    In-process web3 provider answering the calls the oracle makes to the chain.
+
+    Every feed is already registered in the directory, at an address derived
+    from its feed hash, and has no rounds yet. Single and batched requests
+    are delayed by `latency` seconds.
+
+    :param latency: Seconds each JSON-RPC request or batch takes
+    """
+
+    CHAIN_ID = 0x5afd
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests = 0
+        self._calls: dict[str, typing.Callable[[bytes], bytes]] = {
+            _selector("feeds(bytes32)"): lambda args: encode(["address"], ["0x" + args[12:32].hex()]),
+            _selector("decimals()"): lambda args: encode(["uint8"], [10]),
+            _selector("description()"): lambda args: encode(["string"], ["bench"]),
+            _selector("latestRoundData()"): lambda args: encode(["uint80", "int256", "uint256", "uint256", "uint80"], [0, 0, 0, 0, 0]),
+            _selector("version()"): lambda args: encode(["uint256"], [0]),
+        }
+
+    def _result(self, method: str, params: typing.Any) -> typing.Any:
+        self.requests += 1
+        if method == "eth_chainId":
+            return hex(self.CHAIN_ID)
+        if method == "eth_gasPrice":
+            return hex(100_000_000_000)
+        if method == "eth_estimateGas":
+            return hex(50_000)
+        if method == "eth_call":
+            data = bytes.fromhex(params[0].get("data", params[0].get("input", "0x"))[2:])
+            return "0x" + self._calls[data[:4].hex()](data[4:]).hex()
+        raise ValueError(f"unsupported method {method}")
+
+    def make_request(self, method, params):
+        time.sleep(self.latency)
+        return {"jsonrpc": "2.0", "id": 1, "result": self._result(method, params)}
+
+    def make_batch_request(self, requests):
+        time.sleep(self.latency)
+        return [{"jsonrpc": "2.0", "id": i, "result": self._result(method, params)} for i, (method, params) in enumerate(requests)]
+
+
+class AsyncFakeChainProvider(AsyncJSONBaseProvider):
+    """
+    Async counterpart of FakeChainProvider for the oracle's async web3 instance.
+
+    :param chain: Provider answering the requests
+    """
+
+    def __init__(self, chain: FakeChainProvider):
+        super().__init__()
+        self.chain = chain
+
+    async def make_request(self, method, params):
+        await asyncio.sleep(self.chain.latency)
+        return {"jsonrpc": "2.0", "id": 1, "result": self.chain._result(method, params)}
+
+    async def make_batch_request(self, requests):
+        await asyncio.sleep(self.chain.latency)
+        return [{"jsonrpc": "2.0", "id": i, "result": self.chain._result(method, params)} for i, (method, params) in enumerate(requests)]
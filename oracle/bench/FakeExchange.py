@@ -0,0 +1,120 @@
+import asyncio
+import json
+import typing
+from urllib.parse import parse_qs, urlsplit
+from websockets.asyncio.server import ServerConnection, serve
+
+from .FakeHttpServer import FakeHttpServer
+
+
+class FakeExchange(FakeHttpServer):
+    """
+    Local stand-in for the REST and WebSocket APIs of all supported exchanges.
+
+    REST requests are routed by path to the Binance, Kraken, Coinbase or
+    Bitstamp ticker format, so every exchange client can be pointed to the
+    same server. The WebSocket server speaks the Binance ticker stream.
+    Prices follow a random walk per symbol.
+
+    :param latency: Mean delay of a response in seconds
+    :param jitter: Maximum deviation of the delay from `latency` in seconds
+    :param error_rate: Fraction of requests failing with HTTP 500
+    :param rate_limit_rate: Fraction of requests rejected with HTTP 429
+    :param stream_interval: Seconds between ticker updates of a streamed symbol
+    :param seed: Seed of the random generator
+    """
+
+    def __init__(self,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0,
+                 stream_interval: float = 1.0,
+                 seed: int = 0):
+        super().__init__(latency, jitter, seed)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_interval = stream_interval
+        self.markets: set[tuple[str, str]] = set()  # (base, quote) listed on the Bitstamp all-tickers endpoint
+        self.errors = 0
+        self.rate_limited = 0
+        self.streamed = 0
+        self.http_url = ""
+        self.ws_url = ""
+        self._prices: dict[str, float] = {}
+        self._ws_server = None
+
+    def price(self, symbol: str) -> float:
+        symbol = symbol.upper().replace("/", "").replace("-", "").replace("_", "")
+        if symbol not in self._prices:
+            self._prices[symbol] = self.random.uniform(1, 100_000)
+        self._prices[symbol] *= 1 + self.random.gauss(0, 0.001)
+        return self._prices[symbol]
+
+    async def start(self):
+        self.http_url = await self.start_tcp()
+        self._ws_server = await serve(self._stream, "127.0.0.1", 0)
+        self.ws_url = f"ws://127.0.0.1:{self._ws_server.sockets[0].getsockname()[1]}"
+
+    async def stop(self):
+        await super().stop()
+        if self._ws_server is not None:
+            self._ws_server.close()
+            await self._ws_server.wait_closed()
+            self._ws_server = None
+
+    async def handle(self, method: str, target: str, body: bytes) -> tuple[int, typing.Any]:
+        failure = self.random.random()
+        if failure < self.error_rate:
+            self.errors += 1
+            return 500, {"error": "internal error"}
+        if failure < self.error_rate + self.rate_limit_rate:
+            self.rate_limited += 1
+            return 429, {"error": "rate limited"}
+
+        url = urlsplit(target)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path
+
+        # Binance
+        if path == "/api/v3/ticker":
+            if "symbols" in query:
+                return 200, [{"symbol": s, "lastPrice": str(self.price(s))} for s in json.loads(query["symbols"])]
+            return 200, {"symbol": query["symbol"], "lastPrice": str(self.price(query["symbol"]))}
+        # Kraken
+        if path == "/0/public/Ticker":
+            return 200, {"error": [], "result": {
+                p.upper(): {"c": [str(self.price(p)), "1.0"]} for p in query["pair"].split(",")
+            }}
+        # Coinbase
+        if path.startswith("/products/") and path.endswith("/ticker"):
+            return 200, {"price": str(self.price(path.split("/")[2]))}
+        # Bitstamp
+        if path == "/api/v2/ticker/":
+            return 200, [
+                {"pair": f"{base.upper()}/{quote.upper()}", "last": str(self.price(base + quote))}
+                for base, quote in sorted(self.markets)
+            ]
+        if path.startswith("/api/v2/ticker/"):
+            return 200, {"last": str(self.price(path.split("/")[4]))}
+        return 404, {"error": "not found"}
+
+    async def _stream(self, websocket: ServerConnection):
+        symbols = []
+        publisher = None
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                symbols += [param.split("@")[0] for param in request.get("params", [])]
+                if publisher is None:
+                    publisher = asyncio.create_task(self._publish(websocket, symbols))
+        finally:
+            if publisher is not None:
+                publisher.cancel()
+
+    async def _publish(self, websocket: ServerConnection, symbols: list[str]):
+        while True:
+            for symbol in symbols:
+                await websocket.send(json.dumps({"e": "24hrTicker", "s": symbol.upper(), "c": str(self.price(symbol))}))
+                self.streamed += 1
+            await asyncio.sleep(self.stream_interval)
@@ -0,0 +1,87 @@
+from abc import ABC, abstractmethod
+import asyncio
+import json
+import random
+import typing
+
+REASONS = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class FakeHttpServer(ABC):
+    """
+    Minimal HTTP/1.1 server with keep-alive for serving canned responses.
+
+    Every request is delayed by `latency` seconds plus a uniformly
+    distributed `jitter`. Subclasses implement `handle`.
+
+    :param latency: Mean delay of a response in seconds
+    :param jitter: Maximum deviation of the delay from `latency` in seconds
+    :param seed: Seed of the random generator used for delays and failures
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    @abstractmethod
+    async def handle(self, method: str, target: str, body: bytes) -> tuple[int, typing.Any]:
+        """Returns the status and the JSON-serializable body or raw bytes of the response"""
+        pass
+
+    async def start_tcp(self, host: str = "127.0.0.1") -> str:
+        self._server = await asyncio.start_server(self._serve, host, 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def start_unix(self, path: str):
+        self._server = await asyncio.start_unix_server(self._serve, path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Don't wait for clients which keep their connections alive.
+            for writer in self._writers:
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+                content_length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    if name.strip().lower() == "content-length":
+                        content_length = int(value)
+                body = await reader.readexactly(content_length) if content_length else b""
+
+                self.requests += 1
+                delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                status, response = await self.handle(method, target, body)
+                if not isinstance(response, bytes):
+                    response = json.dumps(response).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(response)}\r\n\r\n".encode() + response
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Client went away or the server is shutting down.
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -0,0 +1,70 @@
+import asyncio
+import bech32
+import time
+import typing
+from web3.types import TxParams
+
+from src.RoflUtility import RoflUtility
+
+from .FakeHttpServer import FakeHttpServer
+
+# App ID made of zero bytes.
+APP_ID = bech32.bech32_encode("rofl", bech32.convertbits(bytes(21), 8, 5))
+
+# CBOR-encoded {"ok": b""}, as returned by rofl-appd for a successful call.
+CBOR_OK = "a1626f6b40"
+
+
+class FakeRoflUtility(RoflUtility):
+    """
+    In-process RoflUtility accepting every transaction after `latency` seconds.
+
+    :param latency: Seconds it takes to sign, submit and include a transaction
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.submitted = 0
+        self._nonce = 0
+
+    def fetch_appid(self) -> str:
+        return APP_ID
+
+    def fetch_key(self, id: str) -> str:
+        return "00" * 32
+
+    def submit_tx(self, tx: TxParams) -> typing.Any:
+        time.sleep(self.latency)
+        self.submitted += 1
+        return {"data": {"ok": b""}}
+
+    async def submit_tx_async(self, tx: TxParams) -> typing.Any:
+        await asyncio.sleep(self.latency)
+        self.submitted += 1
+        return {"data": {"ok": b""}}
+
+    async def fetch_nonce_async(self) -> int | None:
+        return self._nonce
+
+
+class FakeAppd(FakeHttpServer):
+    """
+    Local stand-in for the rofl-appd REST API served on a UNIX socket.
+
+    :param latency: Mean delay of a response in seconds
+    :param jitter: Maximum deviation of the delay from `latency` in seconds
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        super().__init__(latency, jitter)
+        self.submitted = 0
+
+    async def handle(self, method: str, target: str, body: bytes) -> tuple[int, typing.Any]:
+        if target == "/rofl/v1/app/id":
+            return 200, APP_ID.encode()
+        if target == "/rofl/v1/keys/generate":
+            return 200, {"key": "00" * 32}
+        if target == "/rofl/v1/tx/sign-submit":
+            self.submitted += 1
+            return 200, {"data": CBOR_OK}
+        return 404, {"error": "not found"}
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+from dataclasses import asdict, dataclass
+
+from src.CircuitBreaker import CircuitBreaker
+from src.ExchangeClient import EXCHANGE_CLIENTS
+from src.ExchangeStream import EXCHANGE_STREAM_ADAPTERS
+from src.PriceOracle import PriceOracle
+from src.RateLimiter import RateLimiter
+from src.RoflUtilityAppd import RoflUtilityAppd
+
+from .Contracts import DIRECTORY_ADDRESS, seed_state_dir
+from .FakeChain import AsyncFakeChainProvider, FakeChainProvider
+from .FakeExchange import FakeExchange
+from .FakeRofl import FakeAppd, FakeRoflUtility
+
+@dataclass
+class Scenario:
+    """Parameters of a single benchmark run"""
+    pairs: int
+    duration: float = 30.0
+    fetch_period: int = 1
+    submit_period: int = 6
+    ingest: str = "poll"
+    backend: str = "fake"  # "fake" RoflUtility in-process or "appd" for RoflUtilityAppd talking to a fake rofl-appd
+    batch_submit: bool = False
+    rate_limits: bool = False  # Apply the exchanges' published rate limits to the fake exchange
+    exchanges: tuple[str, ...] = ("binance.com", "binance.us", "kraken.com", "coinbase.com", "bitstamp.net")
+
+    def pair_list(self) -> list[tuple[str, str, str]]:
+        exchanges = ("binance.com",) if self.ingest == "stream" else self.exchanges
+        return [(exchanges[i % len(exchanges)], f"t{i}", "usd") for i in range(self.pairs)]
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    def at(q: float) -> float:
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {"count": len(samples), "p50": at(0.5), "p90": at(0.9), "p99": at(0.99), "max": samples[-1]}
+
+
+def current_rss() -> int | None:
+    """Returns the resident set size of this process in bytes, if available"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class Probe:
+    """Collects the metrics of a running PriceOracle by wrapping some of its callables"""
+
+    def __init__(self, oracle: PriceOracle):
+        self.oracle = oracle
+        self.fetch_latencies: list[float] = []
+        self.tick_drifts: list[float] = []
+        self.loop_lags: list[float] = []
+        self.submit_latencies: list[float] = []
+        self.submitted = 0
+        self.failed = 0
+        self.startup_seconds: float | None = None
+
+        discover_contracts = oracle.discover_contracts
+        async def timed_discover(pairs):
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            result = await discover_contracts(pairs)
+            self.startup_seconds = loop.time() - start
+            return result
+        oracle.discover_contracts = timed_discover
+
+        for batcher in oracle.batchers.values():
+            batcher.fetcher = self._timed(batcher.fetcher)
+            if batcher.bulk_fetcher is not None:
+                batcher.bulk_fetcher = self._timed(batcher.bulk_fetcher)
+
+        tick = oracle.scheduler.tick
+        async def timed_tick(pair):
+            deadline = oracle.scheduler.entries[pair].deadline
+            try:
+                await tick(pair)
+            finally:
+                # How long after its deadline the tick finished.
+                self.tick_drifts.append(asyncio.get_running_loop().time() - deadline)
+        oracle.scheduler.tick = timed_tick
+
+        report_submission = oracle.report_submission
+        def counted_report(pair, round_data, future):
+            if not future.cancelled() and future.exception() is None:
+                self.submitted += 1
+                self.submit_latencies.append(future.result().latency)
+            else:
+                self.failed += 1
+            report_submission(pair, round_data, future)
+        oracle.report_submission = counted_report
+
+    def _timed(self, fetcher: typing.Callable) -> typing.Callable:
+        async def timed(*args):
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            try:
+                return await fetcher(*args)
+            finally:
+                self.fetch_latencies.append(loop.time() - start)
+        return timed
+
+    async def monitor_loop_lag(self, interval: float = 0.05):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lags.append(loop.time() - start - interval)
+
+
+async def run_scenario(scenario: Scenario, exchange: FakeExchange, rofl_latency: float = 0.0, rpc_latency: float = 0.0) -> dict:
+    """Runs PriceOracle against the fake exchange, chain and ROFL backend and returns the collected metrics"""
+    pairs = scenario.pair_list()
+    exchange.markets = {(base, quote) for _, base, quote in pairs}
+    for client in EXCHANGE_CLIENTS.values():
+        client.base_url = exchange.http_url
+        # Hedged requests go to the same fake exchange.
+        client.mirrors = [exchange.http_url for _ in client.mirrors]
+        client.breaker = CircuitBreaker()
+        client.latencies.clear()
+        if not scenario.rate_limits:
+            client.limiter = RateLimiter()
+    for adapter in EXCHANGE_STREAM_ADAPTERS.values():
+        adapter.url = exchange.ws_url
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        seed_state_dir(state_dir)
+
+        appd = None
+        oracle = PriceOracle(
+            None,
+            DIRECTORY_ADDRESS,
+            "sapphire-localnet",
+            ",".join("/".join(pair) for pair in pairs),
+            "",
+            scenario.fetch_period,
+            scenario.submit_period,
+            ingest=scenario.ingest,
+            batch_submit=scenario.batch_submit,
+            state_dir=state_dir,
+        )
+        # Calldata encryption needs a real Sapphire node.
+        oracle.w3.middleware_onion.remove("sapphire")
+        oracle.w3.provider = FakeChainProvider(rpc_latency)
+        oracle.contract_utility.async_w3.middleware_onion.remove("sapphire")
+        oracle.contract_utility.async_w3.provider = AsyncFakeChainProvider(oracle.w3.provider)
+        if scenario.backend == "appd":
+            appd = FakeAppd(rofl_latency)
+            socket_path = os.path.join(state_dir, "appd.sock")
+            await appd.start_unix(socket_path)
+            oracle.rofl_utility = RoflUtilityAppd(socket_path)
+        else:
+            oracle.rofl_utility = FakeRoflUtility(rofl_latency)
+        oracle.tx_submitter.rofl_utility = oracle.rofl_utility
+
+        probe = Probe(oracle)
+        requests_before = exchange.requests
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        monitor = asyncio.create_task(probe.monitor_loop_lag())
+        task = asyncio.create_task(oracle.run())
+        await asyncio.sleep(scenario.duration)
+        task.cancel()
+        monitor.cancel()
+        await asyncio.gather(task, monitor, return_exceptions=True)
+        elapsed = loop.time() - start
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+        if appd is not None:
+            await appd.stop()
+
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    tick_overruns = sum(1 for drift in probe.tick_drifts if drift > scenario.fetch_period)
+    return {
+        "scenario": asdict(scenario),
+        "startup_seconds": probe.startup_seconds,
+        "fetch_latency": percentiles(probe.fetch_latencies),
+        "exchange_requests": exchange.requests - requests_before,
+        "loop_lag": percentiles(probe.loop_lags),
+        "tick_drift": percentiles(probe.tick_drifts),
+        "tick_overruns": tick_overruns,
+        "submit_latency": percentiles(probe.submit_latencies),
+        "submitted": probe.submitted,
+        "submit_failed": probe.failed,
+        "submit_throughput": probe.submitted / elapsed,
+        "cpu_seconds": cpu,
+        "cpu_percent": 100 * cpu / elapsed,
+        "rss_bytes": current_rss(),
+        "max_rss_bytes": usage_after.ru_maxrss * 1024,
+    }
+
+
+def measure_cold_start(pairs: int = 5) -> dict:
+    """
+    Measures the cold start of the oracle in fresh interpreters: the time
+    until main.py has validated its arguments, and the import and
+    construction time and peak RSS of PriceOracle.
+    """
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "--help"], cwd=cwd, check=True, capture_output=True)
+    arguments_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-m", "bench.ColdStart", str(pairs)], cwd=cwd, check=True, capture_output=True, text=True).stdout
+    process_seconds = time.perf_counter() - start
+    return {"pairs": pairs, "arguments_seconds": arguments_seconds, "process_seconds": process_seconds, **json.loads(output)}
+
+
+# Metrics compared between runs and whether lower values are better.
+COMPARED_METRICS = {
+    ("startup_seconds",): True,
+    ("fetch_latency", "p99"): True,
+    ("loop_lag", "p99"): True,
+    ("tick_drift", "p99"): True,
+    ("submit_throughput",): False,
+    ("cpu_percent",): True,
+    ("rss_bytes",): True,
+}
+
+
+# Cold start metrics compared between runs, all lower is better.
+COMPARED_COLD_START_METRICS = ("arguments_seconds", "import_seconds", "construct_seconds", "max_rss_bytes")
+
+
+def _change(old: float, new: float, lower_is_better: bool) -> str:
+    change = (new - old) / old * 100
+    worse = change > 0 if lower_is_better else change < 0
+    return f"{old:>12.4g} -> {new:>12.4g} ({change:+.1f}%){' REGRESSION' if worse and abs(change) > 10 else ''}"
+
+
+def compare(baseline: dict, results: dict) -> list[str]:
+    """Returns lines describing the change of key metrics of scenarios present in both results"""
+    def key(result):
+        return json.dumps(result["scenario"], sort_keys=True)
+
+    lines = []
+    for metric in COMPARED_COLD_START_METRICS:
+        old, new = (baseline.get("cold_start") or {}).get(metric), (results.get("cold_start") or {}).get(metric)
+        if old and new is not None:
+            lines.append(f"cold start  {metric:<20} {_change(old, new, True)}")
+
+    baseline_results = {key(result): result for result in baseline["results"]}
+    for result in results["results"]:
+        base = baseline_results.get(key(result))
+        if base is None:
+            continue
+        for path, lower_is_better in COMPARED_METRICS.items():
+            old, new = base, result
+            for part in path:
+                old, new = (old or {}).get(part), (new or {}).get(part)
+            if not old or new is None:
+                continue
+            lines.append(f"{result['scenario']['pairs']:>5} pairs {'.'.join(path):<20} {_change(old, new, lower_is_better)}")
+    return lines
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+
+from .FakeExchange import FakeExchange
+from .Harness import Scenario, compare, measure_cold_start, run_scenario
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(arguments) -> dict:
+    exchange = FakeExchange(
+        latency=arguments.exchange_latency,
+        jitter=arguments.exchange_jitter,
+        error_rate=arguments.error_rate,
+        rate_limit_rate=arguments.rate_limit_rate,
+        seed=arguments.seed,
+    )
+    await exchange.start()
+    results = []
+    try:
+        for pairs in arguments.pairs:
+            scenario = Scenario(
+                pairs=pairs,
+                duration=arguments.duration,
+                fetch_period=arguments.fetch_period,
+                submit_period=arguments.submit_period,
+                ingest=arguments.ingest,
+                backend=arguments.backend,
+                batch_submit=arguments.batch_submit,
+                rate_limits=arguments.rate_limits,
+            )
+            print(f"Running {pairs} pair(s) for {arguments.duration}s...", file=sys.stderr)
+            result = await run_scenario(scenario, exchange, arguments.rofl_latency, arguments.rpc_latency)
+            print(
+                f"{pairs:>5} pairs: startup {result['startup_seconds'] or float('nan'):.1f}s, fetch p50/p99 {result['fetch_latency'].get('p50', 0) * 1000:.1f}/{result['fetch_latency'].get('p99', 0) * 1000:.1f}ms, "
+                f"loop lag p99 {result['loop_lag'].get('p99', 0) * 1000:.1f}ms, "
+                f"tick drift p99 {result['tick_drift'].get('p99', 0) * 1000:.1f}ms ({result['tick_overruns']} overruns), "
+                f"{result['submit_throughput']:.1f} submits/s, CPU {result['cpu_percent']:.0f}%, RSS {(result['rss_bytes'] or 0) / 2**20:.0f}MiB",
+                file=sys.stderr,
+            )
+            results.append(result)
+    finally:
+        await exchange.stop()
+
+    cold_start = measure_cold_start()
+    print(
+        f"cold start: arguments {cold_start['arguments_seconds']:.2f}s, import {cold_start['import_seconds']:.2f}s, "
+        f"construct {cold_start['construct_seconds']:.2f}s, peak RSS {cold_start['max_rss_bytes'] / 2**20:.0f}MiB",
+        file=sys.stderr,
+    )
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": int(time.time()),
+        "cold_start": cold_start,
+        "results": results,
+    }
+
+
+def main():
+    """
+    Runs PriceOracle against local stand-ins of the exchanges, the chain and rofl-appd.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Offline load test and benchmark of the price oracle.")
+
+    parser.add_argument(
+        "--pairs",
+        help="Comma-separated numbers of pairs to run a scenario with",
+        default="1,10,100,1000",
+        type=lambda value: [int(n) for n in value.split(",")],
+    )
+
+    parser.add_argument(
+        "--duration",
+        help="Amount of seconds each scenario runs",
+        default=30,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--fetch-period",
+        dest="fetch_period",
+        default=1,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--submit-period",
+        dest="submit_period",
+        default=6,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--ingest",
+        choices=["poll", "stream"],
+        default="poll",
+    )
+
+    parser.add_argument(
+        "--backend",
+        help="Submit transactions to an in-process fake RoflUtility or through RoflUtilityAppd to a fake rofl-appd on a UNIX socket",
+        choices=["fake", "appd"],
+        default="fake",
+    )
+
+    parser.add_argument(
+        "--batch-submit",
+        dest="batch_submit",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--rate-limits",
+        dest="rate_limits",
+        help="Throttle requests to the fake exchanges like to the real ones",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--exchange-latency",
+        dest="exchange_latency",
+        help="Mean latency of the fake exchange API in seconds",
+        default=0.05,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--exchange-jitter",
+        dest="exchange_jitter",
+        help="Maximum deviation of the fake exchange API latency in seconds",
+        default=0.02,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--error-rate",
+        dest="error_rate",
+        help="Fraction of exchange API requests failing with HTTP 500",
+        default=0.0,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--rate-limit-rate",
+        dest="rate_limit_rate",
+        help="Fraction of exchange API requests rejected with HTTP 429",
+        default=0.0,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--rofl-latency",
+        dest="rofl_latency",
+        help="Seconds it takes the fake ROFL backend to sign and submit a transaction",
+        default=0.5,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--rpc-latency",
+        dest="rpc_latency",
+        help="Seconds each JSON-RPC request to the fake chain takes",
+        default=0.0,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--seed",
+        default=0,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--output",
+        help="File to write the JSON results to. If none provided, they are written to stdout",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--compare",
+        help="JSON results of an earlier run to compare the key metrics with",
+        type=str,
+    )
+
+    arguments = parser.parse_args()
+    # Failures injected into the fake exchanges would otherwise be logged by the oracle.
+    logging.basicConfig(level=logging.CRITICAL)
+    results = asyncio.run(run(arguments))
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            baseline = json.load(file)
+        print(f"Compared to {baseline.get('commit')}:", file=sys.stderr)
+        for line in compare(baseline, results):
+            print(line, file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
-from src.PriceOracle import DEFAULT_PRICE_FEED_ADDRESS, EXCHANGE_FETCHERS, PriceOracle
+from src.Metrics import configure_logging
+from src.ObservationJournal import FSYNC_POLICIES
 import argparse
 import asyncio
+import logging
 
 def main():
     """
@@ -34,7 +36,7 @@ def main():
 
     parser.add_argument(
         "--pair",
-        help="Comma-separated exchange name + trading pair to observe. Example:\nbitstamp.net/btc/usd,uniswap.org/polygon/native/1bfd67037b42cf73acf2047067bd4f2c47d9bfd6",
+        help="Comma-separated exchange name + trading pair to observe. Example:\nbitstamp.net/btc/usd,uniswap.org/polygon/native/1bfd67037b42cf73acf2047067bd4f2c47d9bfd6\nA composite pair publishes a single price combined from the listed exchanges, rejecting outliers. Example:\ncomposite/btc/usd=bitstamp.net,kraken.com,coinbase.com",
         default="bitstamp.net/btc/usd",
         type=str,
     )
@@ -55,6 +57,150 @@ def main():
         type=int,
     )
 
+    parser.add_argument(
+        "--fetch-timeout",
+        dest="fetch_timeout",
+        help="Timeout in seconds for a single exchange API request",
+        default=5,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--ingest",
+        help="How to obtain prices: poll the exchanges' REST APIs every fetch period, or stream them over the exchanges' WebSocket feeds and poll only while a feed is down",
+        choices=["poll", "stream"],
+        default="poll",
+    )
+
+    parser.add_argument(
+        "--appd-timeout",
+        dest="appd_timeout",
+        help="Timeout in seconds for a single rofl-appd request, including signing and submitting a transaction",
+        default=60,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--batch-submit",
+        dest="batch_submit",
+        help="Submit observations of all due pairs in a single transaction through the price feed directory. Requires a directory with submitObservations support",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--aggregator",
+        help="Aggregator contract deployed for pairs without one: simple, or packed, which stores a round in a single storage slot and takes it in compact calldata. Requires a directory with addPackedFeed support. Existing packed aggregators are detected and used regardless",
+        choices=["simple", "packed"],
+        default="simple",
+    )
+
+    parser.add_argument(
+        "--state-dir",
+        dest="state_dir",
+        help="Directory on the persistent disk for caching contract ABIs, feed addresses, round state and a journal of the observations across restarts. If none provided, nothing is cached",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--journal-fsync",
+        dest="journal_fsync",
+        help="When to fsync the observation journal in the state directory: never, once per submit period or once per fetch period. Without fsync, journaled observations survive a crash of the oracle but not of the machine",
+        choices=FSYNC_POLICIES,
+        default="periodic",
+    )
+
+    parser.add_argument(
+        "--estimator",
+        help="How to aggregate the observations of a submit period into the submitted price: median, mean without the lowest and highest 10%%, time- or volume-weighted average price",
+        choices=["median", "trimmed-mean", "twap", "vwap"],
+        default="median",
+    )
+
+    parser.add_argument(
+        "--window-size",
+        dest="window_size",
+        help="Maximum number of observations per pair kept for aggregation. Older ones are discarded",
+        default=1024,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--window-horizon",
+        dest="window_horizon",
+        help="Maximum age in seconds of observations kept for aggregation. If none provided, all observations of the submit period are kept",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--deviation-bps",
+        dest="deviation_bps",
+        help="Only submit an answer deviating at least this many basis points from the last submitted one, and submit it as soon as it does. Either a number for all pairs or comma-separated values per pair. Example:\n50,bitstamp.net/btc/usd=20. If none provided, an answer is submitted every submit period",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--heartbeat",
+        help="Maximum amount of seconds between submissions of a pair with a deviation threshold, regardless of its deviation. Either a number for all pairs or comma-separated values per pair",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--submit-policy",
+        dest="submit_policy",
+        help="JSON file mapping pair names or \"default\" to objects with \"deviation_bps\" and \"heartbeat\" fields. Values passed on the command line take precedence",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--fetch-priority",
+        dest="fetch_priority",
+        help="Priority of fetching the price of a pair. When an exchange's rate limit is exhausted, pairs below the highest priority are sampled less often. Either a number for all pairs or comma-separated values per pair. Example:\n0,bitstamp.net/btc/usd=1. Defaults to 0",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--log-level",
+        dest="log_level",
+        help="Minimum level of the logged messages. Prices fetched each tick are logged at debug level",
+        choices=["debug", "info", "warning", "error"],
+        default="info",
+    )
+
+    parser.add_argument(
+        "--metrics-port",
+        dest="metrics_port",
+        help="Port to serve Prometheus metrics on at /metrics. If none provided, metrics are not served",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--read-port",
+        dest="read_port",
+        help="Port to serve the latest and recent rounds of the feeds on at /feeds and /feed. If none provided, they are not served",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--read-history",
+        dest="read_history",
+        help="Number of recent rounds of each feed served on the read port",
+        default=16,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--workers",
+        help="Number of worker processes the pairs are sharded over. Each worker fetches and aggregates its own pairs, while their transactions are signed and submitted by the main process. Worker N keeps its state in worker-N of the state directory and serves on the metrics port + 1 + N and the read port + N. Pairs of a worker which dies are taken over by the others",
+        default=1,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--trace",
+        help="Log the duration of each fetch, aggregate and submit span",
+        action="store_true",
+    )
+
     parser.add_argument(
         "--api-key",
         dest="api_key",
@@ -66,23 +212,90 @@ def main():
     if arguments.fetch_period < 1:
         parser.error("--fetch-period must be at least 1 second")
 
+    if arguments.fetch_timeout <= 0:
+        parser.error("--fetch-timeout must be positive")
+
+    if arguments.appd_timeout <= 0:
+        parser.error("--appd-timeout must be positive")
+
+    if arguments.window_size < 1:
+        parser.error("--window-size must be at least 1")
+
+    if arguments.window_horizon is not None and arguments.window_horizon <= 0:
+        parser.error("--window-horizon must be positive")
+
+    if arguments.read_history < 1:
+        parser.error("--read-history must be at least 1")
+
     if arguments.submit_period < 6:
         parser.error("--submit-period must be at least 6 seconds")
 
+    if arguments.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    configure_logging(arguments.log_level)
+
+    # Imported once the arguments are valid, as web3 alone takes over a second to load.
+    from src.PriceOracle import DEFAULT_PRICE_FEED_ADDRESS, PriceOracle, parse_pairs
+
+    try:
+        parse_pairs(arguments.pair)
+    except ValueError as e:
+        parser.error(f"invalid --pair: {e}")
+
     if arguments.price_feed_address is None or len(arguments.price_feed_address) == 0:
         arguments.price_feed_address = DEFAULT_PRICE_FEED_ADDRESS[arguments.network]
 
-    print(f"Starting price oracle service. Using aggregator contract {arguments.address} and price feed directory {arguments.price_feed_address} on {arguments.network}. Pair(s): {arguments.pair}. Fetch period: {arguments.fetch_period}s, Submit period: {arguments.submit_period}s.")
+    logging.info(f"Starting price oracle service. Using aggregator contract {arguments.address} and price feed directory {arguments.price_feed_address} on {arguments.network}. Pair(s): {arguments.pair}. Fetch period: {arguments.fetch_period}s, Submit period: {arguments.submit_period}s. Ingest: {arguments.ingest}. Estimator: {arguments.estimator}. Workers: {arguments.workers}.")
+
+    options = dict(
+        address=arguments.address,
+        price_feed_address=arguments.price_feed_address,
+        network_name=arguments.network,
+        exchanges_pairs=arguments.pair,
+        api_keys=arguments.api_key,
+        fetch_period=int(arguments.fetch_period),
+        submit_period=int(arguments.submit_period),
+        fetch_timeout=arguments.fetch_timeout,
+        ingest=arguments.ingest,
+        appd_timeout=arguments.appd_timeout,
+        batch_submit=arguments.batch_submit,
+        state_dir=arguments.state_dir,
+        estimator=arguments.estimator,
+        window_size=arguments.window_size,
+        window_horizon=arguments.window_horizon,
+        deviation_bps=arguments.deviation_bps,
+        heartbeat=arguments.heartbeat,
+        submit_policy_file=arguments.submit_policy,
+        metrics_port=arguments.metrics_port,
+        trace=arguments.trace,
+        fetch_priority=arguments.fetch_priority,
+        journal_fsync=arguments.journal_fsync,
+        read_port=arguments.read_port,
+        read_history=arguments.read_history,
+        aggregator=arguments.aggregator,
+    )
+    if arguments.workers == 1:
+        price_oracle = PriceOracle(**options)
+        asyncio.run(price_oracle.run())
+        return
+
+    from src.ContractUtility import ContractUtility
+    from src.PriceOracle import create_rofl_utility
+    from src.ShardCoordinator import ShardCoordinator, run_worker
+    from src.TxSubmitter import TxSubmitter
 
-    price_oracle = PriceOracle(
-        arguments.address,
-        arguments.price_feed_address,
-        arguments.network,
-        arguments.pair,
-        arguments.api_key,
-        int(arguments.fetch_period), int(arguments.submit_period),
+    # The only signer, so that the nonces of all workers' transactions come from a single sequence.
+    rofl_utility = create_rofl_utility(arguments.network, ContractUtility(arguments.network).w3, arguments.appd_timeout)
+    coordinator = ShardCoordinator(
+        TxSubmitter(rofl_utility),
+        [str(pair) for pair in parse_pairs(arguments.pair)],
+        arguments.workers,
+        run_worker,
+        (options, arguments.log_level),
+        arguments.metrics_port,
     )
-    asyncio.run(price_oracle.run())
+    asyncio.run(coordinator.run())
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+from src.AggregationWindow import ESTIMATORS
+from src.Replay import LOADERS, ReplayConfig, replay
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+def comma_list(cast):
+    return lambda value: [cast(v) for v in value.split(",")]
+
+def main():
+    """
+    Replays recorded prices through the oracle's aggregation and submit
+    policies, sweeping over the combinations of the given settings.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Offline backtest of the price oracle's aggregation and submit policies on recorded prices.")
+
+    parser.add_argument(
+        "history",
+        help="CSV or Parquet file with timestamp, pair, price and optionally volume columns, or an oracle log written with --log-level debug",
+    )
+
+    parser.add_argument(
+        "--format",
+        help="Format of the history. If none provided, it is guessed from the file extension",
+        choices=list(LOADERS),
+    )
+
+    parser.add_argument(
+        "--pair",
+        help="Comma-separated pairs to replay. If none provided, all pairs in the history are replayed",
+        type=comma_list(str),
+    )
+
+    parser.add_argument(
+        "--fetch-period",
+        dest="fetch_period",
+        help="Comma-separated amounts of seconds between fetching token prices",
+        default=[10],
+        type=comma_list(int),
+    )
+
+    parser.add_argument(
+        "--submit-period",
+        dest="submit_period",
+        help="Comma-separated amounts of seconds between submitting observations on-chain",
+        default=[60],
+        type=comma_list(int),
+    )
+
+    parser.add_argument(
+        "--estimator",
+        help=f"Comma-separated estimators aggregating the observations of a round ({", ".join(ESTIMATORS)})",
+        default=["median"],
+        type=comma_list(str),
+    )
+
+    parser.add_argument(
+        "--deviation-bps",
+        dest="deviation_bps",
+        help="Comma-separated deviation thresholds in basis points. 0 submits every submit period",
+        default=[0.0],
+        type=comma_list(float),
+    )
+
+    parser.add_argument(
+        "--heartbeat",
+        help="Maximum seconds between submissions with a deviation threshold",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--window-size",
+        dest="window_size",
+        help="Maximum number of observations aggregated into an answer",
+        default=1024,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--window-horizon",
+        dest="window_horizon",
+        help="Maximum age in seconds of the observations aggregated into an answer",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--decimals",
+        help="Number of decimals of the submitted answers",
+        default=10,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--gas-per-submit",
+        dest="gas_per_submit",
+        help="Gas used by a single submission, for estimating the total",
+        default=100_000,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--output",
+        help="File to write the JSON results to. If none provided, they are written to stdout",
+        type=str,
+    )
+
+    arguments = parser.parse_args()
+    unknown = set(arguments.estimator) - ESTIMATORS.keys()
+    if unknown:
+        parser.error(f"unknown estimator(s) {", ".join(sorted(unknown))}")
+
+    history_format = arguments.format or os.path.splitext(arguments.history)[1].lstrip(".")
+    if history_format not in LOADERS:
+        history_format = "log"
+    started = time.perf_counter()
+    histories = LOADERS[history_format](arguments.history)
+    print(f"Loaded {sum(len(h.timestamps) for h in histories.values())} ticks of {len(histories)} pair(s) in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    results = []
+    for pair in arguments.pair or sorted(histories):
+        if pair not in histories:
+            parser.error(f"pair {pair} not in the history")
+        for fetch_period, submit_period, estimator, deviation_bps in itertools.product(
+            arguments.fetch_period, arguments.submit_period, arguments.estimator, arguments.deviation_bps,
+        ):
+            config = ReplayConfig(
+                fetch_period=fetch_period,
+                submit_period=submit_period,
+                estimator=estimator,
+                deviation_bps=deviation_bps,
+                heartbeat=arguments.heartbeat,
+                window_size=arguments.window_size,
+                window_horizon=arguments.window_horizon,
+                decimals=arguments.decimals,
+            )
+            started = time.perf_counter()
+            result = {"pair": pair, **replay(histories[pair], config, arguments.gas_per_submit)}
+            tracking_error = result["tracking_error_bps"]
+            print(
+                f"{pair} fetch {fetch_period}s submit {submit_period}s {estimator} {deviation_bps:g}bps: "
+                f"{result['submissions']} submissions, {result['gas']} gas, "
+                f"tracking error mean/p99/max {tracking_error.get('mean', float('nan')):.2f}/{tracking_error.get('p99', float('nan')):.2f}/{tracking_error.get('max', float('nan')):.2f}bps "
+                f"({time.perf_counter() - started:.2f}s)",
+                file=sys.stderr,
+            )
+            results.append(result)
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+if __name__ == '__main__':
+    main()
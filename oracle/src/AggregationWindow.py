@@ -0,0 +1,108 @@
+import bisect
+from collections import deque
+
+
+class AggregationWindow:
+    """
+    Bounded window of price observations of a single pair.
+
+    Observations are kept in arrival order in a deque and their prices
+    additionally in a sorted list, so order statistics are read in O(1)
+    and maintained by a binary search on insert and eviction. Running sums
+    make the time- and volume-weighted averages O(1) as well.
+
+    Once the window holds `max_size` observations or its oldest one is
+    older than `horizon` seconds, the oldest ones are evicted.
+
+    :param max_size: Maximum number of observations kept
+    :param horizon: Maximum age in seconds of the kept observations. If None, only `max_size` applies
+    """
+
+    __slots__ = ("max_size", "horizon", "_observations", "_sorted_prices",
+                 "_twap_sum", "_volume_price_sum", "_volume_sum")
+
+    def __init__(self, max_size: int = 1024, horizon: float | None = None):
+        self.max_size = max_size
+        self.horizon = horizon
+        self._observations: deque[tuple[int, int, float | None]] = deque()  # (price, timestamp, volume)
+        self._sorted_prices: list[int] = []  # Python ints, as scaled prices may exceed 64 bits
+        self._twap_sum = 0  # sum of price * seconds until the next observation
+        self._volume_price_sum = 0.0
+        self._volume_sum = 0.0
+
+    def __len__(self) -> int:
+        return len(self._observations)
+
+    @property
+    def started_at(self) -> int:
+        return self._observations[0][1]
+
+    @property
+    def updated_at(self) -> int:
+        return self._observations[-1][1]
+
+    def add(self, price: int, timestamp: int, volume: float | None = None):
+        if self._observations:
+            last_price, last_timestamp, _ = self._observations[-1]
+            self._twap_sum += last_price * (timestamp - last_timestamp)
+        self._observations.append((price, timestamp, volume))
+        bisect.insort(self._sorted_prices, price)
+        if volume is not None:
+            self._volume_price_sum += price * volume
+            self._volume_sum += volume
+
+        while len(self._observations) > self.max_size or (
+            self.horizon is not None and timestamp - self._observations[0][1] > self.horizon
+        ):
+            self._evict()
+
+    def _evict(self):
+        price, timestamp, volume = self._observations.popleft()
+        if self._observations:
+            self._twap_sum -= price * (self._observations[0][1] - timestamp)
+        del self._sorted_prices[bisect.bisect_left(self._sorted_prices, price)]
+        if volume is not None:
+            self._volume_price_sum -= price * volume
+            self._volume_sum -= volume
+
+    def clear(self):
+        self._observations.clear()
+        del self._sorted_prices[:]
+        self._twap_sum = 0
+        self._volume_price_sum = 0.0
+        self._volume_sum = 0.0
+
+    def median(self) -> int:
+        n = len(self._sorted_prices)
+        if n % 2:
+            return self._sorted_prices[n // 2]
+        return (self._sorted_prices[n // 2 - 1] + self._sorted_prices[n // 2]) // 2
+
+    def trimmed_mean(self, trim: float = 0.1) -> int:
+        """Mean of the prices without the `trim` fraction of the lowest and the highest ones"""
+        n = len(self._sorted_prices)
+        k = min(int(n * trim), (n - 1) // 2)
+        kept = self._sorted_prices[k:n - k]
+        return sum(kept) // len(kept)
+
+    def twap(self) -> int:
+        """Time-weighted average price, weighting each price by the time until the next observation"""
+        duration = self.updated_at - self.started_at
+        if duration == 0:
+            return self.median()
+        return self._twap_sum // duration
+
+    def vwap(self) -> int:
+        """Volume-weighted average price of the observations which carry volume, otherwise the TWAP"""
+        if self._volume_sum <= 0:
+            return self.twap()
+        return int(self._volume_price_sum / self._volume_sum)
+
+
+# Estimators selectable by --estimator.
+ESTIMATORS = {
+    'median': AggregationWindow.median,
+    'trimmed-mean': AggregationWindow.trimmed_mean,
+    'twap': AggregationWindow.twap,
+    'vwap': AggregationWindow.vwap,
+}
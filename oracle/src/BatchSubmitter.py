@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from web3.contract import Contract
+
+from .GasCache import GasCache
+from .TxSubmitter import TxSubmitter
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_by_gas(gas_limits: list[int], max_gas: int) -> list[list[int]]:
+    """Splits indices of the items into consecutive chunks whose summed gas limits fit into max_gas"""
+    chunks = []
+    chunk, chunk_gas = [], 0
+    for i, gas in enumerate(gas_limits):
+        if chunk and chunk_gas + gas > max_gas:
+            chunks.append(chunk)
+            chunk, chunk_gas = [], 0
+        chunk.append(i)
+        chunk_gas += gas
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+class BatchSubmitter:
+    """
+    Submits observations of many feeds in PriceFeedDirectory.submitObservations transactions.
+
+    Observations submitted within `window` seconds are grouped into one
+    transaction, split into several ones if their gas would exceed
+    `max_batch_gas`. The gas of a batch is the sum of the cached
+    submitObservation gas limits of its feeds. Each of those includes the
+    21000 intrinsic gas of a transaction, which more than covers the
+    overhead of forwarding the call.
+
+    :param directory_contract: PriceFeedDirectory contract instance
+    :param gas_cache: Source of gas prices and per-feed gas limits
+    :param tx_submitter: Pipeline the batch transactions are submitted to
+    :param max_batch_gas: Maximum gas limit of a single batch transaction
+    :param window: Seconds to wait for other feeds to join the batch
+    """
+
+    def __init__(self,
+                 directory_contract: Contract,
+                 gas_cache: GasCache,
+                 tx_submitter: TxSubmitter,
+                 max_batch_gas: int = 10_000_000,
+                 window: float = 2.0):
+        self.directory_contract = directory_contract
+        self.gas_cache = gas_cache
+        self.tx_submitter = tx_submitter
+        self.max_batch_gas = max_batch_gas
+        self.window = window
+        self._pending: list[tuple[Contract, tuple, asyncio.Future]] = []
+        self._flush_task: asyncio.Task | None = None
+
+    def submit(self, contract: Contract, round_id: int, answer: int, started_at: int, updated_at: int) -> asyncio.Future:
+        """Adds the observation to the next batch and returns a future resolving to the batch's SubmitResult"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((contract, (round_id, answer, started_at, updated_at), future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return future
+
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+
+        try:
+            functions = [contract.functions.submitObservation(*observation) for contract, observation, _ in pending]
+            await asyncio.gather(*(self.gas_cache.warm(function) for function in functions))
+            gas_limits = [self.gas_cache.gas_limit(function) for function in functions]
+        except Exception as e:
+            self._fail([future for _, _, future in pending], e)
+            return
+
+        for chunk in chunk_by_gas(gas_limits, self.max_batch_gas):
+            futures = [pending[i][2] for i in chunk]
+            try:
+                tx_params = self.directory_contract.functions.submitObservations([
+                    (pending[i][0].address, *pending[i][1]) for i in chunk
+                ]).build_transaction({
+                    'gas': sum(gas_limits[i] for i in chunk),
+                    'gasPrice': self.gas_cache.gas_price,
+                    'chainId': self.gas_cache.chain_id,
+                })
+                logger.info("Submitting batch of %d observations.", len(chunk))
+                batch_future = self.tx_submitter.submit(tx_params)
+            except Exception as e:
+                # Only this chunk fails, the others are still submitted.
+                logger.error("Building batch of %d observations failed: %r", len(chunk), e)
+                self._fail(futures, e)
+                continue
+            batch_future.add_done_callback(
+                lambda f, futures=futures: self._resolve(f, futures)
+            )
+
+    @staticmethod
+    def _fail(futures: list[asyncio.Future], e: Exception):
+        for future in futures:
+            if not future.done():
+                future.set_exception(e)
+
+    @staticmethod
+    def _resolve(batch_future: asyncio.Future, futures: list[asyncio.Future]):
+        for future in futures:
+            if future.done():
+                continue
+            if batch_future.cancelled():
+                future.cancel()
+            elif batch_future.exception() is not None:
+                future.set_exception(batch_future.exception())
+            else:
+                future.set_result(batch_future.result())
@@ -0,0 +1,78 @@
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an exchange whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an exchange which keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests fail fast for `cooldown` seconds. Then a single probe request
+    is let through (half-open). If it succeeds, the circuit closes again,
+    otherwise it reopens for twice as long, up to `max_cooldown` seconds.
+
+    :param failure_threshold: Consecutive failures opening the circuit
+    :param cooldown: Seconds the circuit stays open the first time
+    :param max_cooldown: Maximum seconds the circuit stays open
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 10.0, max_cooldown: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def open_remaining(self) -> float:
+        """Returns the seconds until the circuit lets a probe request through"""
+        if self.opened_at is None:
+            return 0.0
+        if self._probing:
+            # Until the probe completes.
+            return self.cooldown
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def check(self):
+        """Raises CircuitOpenError if no request may be sent now, otherwise lets it through"""
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._probing):
+            raise CircuitOpenError(f"circuit {state}, {self.failures} consecutive failure(s)")
+        if state == HALF_OPEN:
+            self._probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.cooldown = self.base_cooldown
+        self._probing = False
+
+    def record_cancelled(self):
+        """Lets another probe through if the current one was cancelled before its outcome was known"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing:
+            # The probe failed, stay away for longer.
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self.opened_at = time.monotonic()
+            self._probing = False
+        elif self.opened_at is None and self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
@@ -0,0 +1,40 @@
+import statistics
+
+# Exchange name of pairs aggregated across several exchanges, e.g.
+# composite/btc/usd=bitstamp.net,kraken.com,coinbase.com
+COMPOSITE_EXCHANGE = "composite"
+
+# Samples further from the median than this many scaled median absolute
+# deviations are rejected.
+MAD_THRESHOLD = 3.0
+
+# Consistency constant making the MAD an estimator of the standard deviation
+# of normally distributed samples.
+MAD_SCALE = 1.4826
+
+# Samples within this relative distance from the median are never rejected,
+# so that venues quoting the exact same price don't make any spread an outlier.
+MIN_REJECT_DEVIATION = 0.001
+
+
+def reject_outliers(prices: list[float]) -> list[float]:
+    """Returns the prices within MAD_THRESHOLD scaled median absolute deviations from their median"""
+    if len(prices) < 3:
+        return prices
+    median = statistics.median(prices)
+    mad = statistics.median(abs(price - median) for price in prices)
+    threshold = max(MAD_THRESHOLD * MAD_SCALE * mad, MIN_REJECT_DEVIATION * abs(median))
+    return [price for price in prices if abs(price - median) <= threshold]
+
+
+def composite_price(prices: list[float], quorum: int) -> float | None:
+    """
+    Combines prices of the same pair sampled on different exchanges in the same tick.
+
+    Outliers are rejected and the median of the remaining prices is returned,
+    or None if fewer than `quorum` prices remain.
+    """
+    accepted = reject_outliers(prices)
+    if len(accepted) < quorum:
+        return None
+    return statistics.median(accepted)
@@ -1,10 +1,21 @@
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
 import json
+import logging
 from pathlib import Path
 from sapphirepy import sapphire
-from web3 import Web3
+from web3 import AsyncWeb3, Web3
 from web3.middleware import SignAndSendRawMiddlewareBuilder
+from web3.providers import AsyncHTTPProvider, WebSocketProvider
+
+from .RpcBatcher import RpcBatcher
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections pooled for the async JSON-RPC reads.
+RPC_CONNECTIONS = 8
+RPC_TIMEOUT = 30.0
 
 class ContractUtility:
     """
@@ -29,9 +40,42 @@ class ContractUtility:
         self.w3 = sapphire.wrap(w3, account) # Test account should be used for sapphire-localnet only. Workaround for: https://github.com/oasisprotocol/sapphire-paratime/issues/637
         self.w3.eth.default_account = account.address
 
+        # Reads are made on the event loop, coalesced into JSON-RPC batches.
+        async_w3 = AsyncWeb3(WebSocketProvider(self.network) if self.network.startswith("ws:") else AsyncHTTPProvider(self.network))
+        self.async_w3 = sapphire.wrap(async_w3, account)
+        self.async_w3.eth.default_account = account.address
+        self.rpc_batcher = RpcBatcher(self.async_w3)
+
+    async def connect(self):
+        """
+        Opens the connections of the async web3 instance.
+
+        HTTP requests share a pool of keep-alive connections instead of
+        opening a new one per request.
+        """
+        provider = self.async_w3.provider
+        if isinstance(provider, AsyncHTTPProvider):
+            await provider.cache_async_session(ClientSession(
+                raise_for_status=True,
+                connector=TCPConnector(limit=RPC_CONNECTIONS),
+                timeout=ClientTimeout(total=RPC_TIMEOUT),
+            ))
+        elif isinstance(provider, WebSocketProvider) and not await provider.is_connected():
+            await provider.connect()
+
+    async def aclose(self):
+        provider = self.async_w3.provider
+        if isinstance(provider, (AsyncHTTPProvider, WebSocketProvider)):
+            await provider.disconnect()
+
+    @staticmethod
+    def artifact_path(contract_name: str) -> Path:
+        """Returns the path of the contract's forge build artifact"""
+        return (Path(__file__).parent.parent.parent / "contracts" / "out" / f"{contract_name}.sol" / f"{contract_name}.json").resolve()
+
     def get_contract(contract_name: str) -> (str, str):
         """Fetches ABI of the given contract from the contracts folder"""
-        output_path = (Path(__file__).parent.parent.parent / "contracts" / "out" / f"{contract_name}.sol" / f"{contract_name}.json").resolve()
+        output_path = ContractUtility.artifact_path(contract_name)
         contract_data = ""
         with open(output_path, "r") as file:
             contract_data = json.load(file)
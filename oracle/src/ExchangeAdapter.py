@@ -0,0 +1,191 @@
+import itertools
+import json
+import logging
+import typing
+from dataclasses import dataclass, field
+
+import httpx
+
+from .ExchangeBatcher import PairKey
+from .ExchangeClient import EXCHANGE_CLIENTS
+
+logger = logging.getLogger(__name__)
+
+# Keys of JSON objects and indices of arrays leading to a value in a
+# response. FIRST steps into the first value of an object.
+Path = tuple[str | int, ...]
+FIRST = "*"
+
+
+def lookup(data: typing.Any, path: Path) -> typing.Any:
+    """Returns the value at the path in the decoded JSON response"""
+    for part in path:
+        data = next(iter(data.values())) if part == FIRST else data[part]
+    return data
+
+
+def response_error(data: typing.Any) -> typing.Any:
+    """Returns the error reported in the response body, if any"""
+    return data.get("error") if isinstance(data, dict) else None
+
+
+@dataclass(frozen=True)
+class BulkEndpoint:
+    """
+    Endpoint returning the tickers of many pairs in a single response.
+
+    :param path: URL path
+    :param params: Query parameter templates, formatted with {symbols}
+    :param encoding: How {symbols} is encoded, "json" for a JSON array or "," for a comma-separated list
+    :param tickers: Path to the tickers, either an array or an object keyed by symbol
+    :param key: Field of an array's tickers holding their symbol
+    :param keys: Templates of the symbols a pair may be returned under
+    :param price: Path to the price within a ticker
+    :param max_symbols: Maximum symbols per request. None for no limit
+    :param weight: Rate limit weight of a request
+    :param symbol_weight: Additional weight of each requested symbol
+    :param max_weight: Maximum weight of a request
+    """
+    path: str
+    price: Path
+    params: dict[str, str] = field(default_factory=dict)
+    encoding: str = ","
+    tickers: Path = ()
+    key: str | None = None
+    keys: tuple[str, ...] = ("{symbol}",)
+    max_symbols: int | None = None
+    weight: int = 1
+    symbol_weight: int = 0
+    max_weight: int | None = None
+
+
+@dataclass(frozen=True)
+class ExchangeAdapter:
+    """
+    Declarative description of an exchange's public REST ticker API.
+
+    Templates are formatted with the pair's {base} and {quote} asset in
+    lower case, {BASE} and {QUOTE} in upper case and its {symbol} on the
+    exchange. Requests are sent with the exchange's shared ExchangeClient.
+
+    :param exchange: Name of the exchange and its client
+    :param symbol: Template of a pair's symbol
+    :param path: URL path template of the single-pair ticker
+    :param price: Path to the price in the single-pair ticker
+    :param params: Query parameter templates of the single-pair ticker
+    :param weight: Rate limit weight of a single-pair request
+    :param aliases: Exchange-specific codes of assets, also matched in bulk responses
+    :param bulk: Multi-pair ticker endpoint, if the exchange has one
+    """
+    exchange: str
+    symbol: str
+    path: str
+    price: Path
+    params: dict[str, str] = field(default_factory=dict)
+    weight: int = 1
+    aliases: dict[str, str] = field(default_factory=dict)
+    bulk: BulkEndpoint | None = None
+
+    @staticmethod
+    def _format(template: str, pair_base: str, pair_quote: str, **values) -> str:
+        return template.format(base=pair_base.lower(), quote=pair_quote.lower(), BASE=pair_base.upper(), QUOTE=pair_quote.upper(), **values)
+
+    def format(self, template: str, pair_base: str, pair_quote: str) -> str:
+        return self._format(template, pair_base, pair_quote, symbol=self._format(self.symbol, pair_base, pair_quote))
+
+    def result_keys(self, pair_base: str, pair_quote: str) -> set[str]:
+        """Returns the symbols the pair may be returned under by the bulk endpoint"""
+        bases = {pair_base.upper(), self.aliases.get(pair_base.upper(), pair_base.upper())}
+        quotes = {pair_quote.upper(), self.aliases.get(pair_quote.upper(), pair_quote.upper())}
+        return {
+            self.format(template, base, quote)
+            for template, base, quote in itertools.product(self.bulk.keys, bases, quotes)
+        }
+
+    async def fetch(self, pair_base: str, pair_quote: str) -> float | None:
+        try:
+            response = await EXCHANGE_CLIENTS[self.exchange].get(
+                self.format(self.path, pair_base, pair_quote),
+                params={name: self.format(value, pair_base, pair_quote) for name, value in self.params.items()} or None,
+                weight=self.weight,
+            )
+            if response.status_code != 200:
+                logger.warning("Error fetching %s price: HTTP %d", self.exchange, response.status_code)
+                return None
+            data = response.json()
+            try:
+                return float(lookup(data, self.price))
+            except (KeyError, IndexError, StopIteration, TypeError):
+                logger.warning("Error fetching %s price: %s", self.exchange, response_error(data) or "Unknown error")
+        except httpx.TimeoutException:
+            logger.warning("Error fetching %s price: timeout", self.exchange)
+        except Exception as e:
+            logger.warning("Error fetching %s price: %s", self.exchange, e)
+
+    async def fetch_bulk(self, pairs: list[PairKey]) -> dict[PairKey, float] | None:
+        bulk = self.bulk
+        symbols = [self.format(self.symbol, base, quote) for base, quote in pairs]
+        wanted = {key: pair for pair in pairs for key in self.result_keys(*pair)}
+        prices = {}
+        try:
+            chunk_size = bulk.max_symbols or len(symbols) or 1
+            for i in range(0, len(symbols), chunk_size):
+                chunk = symbols[i:i+chunk_size]
+                encoded = json.dumps(chunk, separators=(',', ':')) if bulk.encoding == "json" else bulk.encoding.join(chunk)
+                weight = bulk.weight + bulk.symbol_weight * len(chunk)
+                response = await EXCHANGE_CLIENTS[self.exchange].get(
+                    bulk.path,
+                    params={name: value.format(symbols=encoded) for name, value in bulk.params.items()} or None,
+                    weight=min(weight, bulk.max_weight) if bulk.max_weight is not None else weight,
+                )
+                if response.status_code != 200:
+                    logger.warning("Error fetching %s prices: HTTP %d", self.exchange, response.status_code)
+                    return None
+                data = response.json()
+                if response_error(data):
+                    # E.g. on Kraken, a single unknown pair fails the whole request.
+                    logger.warning("Error fetching %s prices: %s", self.exchange, response_error(data))
+                    return None
+                tickers = lookup(data, bulk.tickers)
+                if bulk.key is not None:
+                    tickers = {ticker.get(bulk.key): ticker for ticker in tickers}
+                for key in wanted.keys() & tickers.keys():
+                    prices[wanted[key]] = float(lookup(tickers[key], bulk.price))
+            return prices
+        except httpx.TimeoutException:
+            logger.warning("Error fetching %s prices: timeout", self.exchange)
+        except Exception as e:
+            logger.warning("Error fetching %s prices: %s", self.exchange, e)
+
+
+# Exchanges supported by --pair. Only the adapters of the configured
+# exchanges are wired up to a batcher and a stream.
+EXCHANGE_ADAPTERS = {
+    'binance.com': ExchangeAdapter(
+        'binance.com', '{BASE}{QUOTE}', '/api/v3/ticker', ('lastPrice',), params={'symbol': '{symbol}'}, weight=4,
+        # At most 100 symbols weighing 4 each, capped at 200 for more than 50 symbols.
+        bulk=BulkEndpoint('/api/v3/ticker', ('lastPrice',), params={'symbols': '{symbols}'}, encoding="json", key='symbol',
+                          max_symbols=100, weight=0, symbol_weight=4, max_weight=200),
+    ),
+    'binance.us': ExchangeAdapter(
+        'binance.us', '{BASE}{QUOTE}', '/api/v3/ticker', ('lastPrice',), params={'symbol': '{symbol}'}, weight=4,
+        bulk=BulkEndpoint('/api/v3/ticker', ('lastPrice',), params={'symbols': '{symbols}'}, encoding="json", key='symbol',
+                          max_symbols=100, weight=0, symbol_weight=4, max_weight=200),
+    ),
+    'kraken.com': ExchangeAdapter(
+        # Results are keyed by Kraken's own pair names, 'c' is the last trade closed.
+        'kraken.com', '{base}{quote}', '/0/public/Ticker', ('result', FIRST, 'c', 0), params={'pair': '{symbol}'},
+        # Legacy asset codes which differ from the common ticker symbol.
+        aliases={'BTC': 'XBT', 'DOGE': 'XDG'},
+        bulk=BulkEndpoint('/0/public/Ticker', ('c', 0), params={'pair': '{symbols}'}, tickers=('result',),
+                          keys=('{BASE}{QUOTE}', 'X{BASE}Z{QUOTE}', 'X{BASE}X{QUOTE}')),
+    ),
+    # Coinbase has no public multi-product ticker, so its pairs are only
+    # deduplicated and fetched concurrently.
+    'coinbase.com': ExchangeAdapter('coinbase.com', '{BASE}-{QUOTE}', '/products/{symbol}/ticker', ('price',)),
+    'bitstamp.net': ExchangeAdapter(
+        'bitstamp.net', '{base}{quote}', '/api/v2/ticker/{symbol}/', ('last',),
+        # Without a pair, Bitstamp returns tickers of all its markets.
+        bulk=BulkEndpoint('/api/v2/ticker/', ('last',), key='pair', keys=('{BASE}/{QUOTE}',)),
+    ),
+}
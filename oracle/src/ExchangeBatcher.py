@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import typing
+
+logger = logging.getLogger(__name__)
+
+# (pair_base, pair_quote) as passed by the caller.
+PairKey = tuple[str, str]
+Fetcher = typing.Callable[[str, str], typing.Awaitable[float | None]]
+BulkFetcher = typing.Callable[[list[PairKey]], typing.Awaitable[dict[PairKey, float] | None]]
+
+
+class ExchangeBatcher:
+    """
+    Coalesces price requests of all pairs observed on a single exchange.
+
+    Requests arriving within `window` seconds of the first one are merged
+    into a single bulk request and the parsed prices are fanned out to each
+    waiting caller. If the exchange has no bulk endpoint or the bulk request
+    fails, the distinct pairs are fetched concurrently one by one.
+
+    :param fetcher: Single-pair fetcher
+    :param bulk_fetcher: Multi-pair fetcher, returns None on failure
+    :param window: Seconds to wait for other pairs to join the batch
+    """
+
+    def __init__(self, fetcher: Fetcher, bulk_fetcher: BulkFetcher | None = None, window: float = 0.1):
+        self.fetcher = fetcher
+        self.bulk_fetcher = bulk_fetcher
+        self.window = window
+        self._pending: dict[PairKey, list[asyncio.Future]] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    async def fetch(self, pair_base: str, pair_quote: str) -> float | None:
+        """Fetches the price of the given pair as part of the next batch"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault((pair_base, pair_quote), []).append(future)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+
+        try:
+            prices = await self._fetch_all(list(pending.keys()))
+        except Exception as e:
+            logger.warning("Error fetching batch of %d pairs: %s", len(pending), e)
+            prices = {}
+
+        for key, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(prices.get(key))
+
+    async def _fetch_all(self, keys: list[PairKey]) -> dict[PairKey, float]:
+        prices = {}
+        if self.bulk_fetcher is not None and len(keys) > 1:
+            prices = await self.bulk_fetcher(keys) or {}
+
+        # Pairs the bulk response didn't cover are fetched individually.
+        missing = [key for key in keys if key not in prices]
+        results = await asyncio.gather(*(self.fetcher(*key) for key in missing))
+        prices.update(zip(missing, results))
+        return prices
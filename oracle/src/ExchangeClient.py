@@ -0,0 +1,198 @@
+import asyncio
+import collections
+import httpx
+import itertools
+import time
+import typing
+
+from .CircuitBreaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from .Metrics import CIRCUIT_STATE, FETCH_ERRORS, FETCH_HEDGES, FETCH_SECONDS
+from .RateLimiter import BACKOFF_STATUSES, RateLimiter
+
+# Latency samples the hedging delay is derived from and the number needed to trust it.
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+# Values of the circuit state metric.
+CIRCUIT_STATES = [CLOSED, HALF_OPEN, OPEN]
+
+
+class ExchangeClient:
+    """
+    Long-lived async HTTP client for a single exchange.
+
+    Connections are kept alive and reused between fetches, so the TLS
+    handshake is paid once per pooled connection instead of on every request.
+    HTTP/2 is negotiated via ALPN and transparently falls back to HTTP/1.1 if
+    the exchange doesn't support it.
+
+    If the exchange has mirrors, a request which hasn't been answered
+    within the p95 latency of the recent ones is hedged with a second one
+    to the next mirror and the first response wins. Requests fail fast with
+    CircuitOpenError while the exchange's circuit breaker is open.
+
+    :param base_url: Scheme and host of the exchange API
+    :param http2: Whether to offer HTTP/2 when connecting
+    :param timeout: Per-request timeout in seconds
+    :param max_concurrency: Maximum number of requests in flight
+    :param name: Exchange name the request metrics are labeled with. Defaults to `base_url`
+    :param rate: Request weight per second the exchange allows. None for no limit
+    :param burst: Request weight the exchange allows in a burst
+    :param mirrors: Alternate base URLs serving the same API
+    :param hedge_delay: Seconds before hedging until enough latencies were sampled
+    """
+
+    def __init__(self,
+                 base_url: str,
+                 http2: bool = True,
+                 timeout: float = 5.0,
+                 max_concurrency: int = 8,
+                 name: str = "",
+                 rate: float | None = None,
+                 burst: float = 1.0,
+                 mirrors: list[str] | None = None,
+                 hedge_delay: float = 1.0):
+        self.base_url = base_url
+        self.name = name or base_url
+        self.http2 = http2
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.limiter = RateLimiter(rate, burst)
+        self.breaker = CircuitBreaker()
+        self.mirrors = mirrors or []
+        self.default_hedge_delay = hedge_delay
+        self.latencies = collections.deque(maxlen=HEDGE_WINDOW)
+        self._mirror_index = itertools.count()
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def _get_client(self, base_url: str) -> httpx.AsyncClient:
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = self._clients[base_url] = httpx.AsyncClient(
+                base_url=base_url,
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return client
+
+    def hedge_delay(self) -> float:
+        """Returns the seconds after which a request is hedged, the p95 of the recent latencies"""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return self.default_hedge_delay
+        return sorted(self.latencies)[int(len(self.latencies) * 0.95)]
+
+    def unavailable_for(self) -> float:
+        """Returns the seconds until requests may be sent again, after a backoff or while the circuit is open"""
+        return max(self.limiter.backoff_remaining(), self.breaker.open_remaining())
+
+    async def get(self, path: str, params: typing.Any = None, weight: float = 1) -> httpx.Response:
+        """Issues a GET request of the given rate limit weight to the exchange over a pooled connection"""
+        self.breaker.check()
+        try:
+            await self.limiter.acquire(weight)
+            response = await self._hedged_get(path, params, weight)
+            self.limiter.report(response.status_code, response.headers.get("retry-after"))
+            if response.status_code >= 500 or response.status_code in BACKOFF_STATUSES:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled, e.g. by the fetch deadline or on shutdown, which says
+            # nothing about the exchange's health.
+            self.breaker.record_cancelled()
+            raise
+        finally:
+            CIRCUIT_STATE.set(CIRCUIT_STATES.index(self.breaker.state), exchange=self.name)
+
+    async def _hedged_get(self, path: str, params: typing.Any, weight: float) -> httpx.Response:
+        primary = asyncio.ensure_future(self._request(self.base_url, path, params))
+        if not self.mirrors:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+            if not done:
+                FETCH_HEDGES.inc(exchange=self.name)
+                # Mirrors share the rate limits of the exchange.
+                await self.limiter.acquire(weight)
+                mirror = self.mirrors[next(self._mirror_index) % len(self.mirrors)]
+                tasks.add(asyncio.ensure_future(self._request(mirror, path, params)))
+
+            # The first successful response wins, failures only if all requests fail.
+            while True:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    return primary.result()
+                tasks = pending
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _request(self, base_url: str, path: str, params: typing.Any) -> httpx.Response:
+        client = self._get_client(base_url)
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+            except httpx.TimeoutException:
+                FETCH_ERRORS.inc(exchange=self.name, kind="timeout")
+                raise
+            except Exception:
+                FETCH_ERRORS.inc(exchange=self.name, kind="error")
+                raise
+            finally:
+                FETCH_SECONDS.observe(time.perf_counter() - start, exchange=self.name)
+        if response.status_code >= 400:
+            FETCH_ERRORS.inc(exchange=self.name, kind="http")
+        else:
+            self.latencies.append(time.perf_counter() - start)
+        return response
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        self._semaphore = None
+        for client in clients.values():
+            await client.aclose()
+
+
+# One client per exchange, shared by all pairs observed on that exchange.
+# Rates follow the published public API limits, with Binance's in request
+# weight: 6000 per minute on binance.com and 1200 per minute on binance.us.
+EXCHANGE_CLIENTS = {
+    'binance.com': ExchangeClient('https://api.binance.com', name='binance.com', rate=100, burst=1000, mirrors=[
+        'https://api1.binance.com', 'https://api2.binance.com', 'https://api3.binance.com', 'https://api4.binance.com',
+    ]),
+    'binance.us': ExchangeClient('https://api.binance.us', name='binance.us', rate=20, burst=200),
+    'kraken.com': ExchangeClient('https://api.kraken.com', name='kraken.com', rate=1, burst=5),
+    'coinbase.com': ExchangeClient('https://api.exchange.coinbase.com', name='coinbase.com', rate=10, burst=15),
+    'bitstamp.net': ExchangeClient('https://www.bitstamp.net', name='bitstamp.net', rate=16, burst=100),
+}
+
+
+def configure_exchange_clients(timeout: float | None = None, max_concurrency: int | None = None):
+    """Overrides the request timeout and concurrency limits of all exchange clients"""
+    for client in EXCHANGE_CLIENTS.values():
+        if timeout is not None:
+            client.timeout = timeout
+        if max_concurrency is not None:
+            client.max_concurrency = max_concurrency
+
+
+async def close_exchange_clients():
+    for client in EXCHANGE_CLIENTS.values():
+        await client.aclose()
@@ -0,0 +1,156 @@
+from abc import ABC, abstractmethod
+import asyncio
+import json
+import logging
+import typing
+from websockets.asyncio.client import connect
+
+from .ExchangeBatcher import PairKey
+
+logger = logging.getLogger(__name__)
+
+
+class StreamAdapter(ABC):
+    """Exchange-specific subscription and message format of a public ticker WebSocket feed"""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    @abstractmethod
+    def symbol(self, pair_base: str, pair_quote: str) -> str:
+        pass
+
+    @abstractmethod
+    def subscribe_messages(self, symbols: list[str]) -> list[typing.Any]:
+        pass
+
+    @abstractmethod
+    def parse(self, message: typing.Any) -> list[tuple[str, float]]:
+        """Returns (symbol, price) tuples contained in the message"""
+        pass
+
+
+class BinanceStreamAdapter(StreamAdapter):
+    def symbol(self, pair_base: str, pair_quote: str) -> str:
+        return f"{pair_base.lower()}{pair_quote.lower()}"
+
+    def subscribe_messages(self, symbols: list[str]) -> list[typing.Any]:
+        return [{"method": "SUBSCRIBE", "params": [f"{s}@ticker" for s in symbols], "id": 1}]
+
+    def parse(self, message: typing.Any) -> list[tuple[str, float]]:
+        if isinstance(message, dict) and message.get("e") == "24hrTicker":
+            return [(message["s"].lower(), float(message["c"]))]
+        return []
+
+
+class KrakenStreamAdapter(StreamAdapter):
+    def symbol(self, pair_base: str, pair_quote: str) -> str:
+        return f"{pair_base.upper()}/{pair_quote.upper()}"
+
+    def subscribe_messages(self, symbols: list[str]) -> list[typing.Any]:
+        return [{"method": "subscribe", "params": {"channel": "ticker", "symbol": symbols}}]
+
+    def parse(self, message: typing.Any) -> list[tuple[str, float]]:
+        if isinstance(message, dict) and message.get("channel") == "ticker" and message.get("type") in ("snapshot", "update"):
+            return [(ticker["symbol"], float(ticker["last"])) for ticker in message["data"]]
+        return []
+
+
+class CoinbaseStreamAdapter(StreamAdapter):
+    def symbol(self, pair_base: str, pair_quote: str) -> str:
+        return f"{pair_base.upper()}-{pair_quote.upper()}"
+
+    def subscribe_messages(self, symbols: list[str]) -> list[typing.Any]:
+        return [{"type": "subscribe", "product_ids": symbols, "channels": ["ticker"]}]
+
+    def parse(self, message: typing.Any) -> list[tuple[str, float]]:
+        if isinstance(message, dict) and message.get("type") == "ticker":
+            return [(message["product_id"], float(message["price"]))]
+        return []
+
+
+class BitstampStreamAdapter(StreamAdapter):
+    CHANNEL_PREFIX = "live_trades_"
+
+    def symbol(self, pair_base: str, pair_quote: str) -> str:
+        return f"{pair_base.lower()}{pair_quote.lower()}"
+
+    def subscribe_messages(self, symbols: list[str]) -> list[typing.Any]:
+        return [{"event": "bts:subscribe", "data": {"channel": self.CHANNEL_PREFIX + s}} for s in symbols]
+
+    def parse(self, message: typing.Any) -> list[tuple[str, float]]:
+        if not isinstance(message, dict):
+            return []
+        if message.get("event") == "bts:request_reconnect":
+            raise ConnectionError("reconnect requested by server")
+        if message.get("event") == "trade" and message.get("channel", "").startswith(self.CHANNEL_PREFIX):
+            return [(message["channel"][len(self.CHANNEL_PREFIX):], float(message["data"]["price"]))]
+        return []
+
+
+EXCHANGE_STREAM_ADAPTERS = {
+    'binance.com': BinanceStreamAdapter('wss://stream.binance.com:9443/ws'),
+    'binance.us': BinanceStreamAdapter('wss://stream.binance.us:9443/ws'),
+    'kraken.com': KrakenStreamAdapter('wss://ws.kraken.com/v2'),
+    'coinbase.com': CoinbaseStreamAdapter('wss://ws-feed.exchange.coinbase.com'),
+    'bitstamp.net': BitstampStreamAdapter('wss://ws.bitstamp.net'),
+}
+
+
+class ExchangeStream:
+    """
+    Streams prices of the given pairs from the exchange's public WebSocket feed.
+
+    The connection is reestablished with exponential backoff whenever it
+    drops or stays silent for longer than `stale_timeout` seconds, and all
+    pairs are resubscribed. While `connected` is False, callers should fall
+    back to polling.
+
+    :param adapter: Exchange-specific message format
+    :param pairs: Pairs to subscribe to
+    :param on_price: Callback invoked with the pair and its new price
+    :param stale_timeout: Seconds without a message before reconnecting
+    :param max_reconnect_delay: Upper bound of the reconnect backoff
+    """
+
+    def __init__(self,
+                 adapter: StreamAdapter,
+                 pairs: list[PairKey],
+                 on_price: typing.Callable[[PairKey, float], None],
+                 stale_timeout: float = 30.0,
+                 max_reconnect_delay: float = 30.0):
+        self.adapter = adapter
+        self.on_price = on_price
+        self.stale_timeout = stale_timeout
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = False
+
+        self.symbols: dict[str, list[PairKey]] = {}
+        for pair in pairs:
+            self.symbols.setdefault(adapter.symbol(*pair), []).append(pair)
+
+    async def run(self):
+        reconnect_delay = 1.0
+        while True:
+            try:
+                async with connect(self.adapter.url) as websocket:
+                    for message in self.adapter.subscribe_messages(list(self.symbols.keys())):
+                        await websocket.send(json.dumps(message))
+
+                    while True:
+                        message = json.loads(await asyncio.wait_for(websocket.recv(), self.stale_timeout))
+                        for symbol, price in self.adapter.parse(message):
+                            if not self.connected:
+                                logger.info("Streaming prices from %s", self.adapter.url)
+                                self.connected = True
+                                reconnect_delay = 1.0
+                            for pair in self.symbols.get(symbol, []):
+                                self.on_price(pair, price)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Error streaming prices from %s: %r. Reconnecting in %.0fs.", self.adapter.url, e, reconnect_delay)
+
+            self.connected = False
+            await asyncio.sleep(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, self.max_reconnect_delay)
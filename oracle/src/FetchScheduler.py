@@ -0,0 +1,125 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import typing
+
+from .Metrics import FETCH_SKIPPED, TICK_LAG
+from .ExchangeClient import ExchangeClient
+
+logger = logging.getLogger(__name__)
+
+Tick = typing.Callable[[typing.Any], typing.Awaitable[None]]
+
+
+class ScheduleEntry:
+    def __init__(self, key: typing.Any, clients: list[ExchangeClient], phase: float, priority: int):
+        self.key = key
+        self.clients = clients
+        self.phase = phase
+        self.priority = priority
+        # Under overload, low priority entries only run every `stride` ticks.
+        self.stride = 1
+        self.ticks = 0
+        self.deadline: float | None = None  # Deadline of the tick being run
+        self.task: asyncio.Task | None = None
+
+
+class FetchScheduler:
+    """
+    Runs the fetch ticks of all pairs from a single task on monotonic deadlines.
+
+    Each entry ticks once per period at its phase offset into the period,
+    so that requests which can't be batched don't all hit the exchange at
+    the same moment. A tick is skipped if the previous one of the entry is
+    still running or if all of its exchanges are unavailable, i.e. backing
+    off after a 429 or 5xx response or with their circuit breaker open.
+    Entries with several exchanges, like composite pairs, still tick while
+    some of them are available and leave the rest to the fetch, see
+    PriceOracle.fetch_composite_price. While an exchange's rate limit is
+    exhausted, entries with a priority below the highest one only tick
+    every 2nd, 4th, ... period, up to `max_stride`, and recover once the
+    limit has room again.
+
+    :param period: Seconds between the ticks of an entry
+    :param tick: Coroutine function running a single tick of the given key
+    :param max_stride: Maximum number of periods between the ticks of a shed entry
+    """
+
+    def __init__(self, period: float, tick: Tick, max_stride: int = 16):
+        self.period = period
+        self.tick = tick
+        self.max_stride = max_stride
+        self.entries: dict[typing.Any, ScheduleEntry] = {}
+        self.top_priority: int | None = None
+        self._heap: list[tuple[float, int, ScheduleEntry]] = []
+        self._seq = itertools.count()
+
+    def add(self, key: typing.Any, clients: list[ExchangeClient], phase: float = 0.0, priority: int = 0):
+        """Schedules the key's ticks at the given offset into each period, starting with the next one"""
+        entry = ScheduleEntry(key, clients, phase % self.period, priority)
+        self.entries[key] = entry
+        self.top_priority = priority if self.top_priority is None else max(self.top_priority, priority)
+        heapq.heappush(self._heap, (self._next_deadline(entry, asyncio.get_event_loop().time()), next(self._seq), entry))
+
+    def _next_deadline(self, entry: ScheduleEntry, now: float) -> float:
+        deadline = now - now % self.period + entry.phase
+        return deadline if deadline > now else deadline + self.period
+
+    def _skip_reason(self, entry: ScheduleEntry) -> str | None:
+        """Returns why the entry's tick is skipped, if it is"""
+        if entry.task is not None and not entry.task.done():
+            return "overrun"
+        if entry.clients and all(client.unavailable_for() > 0 for client in entry.clients):
+            return "unavailable"
+
+        entry.ticks += 1
+        if entry.priority < self.top_priority:
+            if any(client.limiter.wait_time() > 0 for client in entry.clients):
+                entry.stride = min(self.max_stride, entry.stride * 2)
+            elif entry.stride > 1:
+                entry.stride //= 2
+            if entry.ticks % entry.stride != 0:
+                return "shed"
+        return None
+
+    def _dispatch(self, entry: ScheduleEntry, deadline: float):
+        reason = self._skip_reason(entry)
+        if reason is not None:
+            FETCH_SKIPPED.inc(pair=str(entry.key), reason=reason)
+            logger.debug("Skipping tick of %s: %s", entry.key, reason)
+            return
+        entry.deadline = deadline
+        entry.task = asyncio.create_task(self._run_tick(entry, deadline))
+
+    async def _run_tick(self, entry: ScheduleEntry, deadline: float):
+        loop = asyncio.get_running_loop()
+        TICK_LAG.observe(loop.time() - deadline)
+        try:
+            await self.tick(entry.key)
+        except Exception as e:
+            logger.exception("Error in tick of %s: %s", entry.key, e)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                if not self._heap:
+                    await asyncio.sleep(self.period)
+                    continue
+                deadline, _, entry = self._heap[0]
+                now = loop.time()
+                if deadline > now:
+                    # Entries added meanwhile are picked up within a period.
+                    await asyncio.sleep(min(deadline - now, self.period))
+                    continue
+                # Deadlines missed while the event loop was blocked are dropped.
+                next_deadline = deadline + self.period
+                if next_deadline <= now:
+                    next_deadline = self._next_deadline(entry, now)
+                heapq.heapreplace(self._heap, (next_deadline, next(self._seq), entry))
+                self._dispatch(entry, deadline)
+        finally:
+            for entry in self.entries.values():
+                if entry.task is not None:
+                    entry.task.cancel()
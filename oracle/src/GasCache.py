@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from web3 import AsyncWeb3, Web3
+from web3.contract.contract import ContractFunction
+from web3.types import TxParams
+
+logger = logging.getLogger(__name__)
+
+
+class GasCache:
+    """
+    Caches gas parameters of repeated contract calls.
+
+    The gas price is shared by all transactions and refreshed in the
+    background every `gas_price_ttl` seconds. Gas limits are estimated once
+    per contract and method, padded with `gas_margin`, and only re-estimated
+    after a transaction using them failed. Once warm, transactions are built
+    without any RPC calls. `warm` fetches the missing parameters on the
+    async web3 instance, so that building a transaction afterwards doesn't
+    block the event loop.
+
+    :param w3: Web3 instance used for building transactions
+    :param async_w3: Async web3 instance used for refreshing and estimating.
+        If None, the synchronous instance is used in a worker thread
+    :param gas_price_ttl: Seconds after which the gas price is refreshed
+    :param gas_margin: Multiplier applied to estimated gas limits
+    """
+
+    def __init__(self, w3: Web3, async_w3: AsyncWeb3 | None = None, gas_price_ttl: float = 30.0, gas_margin: float = 1.2):
+        self.w3 = w3
+        self.async_w3 = async_w3
+        self.gas_price_ttl = gas_price_ttl
+        self.gas_margin = gas_margin
+        self._gas_price: int | None = None
+        self._chain_id: int | None = None
+        self._gas_limits: dict[tuple[str, str], int] = {}  # (contract address, method) -> gas limit
+
+    @property
+    def gas_price(self) -> int:
+        if self._gas_price is None:
+            self._gas_price = self.w3.eth.gas_price
+        return self._gas_price
+
+    @property
+    def chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def gas_limit(self, contract_function: ContractFunction) -> int:
+        key = (contract_function.address, contract_function.fn_name)
+        if key not in self._gas_limits:
+            self._gas_limits[key] = int(contract_function.estimate_gas() * self.gas_margin)
+        return self._gas_limits[key]
+
+    async def warm(self, contract_function: ContractFunction | None = None):
+        """Fetches the gas price, chain ID and gas limit of the contract function which aren't cached yet"""
+        if self.async_w3 is None:
+            await asyncio.to_thread(self._warm_sync, contract_function)
+            return
+        if self._chain_id is None:
+            self._chain_id = await self.async_w3.eth.chain_id
+        if self._gas_price is None:
+            self._gas_price = await self.async_w3.eth.gas_price
+        if contract_function is None:
+            return
+        key = (contract_function.address, contract_function.fn_name)
+        if key not in self._gas_limits:
+            # Built with a placeholder gas limit, so that it isn't estimated synchronously.
+            tx_params = contract_function.build_transaction({'gas': 0, 'gasPrice': self._gas_price, 'chainId': self._chain_id})
+            del tx_params['gas']
+            self._gas_limits[key] = int(await self.async_w3.eth.estimate_gas(tx_params) * self.gas_margin)
+
+    def _warm_sync(self, contract_function: ContractFunction | None):
+        self.gas_price, self.chain_id
+        if contract_function is not None:
+            self.gas_limit(contract_function)
+
+    def invalidate(self, address: str, method: str):
+        """Forgets the gas limit of the method, e.g. after its transaction ran out of gas"""
+        self._gas_limits.pop((address, method), None)
+
+    def build_transaction(self, contract_function: ContractFunction) -> TxParams:
+        """Builds the transaction calling the contract function from cached gas parameters"""
+        return contract_function.build_transaction({
+            'gas': self.gas_limit(contract_function),
+            'gasPrice': self.gas_price,
+            'chainId': self.chain_id,
+        })
+
+    async def refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.gas_price_ttl)
+            try:
+                if self.async_w3 is None:
+                    self._gas_price = await asyncio.to_thread(lambda: self.w3.eth.gas_price)
+                else:
+                    self._gas_price = await self.async_w3.eth.gas_price
+            except Exception as e:
+                logger.warning("Error refreshing gas price: %s", e)
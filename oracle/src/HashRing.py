@@ -0,0 +1,68 @@
+import bisect
+import hashlib
+import typing
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring assigning keys, e.g. pairs, to nodes, e.g. workers.
+
+    Each node is placed on the ring at `replicas` points and a key belongs
+    to the first node point following the key's hash. Removing a node only
+    moves the keys it owned, spread over the remaining nodes, and the
+    assignment is the same in every process and across restarts.
+
+    :param nodes: Initial nodes
+    :param replicas: Number of points of each node on the ring
+    """
+
+    def __init__(self, nodes: typing.Iterable[typing.Hashable] = (), replicas: int = 64):
+        self.replicas = replicas
+        self._points: list[tuple[int, str]] = []  # Sorted (hash, node key) points
+        self._nodes: dict[str, typing.Hashable] = {}  # node key -> node
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, node: typing.Hashable) -> bool:
+        return str(node) in self._nodes
+
+    @property
+    def nodes(self) -> list[typing.Hashable]:
+        return list(self._nodes.values())
+
+    def add(self, node: typing.Hashable):
+        key = str(node)
+        if key in self._nodes:
+            return
+        self._nodes[key] = node
+        for i in range(self.replicas):
+            bisect.insort(self._points, (_hash(f"{key}#{i}"), key))
+
+    def remove(self, node: typing.Hashable):
+        key = str(node)
+        if self._nodes.pop(key, None) is None:
+            return
+        self._points = [point for point in self._points if point[1] != key]
+
+    def node(self, key: str) -> typing.Hashable | None:
+        """Returns the node owning the key, or None if the ring is empty"""
+        if not self._points:
+            return None
+        i = bisect.bisect(self._points, (_hash(key), "")) % len(self._points)
+        return self._nodes[self._points[i][1]]
+
+    def assign(self, keys: typing.Iterable[str]) -> dict[typing.Hashable, list[str]]:
+        """Returns the keys owned by each node, in their original order"""
+        assignment = {node: [] for node in self._nodes.values()}
+        for key in keys:
+            node = self.node(key)
+            if node is not None:
+                assignment[node].append(key)
+        return assignment
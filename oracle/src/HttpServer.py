@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import typing
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+@dataclass
+class HttpRequest:
+    method: str
+    path: str
+    query: dict[str, str]
+    headers: dict[str, str]  # lower-cased names
+
+
+@dataclass
+class HttpResponse:
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+Handler = typing.Callable[[HttpRequest], typing.Awaitable[HttpResponse]]
+
+
+class HttpServer:
+    """
+    Minimal asyncio HTTP/1.1 server for the oracle's read-only endpoints.
+
+    Supports keep-alive and GET requests without a body only, which is all
+    a metrics scraper or a price reader needs, without pulling in a web
+    framework.
+
+    :param host: Address to listen on
+    :param port: Port to listen on. 0 picks a free one
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 0):
+        self.host = host
+        self.port = port
+        self.routes: dict[str, Handler] = {}
+        self._server: asyncio.Server | None = None
+
+    def route(self, path: str, handler: Handler):
+        self.routes[path] = handler
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Serving %s on %s:%d", ", ".join(self.routes), self.host, self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self._write(writer, HttpResponse(400, b"bad request\n"))
+                    break
+                url = urlsplit(target)
+                request = HttpRequest(method, url.path, {k: v[0] for k, v in parse_qs(url.query).items()}, headers)
+
+                handler = self.routes.get(request.path)
+                if handler is None:
+                    response = HttpResponse(404, b"not found\n")
+                elif method not in ("GET", "HEAD"):
+                    response = HttpResponse(405, b"method not allowed\n")
+                else:
+                    try:
+                        response = await handler(request)
+                    except Exception as e:
+                        logger.exception("Error serving %s: %s", request.path, e)
+                        response = HttpResponse(500, b"internal error\n")
+                if method == "HEAD":
+                    response = HttpResponse(response.status, b"", response.content_type, {**response.headers, "Content-Length": str(len(response.body))})
+                await self._write(writer, response)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, response: HttpResponse):
+        headers = {"Content-Type": response.content_type, "Content-Length": str(len(response.body)), **response.headers}
+        head = f"HTTP/1.1 {response.status} {REASONS.get(response.status, '')}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1") + response.body)
+        await writer.drain()
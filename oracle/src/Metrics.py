@@ -0,0 +1,214 @@
+import asyncio
+import bisect
+import contextlib
+import logging
+import time
+import typing
+
+# Upper bounds of the latency histogram buckets in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Base of the metrics kept in memory and rendered in the Prometheus text format"""
+
+    TYPE = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), registry: "Registry | None" = None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple[str, ...], typing.Any] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _samples(self) -> typing.Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    TYPE = "gauge"
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS, registry: "Registry | None" = None):
+        super().__init__(name, help, labels, registry)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # Per-bucket counts, the sum and the count of the observed values.
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            state[0][i] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _samples(self) -> typing.Iterator[str]:
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, f'le="{bound}"')} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labels, key, 'le="+Inf"')} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric):
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+FETCH_SECONDS = Histogram("oracle_fetch_seconds", "Latency of exchange API requests", ("exchange",))
+FETCH_ERRORS = Counter("oracle_fetch_errors_total", "Failed exchange API requests by kind: timeout, http or error", ("exchange", "kind"))
+FETCH_HEDGES = Counter("oracle_fetch_hedges_total", "Exchange API requests hedged with a request to a mirror", ("exchange",))
+CIRCUIT_STATE = Gauge("oracle_exchange_circuit_state", "State of the exchange's circuit breaker: 0 closed, 1 half-open, 2 open", ("exchange",))
+OBSERVATION_AGE = Gauge("oracle_observation_age_seconds", "Seconds since the last price observation of the pair", ("pair",))
+SUBMIT_SECONDS = Histogram("oracle_submit_seconds", "Latency of observation submissions from queueing to inclusion", ("pair",))
+SUBMISSIONS = Counter("oracle_submissions_total", "Observation submissions by result: ok or failed", ("pair", "result"))
+GAS_USED = Counter("oracle_gas_used_total", "Gas used by the observation submissions of the feed", ("pair",))
+ROUND_AGE = Gauge("oracle_round_age_seconds", "Seconds since the last on-chain round of the feed", ("pair",))
+ROFL_SECONDS = Histogram("oracle_rofl_request_seconds", "Latency of requests to the ROFL backend", ("method",))
+ROFL_ERRORS = Counter("oracle_rofl_errors_total", "Failed requests to the ROFL backend", ("method",))
+EVENT_LOOP_LAG = Histogram("oracle_event_loop_lag_seconds", "Delay of event loop wake-ups behind schedule", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+FETCH_SKIPPED = Counter("oracle_fetch_skipped_total", "Fetch ticks skipped by reason: overrun, unavailable or shed", ("pair", "reason"))
+TICK_LAG = Histogram("oracle_tick_lag_seconds", "Delay of fetch ticks behind their scheduled deadline", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+SPAN_SECONDS = Histogram("oracle_span_seconds", "Duration of traced spans of the fetch, aggregate and submit path", ("span",))
+
+
+@contextlib.contextmanager
+def timed(histogram: Histogram, errors: Counter | None = None, **labels: str):
+    """Observes the duration of the block in the histogram and counts the exceptions it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if errors is not None:
+            errors.inc(**labels)
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+_tracing = False
+trace_logger = logging.getLogger("oracle.trace")
+
+
+def enable_tracing(enabled: bool = True):
+    """Logs every span with its duration and attributes, besides recording it in SPAN_SECONDS"""
+    global _tracing
+    _tracing = enabled
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: typing.Any):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        SPAN_SECONDS.observe(duration, span=name)
+        if _tracing:
+            trace_logger.info("span=%s duration=%.6f %s", name, duration, " ".join(f"{k}={v}" for k, v in attributes.items()))
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Measures how late the event loop wakes up a task sleeping for `interval` seconds"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` log records with the same message per
+    `interval` seconds. Messages are compared formatted, so that e.g. one
+    pair's repeated warnings don't suppress those of the other pairs. The
+    first record let through after some were dropped reports how many.
+
+    :param interval: Length of the rate limiting window in seconds
+    :param burst: Records of the same message let through per window
+    """
+
+    def __init__(self, interval: float = 60.0, burst: int = 10):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._windows: dict[tuple[str, str], list] = {}  # (logger, message) -> [window start, let through, dropped]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        try:
+            key = (record.name, record.getMessage())
+        except Exception:
+            # Reported by the handler once it formats the record.
+            key = (record.name, str(record.msg))
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            dropped = window[2] if window is not None else 0
+            window = self._windows[key] = [now, 0, 0]
+            if dropped:
+                record.msg = f"{record.msg} [{dropped} similar message(s) suppressed]"
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+
+def configure_logging(level: str):
+    """Logs records of at least the level to stderr, rate limited by RateLimitFilter"""
+    logging.basicConfig(level=level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Repeated errors, e.g. of an exchange which is down, are only logged a few times a minute.
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(RateLimitFilter())
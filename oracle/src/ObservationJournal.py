@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Kind, 7 bytes padding, feed ID, high and low 64 bits of the price or
+# answer, round ID, unix timestamp, volume. Values are int128, like the
+# answers of PackedAggregator.
+RECORD = struct.Struct("<B7xQqQqdd")
+VALUE_BITS = 128
+
+TICK = 1  # A price observation added to the feed's window
+CLEAR = 2  # The feed's window was emptied
+SUBMIT = 3  # An answer was queued for submission
+
+FSYNC_POLICIES = ("off", "periodic", "always")
+
+
+def feed_id(name: str) -> int:
+    """Returns the 64-bit ID the feed's records are journaled under"""
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+
+@dataclass
+class FeedState:
+    """State of a feed rebuilt from the journal"""
+    ticks: list[tuple[int, float, float | None]] = field(default_factory=list)  # (price, unix timestamp, volume) since the last clear
+    round_id: int = 0
+    answer: int | None = None
+    submitted_at: float | None = None
+
+
+class ObservationJournal:
+    """
+    Append-only journal of the observations and submissions of all feeds.
+
+    Records have a fixed width of RECORD.size bytes and are appended to
+    numbered segment files in `directory`. A new segment is started on each
+    open and once the current one reaches `segment_size` bytes, and only the
+    newest `max_segments` are kept. Replay maps the segments into memory and
+    ignores a torn record at the end of a segment. Values which don't fit
+    into VALUE_BITS are not journaled.
+
+    Records are buffered in memory until flush(). With sync, flush() also
+    fsyncs the segment, so that it survives a power loss and not only a
+    crash of the process. Unless `fsync` is "off", finished segments are
+    fsynced as well. flush() may run in a worker thread while records are
+    appended on the event loop.
+
+    :param directory: Directory of the segment files
+    :param segment_size: Size in bytes after which a new segment is started
+    :param max_segments: Number of segments to keep
+    :param fsync: One of FSYNC_POLICIES. The owner decides when to sync with "periodic" and "always"
+    """
+
+    # Versioned, so that segments of an older record layout are ignored.
+    SUFFIX = ".v2.journal"
+
+    def __init__(self, directory: str, segment_size: int = 16 * 2**20, max_segments: int = 8, fsync: str = "periodic"):
+        self.directory = directory
+        self.segment_size = segment_size - segment_size % RECORD.size
+        self.max_segments = max_segments
+        self.fsync = fsync
+        self._file = None
+        self._size = 0
+
+    def _segments(self) -> list[str]:
+        """Returns the paths of the segments, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(self.SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _rotate(self):
+        segments = self._segments()
+        index = int(os.path.basename(segments[-1])[:-len(self.SUFFIX)]) + 1 if segments else 1
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(os.path.join(self.directory, f"{index:08d}{self.SUFFIX}"), "ab")
+        self._size = 0
+        for path in self._segments()[:-self.max_segments]:
+            os.remove(path)
+
+    def _append(self, kind: int, feed: int, value: int, round_id: int, timestamp: float, volume: float | None):
+        if not -2**(VALUE_BITS - 1) <= value < 2**(VALUE_BITS - 1):
+            logger.warning("Not journaling value %d of feed %x, it exceeds %d bits", value, feed, VALUE_BITS)
+            return
+        if self._file is None or self._size >= self.segment_size:
+            self._rotate()
+        self._file.write(RECORD.pack(kind, feed, value >> 64, value & (2**64 - 1), round_id, timestamp, math.nan if volume is None else volume))
+        self._size += RECORD.size
+
+    def tick(self, feed: int, price: int, timestamp: float, volume: float | None = None):
+        self._append(TICK, feed, price, 0, timestamp, volume)
+
+    def clear(self, feed: int, timestamp: float):
+        self._append(CLEAR, feed, 0, 0, timestamp, None)
+
+    def submit(self, feed: int, round_id: int, answer: int, timestamp: float):
+        self._append(SUBMIT, feed, answer, round_id, timestamp, None)
+
+    def flush(self, sync: bool = False):
+        """Writes the buffered records to the segment and optionally fsyncs it"""
+        file = self._file
+        if file is None:
+            return
+        try:
+            file.flush()
+            if sync:
+                os.fsync(file.fileno())
+        except ValueError:
+            # Closed by a rotation meanwhile, which flushed it already.
+            pass
+
+    def close(self):
+        if self._file is not None:
+            self.flush(self.fsync != "off")
+            self._file.close()
+            self._file = None
+
+    def replay(self) -> dict[int, FeedState]:
+        """Rebuilds the window contents, last round and last answer of each journaled feed"""
+        feeds: dict[int, FeedState] = {}
+        for path in self._segments():
+            try:
+                with open(path, "rb") as file:
+                    size = os.fstat(file.fileno()).st_size
+                    size -= size % RECORD.size
+                    if size == 0:
+                        continue
+                    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view, view[:size] as records:
+                        for kind, feed, high, low, round_id, timestamp, volume in RECORD.iter_unpack(records):
+                            if kind not in (TICK, CLEAR, SUBMIT):
+                                continue
+                            value = high << 64 | low
+                            state = feeds.get(feed)
+                            if state is None:
+                                state = feeds[feed] = FeedState()
+                            if kind == TICK:
+                                state.ticks.append((value, timestamp, None if math.isnan(volume) else volume))
+                            elif kind == CLEAR:
+                                state.ticks.clear()
+                            elif kind == SUBMIT:
+                                state.round_id = max(state.round_id, round_id)
+                                state.answer = value
+                                state.submitted_at = timestamp
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable journal segment %s: %s", path, e)
+        return feeds
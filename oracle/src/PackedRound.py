@@ -0,0 +1,43 @@
+# Version reported by PackedAggregator, whose rounds are submitted as a
+# single packed word with submitPackedObservation.
+PACKED_AGGREGATOR_VERSION = 2
+
+ROUND_ID_BITS = 32
+DURATION_BITS = 32
+TIMESTAMP_BITS = 64
+ANSWER_BITS = 128
+
+
+def pack_round(round_id: int, answer: int, started_at: int, updated_at: int) -> int | None:
+    """
+    Packs the round into the argument of PackedAggregator.submitPackedObservation.
+
+    From the most significant bits, the word holds the round ID, the
+    round's duration, i.e. updated_at - started_at, updated_at and the
+    answer in two's complement. Returns None if a value doesn't fit, in
+    which case the round has to be submitted with submitObservation.
+    """
+    duration = updated_at - started_at
+    if not (0 <= round_id < 2**ROUND_ID_BITS
+            and 0 <= started_at
+            and 0 <= duration < 2**DURATION_BITS
+            and updated_at < 2**TIMESTAMP_BITS
+            and -2**(ANSWER_BITS - 1) <= answer < 2**(ANSWER_BITS - 1)):
+        return None
+    return (
+        round_id << (DURATION_BITS + TIMESTAMP_BITS + ANSWER_BITS)
+        | duration << (TIMESTAMP_BITS + ANSWER_BITS)
+        | updated_at << ANSWER_BITS
+        | answer & (2**ANSWER_BITS - 1)
+    )
+
+
+def unpack_round(packed: int) -> tuple[int, int, int, int]:
+    """Returns round ID, answer, started_at and updated_at of the packed round"""
+    answer = packed & (2**ANSWER_BITS - 1)
+    if answer >= 2**(ANSWER_BITS - 1):
+        answer -= 2**ANSWER_BITS
+    updated_at = packed >> ANSWER_BITS & (2**TIMESTAMP_BITS - 1)
+    duration = packed >> (TIMESTAMP_BITS + ANSWER_BITS) & (2**DURATION_BITS - 1)
+    round_id = packed >> (DURATION_BITS + TIMESTAMP_BITS + ANSWER_BITS)
+    return round_id, answer, updated_at - duration, updated_at
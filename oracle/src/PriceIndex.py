@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import typing
+from dataclasses import dataclass
+
+from .HttpServer import HttpRequest, HttpResponse, HttpServer
+
+# Upper bound of the seconds a long-polling request is held.
+MAX_WAIT = 60.0
+
+
+@dataclass(frozen=True)
+class RoundData:
+    """A round as returned by getRoundData of the aggregator contract"""
+    round_id: int
+    answer: int
+    started_at: int
+    updated_at: int
+
+    @classmethod
+    def from_call(cls, result: tuple) -> "RoundData":
+        round_id, answer, started_at, updated_at, _ = result
+        return cls(round_id, answer, started_at, updated_at)
+
+
+class FeedRounds:
+    __slots__ = ("address", "decimals", "rounds", "latest", "version", "_body")
+
+    def __init__(self):
+        self.address: str | None = None
+        self.decimals: int | None = None
+        self.rounds: dict[int, RoundData] = {}
+        self.latest: RoundData | None = None
+        self.version = 0
+        self._body: bytes | None = None  # JSON of the feed at the current version
+
+    def to_json(self, round_data: RoundData | None) -> dict | None:
+        if round_data is None:
+            return None
+        return {
+            "round_id": round_data.round_id,
+            "answer": round_data.answer,
+            "price": round_data.answer / 10**self.decimals if self.decimals is not None else None,
+            "started_at": round_data.started_at,
+            "updated_at": round_data.updated_at,
+        }
+
+
+class PriceIndex:
+    """
+    In-memory index of the latest and recent on-chain rounds of the feeds.
+
+    Rounds are recorded as the oracle's submissions succeed and backfilled
+    from the aggregator contracts on startup, and served as JSON, so that
+    consumers don't have to call latestRoundData or getRoundData over RPC.
+
+    Every change bumps a version which is served as the ETag. A request
+    with a matching If-None-Match header and a `wait` parameter is held
+    until the feed changes or `wait` seconds pass, so consumers can
+    long-poll for new rounds instead of polling.
+
+    :param history: Number of recent rounds kept per feed
+    """
+
+    def __init__(self, history: int = 16):
+        self.history = history
+        self.feeds: dict[str, FeedRounds] = {}
+        self.version = 0
+        # ETags from before a restart must not match the versions after it.
+        self._epoch = os.urandom(4).hex()
+        self._changed = asyncio.Event()
+        self._body: bytes | None = None  # JSON of all feeds at the current version
+
+    def _feed(self, name: str) -> FeedRounds:
+        feed = self.feeds.get(name)
+        if feed is None:
+            feed = self.feeds[name] = FeedRounds()
+        return feed
+
+    def _bump(self, feed: FeedRounds):
+        self.version += 1
+        feed.version = self.version
+        feed._body = None
+        self._body = None
+        # Wakes up the long-polling requests.
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def set_metadata(self, name: str, address: str, decimals: int):
+        feed = self._feed(name)
+        if (feed.address, feed.decimals) != (address, decimals):
+            feed.address, feed.decimals = address, decimals
+            self._bump(feed)
+
+    def record(self, name: str, round_data: RoundData):
+        """Adds the round of the feed, keeping the `history` most recent ones"""
+        feed = self._feed(name)
+        if feed.rounds.get(round_data.round_id) == round_data:
+            return
+        feed.rounds[round_data.round_id] = round_data
+        if len(feed.rounds) > self.history:
+            del feed.rounds[min(feed.rounds)]
+        if feed.latest is None or round_data.round_id >= feed.latest.round_id:
+            feed.latest = round_data
+        self._bump(feed)
+
+    def latest(self, name: str) -> RoundData | None:
+        feed = self.feeds.get(name)
+        return feed.latest if feed is not None else None
+
+    def round(self, name: str, round_id: int) -> RoundData | None:
+        feed = self.feeds.get(name)
+        return feed.rounds.get(round_id) if feed is not None else None
+
+    def etag(self, version: int) -> str:
+        return f'"{self._epoch}-{version}"'
+
+    async def _wait(self, request: HttpRequest, version: typing.Callable[[], int]) -> bool:
+        """Waits for a change if the client long-polls with its current ETag and returns whether it already has the current version"""
+        if request.headers.get("if-none-match") != self.etag(version()):
+            return False
+        try:
+            timeout = min(MAX_WAIT, float(request.query.get("wait", 0)))
+        except ValueError:
+            timeout = 0.0
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        current = version()
+        while version() == current and (remaining := deadline - loop.time()) > 0:
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return version() == current
+
+    def _response(self, body: bytes, version: int) -> HttpResponse:
+        return HttpResponse(body=body, content_type="application/json", headers={"ETag": self.etag(version), "Cache-Control": "no-cache"})
+
+    async def serve_feeds(self, request: HttpRequest) -> HttpResponse:
+        """Serves the latest round of every feed"""
+        if await self._wait(request, lambda: self.version):
+            return HttpResponse(304, headers={"ETag": self.etag(self.version)})
+        if self._body is None:
+            self._body = json.dumps({
+                name: {"address": feed.address, "decimals": feed.decimals, "latest": feed.to_json(feed.latest)}
+                for name, feed in self.feeds.items()
+            }).encode()
+        return self._response(self._body, self.version)
+
+    async def serve_feed(self, request: HttpRequest) -> HttpResponse:
+        """Serves the latest and recent rounds of the `pair` feed, or only its round `round`"""
+        feed = self.feeds.get(request.query.get("pair", ""))
+        if feed is None:
+            return HttpResponse(404, b"unknown pair\n")
+        if await self._wait(request, lambda: feed.version):
+            return HttpResponse(304, headers={"ETag": self.etag(feed.version)})
+
+        if "round" in request.query:
+            try:
+                round_data = feed.rounds.get(int(request.query["round"]))
+            except ValueError:
+                return HttpResponse(400, b"invalid round\n")
+            if round_data is None:
+                return HttpResponse(404, b"round not indexed\n")
+            return self._response(json.dumps(feed.to_json(round_data)).encode(), feed.version)
+
+        if feed._body is None:
+            feed._body = json.dumps({
+                "address": feed.address,
+                "decimals": feed.decimals,
+                "latest": feed.to_json(feed.latest),
+                "rounds": [feed.to_json(feed.rounds[round_id]) for round_id in sorted(feed.rounds, reverse=True)],
+            }).encode()
+        return self._response(feed._body, feed.version)
+
+    def add_routes(self, server: HttpServer):
+        server.route("/feeds", self.serve_feeds)
+        server.route("/feed", self.serve_feed)
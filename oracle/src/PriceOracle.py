@@ -1,96 +1,32 @@
 import asyncio
-import requests
+import logging
+import os
 import time
+import typing
 from web3 import Web3
-from web3.contract import Contract
+from web3.contract.contract import ContractFunction
 
+from .AggregationWindow import ESTIMATORS, AggregationWindow
+from .CompositeFeed import COMPOSITE_EXCHANGE, composite_price
 from .ContractUtility import ContractUtility
-from .RoflUtility import bech32_to_bytes
-from .RoflUtilityAppd import RoflUtilityAppd
-from .RoflUtilityLocalnet import RoflUtilityLocalnet
+from .ExchangeBatcher import ExchangeBatcher, PairKey
+from .ExchangeClient import EXCHANGE_CLIENTS, close_exchange_clients, configure_exchange_clients
+from .ExchangeAdapter import EXCHANGE_ADAPTERS
+from .FetchScheduler import FetchScheduler
+from .GasCache import GasCache
+from .HttpServer import HttpResponse, HttpServer
+from .Metrics import GAS_USED, OBSERVATION_AGE, REGISTRY, ROUND_AGE, SUBMISSIONS, SUBMIT_SECONDS, enable_tracing, monitor_event_loop_lag, span
+from .ObservationJournal import ObservationJournal, feed_id
+from .PackedRound import PACKED_AGGREGATOR_VERSION, pack_round
+from .PriceIndex import PriceIndex, RoundData
+from .RoflUtility import RoflUtility, bech32_to_bytes
+from .StateCache import StateCache
+from .SubmitPolicy import load_submit_policies, parse_pair_values
+from .TxSubmitter import SubmitResult, TxSubmitter
+
+logger = logging.getLogger(__name__)
 
 
-async def fetch_binance_com(pair_base: str, pair_quote: str) -> float:
-    try:
-        response = requests.get(f'https://api.binance.com/api/v3/ticker?symbol={pair_base.upper()}{pair_quote.upper()}')
-        if response.status_code == 200:
-            data = response.json()
-            return float(data['lastPrice'])
-        else:
-            print(f"Error fetching price: HTTP {response.status_code}")
-    except Exception as e:
-        print(f"Error fetching Binance.com price: {e}")
-
-async def fetch_binance_us(pair_base: str, pair_quote: str) -> float:
-    try:
-        response = requests.get(f'https://api.binance.us/api/v3/ticker?symbol={pair_base.upper()}{pair_quote.upper()}')
-        if response.status_code == 200:
-            data = response.json()
-            return float(data['lastPrice'])
-        else:
-            print(f"Error fetching price: HTTP {response.status_code}")
-    except Exception as e:
-        print(f"Error fetching Binance.us price: {e}")
-
-async def fetch_coinbase(pair_base: str, pair_quote: str) -> float:
-    try:
-        response = requests.get(f'https://api.exchange.coinbase.com/products/{pair_base.upper()}-{pair_quote.upper()}/ticker')
-        if response.status_code == 200:
-            data = response.json()
-            if 'price' in data:
-                return float(data['price'])
-            else:
-                print(f"Error fetching price: {data.get('error', 'Unknown error')}")
-        else:
-            print(f"Error fetching price: HTTP {response.status_code}")
-    except Exception as e:
-        print(f"Error fetching Coinbase price: {e}")
-
-async def fetch_kraken(pair_base: str, pair_quote: str) -> float:
-    try:
-        response = requests.get(f'https://api.kraken.com/0/public/Ticker?pair={pair_base}{pair_quote}')
-        if response.status_code == 200:
-            data = response.json()
-            if 'result' in data:
-                # Kraken returns results with pair names as keys
-                pair_data = list(data['result'].values())[0]
-                price = pair_data['c'][0]  # 'c' is the last trade closed array
-
-                # Store price with timestamp
-                return float(price)
-            else:
-                print(f"Error fetching price: {data.get('error', 'Unknown error')}")
-        else:
-            print(f"Error fetching price: HTTP {response.status_code}")
-    except Exception as e:
-        print(f"Error fetching Kraken price: {e}")
-
-async def fetch_bitstamp(pair_base: str, pair_quote: str) -> float:
-    try:
-        response = requests.get(f'https://www.bitstamp.net/api/v2/ticker/{pair_base.lower()}{pair_quote.lower()}/')
-        if response.status_code == 200:
-            data = response.json()
-            if 'last' in data:
-                # Bitstamp returns the last price directly
-                price = data['last']
-
-                # Store price with timestamp
-                return float(price)
-            else:
-                print(f"Error fetching price: {data.get('error', 'Unknown error')}")
-        else:
-            print(f"Error fetching price: HTTP {response.status_code}")
-    except Exception as e:
-        print(f"Error fetching Bitstamp price: {e}")
-
-EXCHANGE_FETCHERS = {
-    'binance.com': fetch_binance_com,
-    'binance.us': fetch_binance_us,
-    'kraken.com': fetch_kraken,
-    'coinbase.com': fetch_coinbase,
-    'bitstamp.net': fetch_bitstamp,
-}
-
 # Predeployed price directory contract addresses based on the network.
 DEFAULT_PRICE_FEED_ADDRESS = {
     "sapphire": None,
@@ -98,15 +34,34 @@ DEFAULT_PRICE_FEED_ADDRESS = {
     "sapphire-localnet": "0x5FbDB2315678afecb367f032d93F642f64180aa3",
 }
 
+# Maximum seconds the fetches of a period are spread over. Kept below the
+# BatchSubmitter window, so that the due observations still share a batch.
+FETCH_SPREAD = 1.0
+
+# Share of the fetch period a tick's fetches may take, counted from its deadline.
+FETCH_BUDGET = 0.8
+
 # Number of decimals stored on-chain.
 NUM_DECIMALS = 10
 
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+
+def submission_succeeded(result: typing.Any) -> bool:
+    """Checks the result of RoflUtility.submit_tx for a successful call"""
+    if not isinstance(result, dict):
+        return False
+    if result.get("tx_receipt") is not None:
+        return result["tx_receipt"]["status"] == 1
+    return isinstance(result.get("data"), dict) and "ok" in result["data"]
+
 class Pair:
-    def __init__(self, exchange: str, chain: str | None, pair_base: str, pair_quote: str):
+    def __init__(self, exchange: str, chain: str | None, pair_base: str, pair_quote: str, sources: list[str] | None = None):
         self.exchange = exchange
         self.chain = chain
         self.pair_base = pair_base
         self.pair_quote = pair_quote
+        # Exchanges the price is fetched from. Composite pairs combine several ones.
+        self.sources = sources if sources is not None else [exchange]
 
     def __str__(self):
         if self.chain:
@@ -125,6 +80,59 @@ class Pair:
         ))
 
 
+def parse_pairs(exchanges_pairs: str) -> list[Pair]:
+    """
+    Parses the comma-separated pairs of --pair, skipping invalid ones.
+
+    Raises ValueError if a composite pair lists fewer than two exchanges or
+    one more than once, as it would count twice towards the quorum.
+    """
+    pairs = []
+    for ep in exchanges_pairs.split(","):
+        # Exchange names following a composite pair extend its sources.
+        if "/" not in ep and pairs and pairs[-1].exchange == COMPOSITE_EXCHANGE:
+            pairs[-1].sources.append(ep)
+            continue
+
+        exchange: str
+        pair_base: str
+        pair_quote: str
+        chain: str | None = None
+        sources: list[str] | None = None
+        if "=" in ep:
+            ep, source = ep.split("=", 1)
+            sources = [source]
+        if ep.count("/") == 2:
+            [exchange, pair_base, pair_quote] = ep.split("/")
+        elif ep.count("/") == 3:
+            [exchange, chain, pair_base, pair_quote] = ep.split("/")
+        else:
+            logger.warning("Invalid pair format '%s'. Ignoring.", ep)
+            continue
+
+        if (exchange == COMPOSITE_EXCHANGE) != (sources is not None):
+            logger.warning("Invalid pair format '%s'. Only %s pairs list their exchanges. Ignoring.", ep, COMPOSITE_EXCHANGE)
+            continue
+
+        pairs.append(Pair(exchange, chain, pair_base, pair_quote, sources))
+
+    for pair in pairs:
+        if len(set(pair.sources)) != len(pair.sources):
+            raise ValueError(f"{pair} lists an exchange more than once: {','.join(pair.sources)}")
+        if pair.exchange == COMPOSITE_EXCHANGE and len(pair.sources) < 2:
+            raise ValueError(f"{pair} must combine at least two exchanges")
+    return pairs
+
+
+def create_rofl_utility(network_name: str, w3: Web3, appd_timeout: float = 60.0) -> RoflUtility:
+    """Returns the backend signing and submitting transactions on the network"""
+    if network_name == "sapphire-localnet":
+        from .RoflUtilityLocalnet import RoflUtilityLocalnet
+        return RoflUtilityLocalnet(w3)
+    from .RoflUtilityAppd import RoflUtilityAppd
+    return RoflUtilityAppd(timeout=appd_timeout)
+
+
 class PriceOracle:
     def __init__(self,
                  address: str,
@@ -133,30 +141,77 @@ class PriceOracle:
                  exchanges_pairs: str,
                  api_keys: str,
                  fetch_period: int,
-                 submit_period: int):
+                 submit_period: int,
+                 fetch_timeout: float = 5.0,
+                 ingest: str = "poll",
+                 appd_timeout: float = 60.0,
+                 batch_submit: bool = False,
+                 state_dir: str | None = None,
+                 estimator: str = "median",
+                 window_size: int = 1024,
+                 window_horizon: float | None = None,
+                 deviation_bps: str | None = None,
+                 heartbeat: str | None = None,
+                 submit_policy_file: str | None = None,
+                 metrics_port: int | None = None,
+                 trace: bool = False,
+                 fetch_priority: str | None = None,
+                 journal_fsync: str = "periodic",
+                 read_port: int | None = None,
+                 read_history: int = 16,
+                 aggregator: str = "simple",
+                 shard: list[str] | None = None,
+                 tx_submitter: TxSubmitter | None = None):
         contract_utility = ContractUtility(network_name)
-        self.contract_abi, self.contract_bytecode = ContractUtility.get_contract('SimpleAggregator')
+        self.state_cache = StateCache(os.path.join(state_dir, "state.json") if state_dir else None)
+        # Raw observations and submissions, to rebuild the aggregation windows after a restart.
+        self.journal = ObservationJournal(os.path.join(state_dir, "journal"), fsync=journal_fsync) if state_dir else None
+        self.contract_abi, self.contract_bytecode = self.state_cache.get_contract('SimpleAggregator')
+        self.packed_contract_abi, _ = self.state_cache.get_contract('PackedAggregator')
+        self.aggregator = aggregator # Aggregator contract deployed for pairs without one
+        self.network_name = network_name
         self.contracts = {} # pair -> contract instance
+        self.num_decimals = {} # pair -> decimals of the aggregator contract
+        self.versions = {} # pair -> version of the aggregator contract
+        self.round_ids = {} # pair -> last round ID used for the aggregator contract
+        self.feed_keys = {} # pair -> state cache key of the pairs looked up in the price feed directory
+        self.app_id_bytes = None
+        self.observations = {} # pair -> AggregationWindow of the current round
+        self.last_observed = {} # pair -> event loop time of the last observation
+        self.round_updated_at = {} # pair -> updatedAt, in unix time, of the last on-chain round
+        self.estimator = ESTIMATORS[estimator]
+        self.window_size = window_size
+        self.window_horizon = window_horizon
+
+        try:
+            self.pairs = parse_pairs(exchanges_pairs)
+        except ValueError as e:
+            logger.error("Invalid pair: %s", e)
+            exit(1)
+        # Pairs observed by this process. The others are observed by other workers.
+        self.owned = [pair for pair in self.pairs if shard is None or str(pair) in shard]
 
-        self.pairs = []
-        for ep in exchanges_pairs.split(","):
-            exchange: str
-            pair_base: str
-            pair_quote: str
-            chain: str | None = None
-            if ep.count("/") == 2:
-                [exchange, pair_base, pair_quote] = ep.split("/")
-            elif ep.count("/") == 3:
-                [exchange, chain, pair_base, pair_quote] = ep.split("/")
-            else:
-                print(f"warning: invalid pair format '{ep}'. Ignoring.")
-                continue
-
-            if exchange not in EXCHANGE_FETCHERS:
-                print(f"error: unsupported exchange {exchange}. Possible values are: {" ".join(EXCHANGE_FETCHERS.keys())}")
-                exit(1)
-
-            self.pairs.append(Pair(exchange, chain, pair_base, pair_quote))
+        for pair in self.pairs:
+            for exchange in pair.sources:
+                if exchange not in EXCHANGE_ADAPTERS:
+                    logger.error("Unsupported exchange %s. Possible values are: %s", exchange, " ".join(EXCHANGE_ADAPTERS.keys()))
+                    exit(1)
+
+        try:
+            policies = load_submit_policies([str(pair) for pair in self.pairs], deviation_bps, heartbeat, submit_policy_file)
+        except (OSError, ValueError) as e:
+            logger.error("Invalid submit policy: %s", e)
+            exit(1)
+        self.policies = {pair: policies[str(pair)] for pair in self.pairs} # pair -> SubmitPolicy
+
+        default_priority, priorities = parse_pair_values(fetch_priority)
+        unknown = priorities.keys() - {str(pair) for pair in self.pairs}
+        if unknown:
+            logger.error("Fetch priority for unknown pair(s) %s", ", ".join(sorted(unknown)))
+            exit(1)
+        self.priorities = {pair: int(priorities.get(str(pair), default_priority or 0)) for pair in self.pairs} # pair -> fetch priority
+        self.journal_ids = {pair: feed_id(f"{network_name}/{price_feed_address.lower()}/{pair}") for pair in self.pairs} # pair -> journal feed ID
+        self.last_submit = {} # pair -> event loop time of the last submit period boundary
 
         self.api_key = {}
         if api_keys is not None and len(api_keys) > 0:
@@ -166,131 +221,611 @@ class PriceOracle:
 
         self.fetch_period = fetch_period
         self.submit_period = submit_period
+        configure_exchange_clients(timeout=fetch_timeout)
+        self.scheduler = FetchScheduler(fetch_period, self.observe)
+
+        # Pairs on the same exchange share a batcher so that the ones due in
+        # the same tick are served by a single bulk request.
+        self.batchers = {
+            exchange: ExchangeBatcher(EXCHANGE_ADAPTERS[exchange].fetch, EXCHANGE_ADAPTERS[exchange].fetch_bulk if EXCHANGE_ADAPTERS[exchange].bulk else None)
+            for exchange in {exchange for pair in self.pairs for exchange in pair.sources}
+        }
+
+        # In stream mode, prices are pushed by the exchanges' WebSocket feeds
+        # and REST polling is only used while a feed is down.
+        self.streams = {}
+        self.stream_prices = {} # (exchange, (base, quote)) -> latest streamed price
+        self.stream_pairs = {} # (exchange, (base, quote)) -> pairs observing the streamed price directly
+        if ingest == "stream":
+            # Imported on demand, like the other optional parts, to keep the cold start short.
+            from .ExchangeStream import EXCHANGE_STREAM_ADAPTERS, ExchangeStream
+            # Pairs taken over from another worker later on are polled.
+            for pair in self.owned:
+                if pair.exchange != COMPOSITE_EXCHANGE:
+                    self.stream_pairs.setdefault((pair.exchange, (pair.pair_base, pair.pair_quote)), []).append(pair)
+            for exchange in {exchange for pair in self.owned for exchange in pair.sources}:
+                keys = {(p.pair_base, p.pair_quote) for p in self.owned if exchange in p.sources}
+                self.streams[exchange] = ExchangeStream(
+                    EXCHANGE_STREAM_ADAPTERS[exchange],
+                    list(keys),
+                    lambda key, price, exchange=exchange: self.record_stream_price(exchange, key, price),
+                )
+
         if address is not None and len(address) > 0:
-            for a in address.split(","):
-                self.contracts[self.pairs[0]] = contract_utility.w3.eth.contract(address=a, abi=self.contract_abi, bytecode=self.contract_bytecode)
+            for pair, a in zip(self.pairs, address.split(",")):
+                self.contracts[pair] = contract_utility.w3.eth.contract(address=a, abi=self.contract_abi, bytecode=self.contract_bytecode)
 
-        price_feed_abi, _ = ContractUtility.get_contract('PriceFeedDirectory')
+        price_feed_abi, _ = self.state_cache.get_contract('PriceFeedDirectory')
         self.price_feed_contract = contract_utility.w3.eth.contract(address=price_feed_address, abi=price_feed_abi)
+        self.contract_utility = contract_utility
         self.w3 = contract_utility.w3
-        self.rofl_utility = RoflUtilityLocalnet(self.w3) if network_name == "sapphire-localnet" else RoflUtilityAppd()
-
-
-
-    def detect_contract(self, pair: Pair, app_id_bytes: bytes):
-        address = self.price_feed_contract.functions.feeds(
-            pair.compute_feed_hash(app_id_bytes)
-        ).call()
-
-        if address == '0x0000000000000000000000000000000000000000':
-            return
+        # View calls are coalesced into JSON-RPC batches on the event loop.
+        self.rpc_batcher = contract_utility.rpc_batcher
+        self.rofl_utility = create_rofl_utility(network_name, self.w3, appd_timeout)
+        # A worker's transactions are submitted by the coordinator instead, see ShardCoordinator.
+        self.tx_submitter = tx_submitter if tx_submitter is not None else TxSubmitter(self.rofl_utility)
+        self.gas_cache = GasCache(self.w3, contract_utility.async_w3)
+
+        # Observations of all due pairs are submitted in a single
+        # PriceFeedDirectory.submitObservations transaction.
+        self.batch_submitter = None
+        if batch_submit:
+            from .BatchSubmitter import BatchSubmitter
+            self.batch_submitter = BatchSubmitter(self.price_feed_contract, self.gas_cache, self.tx_submitter)
+
+        # Prometheus metrics are served on /metrics if a port is given.
+        self.metrics_server = None
+        if metrics_port is not None:
+            self.metrics_server = HttpServer(port=metrics_port)
+            self.metrics_server.route("/metrics", self.serve_metrics)
+        enable_tracing(trace)
+
+        # Latest and recent rounds are served to consumers on /feeds and /feed if a port is given.
+        self.price_index = None
+        self.read_server = None
+        if read_port is not None:
+            self.price_index = PriceIndex(read_history)
+            self.read_server = HttpServer(port=read_port)
+            self.price_index.add_routes(self.read_server)
+
+
+    async def submit_contract_call(self, contract_function: ContractFunction) -> SubmitResult:
+        """Builds the one-off transaction in a worker thread and submits it"""
+        await self.gas_cache.warm()
+        tx_params = await asyncio.to_thread(contract_function.build_transaction, {
+            'gasPrice': self.gas_cache.gas_price,
+        })
+        return await self.tx_submitter.submit(tx_params)
+
+    async def lookup_contracts(self, pairs: list[Pair], app_id_bytes: bytes) -> list[Pair]:
+        """Looks up aggregator contracts of the pairs in the price feed directory and returns the pairs without one"""
+        addresses = await self.rpc_batcher.call_all([
+            self.price_feed_contract.functions.feeds(pair.compute_feed_hash(app_id_bytes))
+            for pair in pairs
+        ])
+
+        missing = []
+        for pair, address in zip(pairs, addresses):
+            if address == ZERO_ADDRESS:
+                missing.append(pair)
+                continue
+            self.contracts[pair] = self.w3.eth.contract(address=address, abi=self.contract_abi, bytecode=self.contract_bytecode)
+            logger.info("Detected aggregator contract %s for %s", address, pair)
+        return missing
+
+    async def read_contract_metadata(self, pairs: list[Pair]):
+        """Reads decimals, description and the latest round of the aggregator contracts and fixes unset ones"""
+        calls = []
+        for pair in pairs:
+            contract = self.contracts[pair]
+            calls += [contract.functions.decimals(), contract.functions.description(), contract.functions.latestRoundData(), contract.functions.version()]
+        results = await self.rpc_batcher.call_all(calls)
+
+        fixes = []
+        descriptions = {}
+        for i, pair in enumerate(pairs):
+            decimals, description, latest_round_data, version = results[4*i:4*i+4]
+            logger.info("%s decimals: %d, description: %s, latest round: %d, version: %d", pair, decimals, description, latest_round_data[0], version)
+            self.num_decimals[pair] = decimals
+            self.set_aggregator_version(pair, version)
+            descriptions[pair] = description
+            self.round_ids[pair] = latest_round_data[0]
+            self.record_onchain_answer(pair, latest_round_data)
+
+            # Sanity check.
+            contract = self.contracts[pair]
+            if decimals == 0:
+                fixes.append((pair, f"Set decimals to {NUM_DECIMALS}", contract.functions.setDecimals(NUM_DECIMALS)))
+            if description == "":
+                fixes.append((pair, f"Set description to {str(pair)}", contract.functions.setDescription(str(pair))))
+
+        results = await asyncio.gather(*(self.submit_contract_call(fn) for _, _, fn in fixes), return_exceptions=True)
+        for (pair, action, fn), result in zip(fixes, results):
+            logger.info("%s: %s. Result: %s", pair, action, result)
+            if not isinstance(result, SubmitResult) or not submission_succeeded(result.result):
+                continue
+            self.rpc_batcher.forget(fn.address)
+            if fn.fn_name == 'setDecimals':
+                self.num_decimals[pair] = NUM_DECIMALS
+            elif fn.fn_name == 'setDescription':
+                descriptions[pair] = str(pair)
+
+        for pair in pairs:
+            if pair in self.feed_keys:
+                self.state_cache.set_feed(
+                    self.feed_keys[pair],
+                    self.contracts[pair].address,
+                    self.num_decimals[pair],
+                    descriptions[pair],
+                    self.round_ids[pair],
+                    self.versions[pair],
+                )
 
-        contract = self.w3.eth.contract(address=address, abi=self.contract_abi, bytecode=self.contract_bytecode)
-        self.contracts[pair] = contract
-
-        # Sanity check.
-        print("decimals:", contract.functions.decimals().call())
-        print("description:", contract.functions.description().call())
-        if contract.functions.decimals().call() == 0:
-            tx_params = contract.functions.setDecimals(NUM_DECIMALS).build_transaction({
-                'gasPrice': self.w3.eth.gas_price,
-            })
-            result = self.rofl_utility.submit_tx(tx_params)
-            print(f"Set decimals to {NUM_DECIMALS}. Result: {result}")
-
-        if contract.functions.description().call() == "":
-            tx_params = contract.functions.setDescription(str(pair)).build_transaction({
-                'gasPrice': self.w3.eth.gas_price,
-            })
-            result = self.rofl_utility.submit_tx(tx_params)
-            print(f"Set description to {str(pair)}. Result: {result}")
-
-
-    def detect_or_deploy_contract(self, pair: Pair):
-        # Fetch the current app ID
-        app_id = self.rofl_utility.fetch_appid()
+    async def discover_contracts(self, pairs: list[Pair]) -> list[Pair]:
+        """
+        Detects aggregator contracts of the pairs, deploying the missing ones.
+
+        The app ID is fetched once, directory lookups and contract metadata
+        are read in JSON-RPC batches and all required transactions are
+        submitted concurrently. Pairs found in the state cache are taken
+        from there without any RPC calls and returned, so that they can be
+        validated once the observation loops are running.
+        """
+        app_id = await self.rofl_utility.fetch_appid_async()
         app_id_bytes = bech32_to_bytes(app_id)
+        self.app_id_bytes = app_id_bytes
 
-        if pair in self.contracts:
-            return
-
-        self.detect_contract(pair, app_id_bytes)
-        if pair in self.contracts:
-            print(f"Detected aggregator contract {self.contracts[pair].address} for {pair}")
+        cached = []
+        for pair in pairs:
+            if pair in self.contracts:
+                continue
+            key = StateCache.feed_key(self.network_name, self.price_feed_contract.address, app_id, str(pair))
+            self.feed_keys[pair] = key
+            feed = self.state_cache.get_feed(key)
+            if feed is None:
+                continue
+            self.contracts[pair] = self.w3.eth.contract(address=feed["address"], abi=self.contract_abi, bytecode=self.contract_bytecode)
+            self.num_decimals[pair] = feed["decimals"]
+            self.round_ids[pair] = feed["round_id"]
+            self.set_aggregator_version(pair, feed.get("version", 0))
+            cached.append(pair)
+            logger.info("Loaded aggregator contract %s for %s from state cache", feed["address"], pair)
+
+        missing = await self.lookup_contracts([pair for pair in pairs if pair not in self.contracts], app_id_bytes)
+        if missing:
+            # Deploy the contracts implicitly by calling addFeed() or addPackedFeed().
+            results = await asyncio.gather(*(
+                self.submit_contract_call(
+                    self.price_feed_contract.functions.addPackedFeed(str(pair), False) if self.aggregator == "packed"
+                    else self.price_feed_contract.functions.addFeed(str(pair), ZERO_ADDRESS, False)
+                )
+                for pair in missing
+            ), return_exceptions=True)
+            for pair, result in zip(missing, results):
+                logger.info("Contract deploy for %s submitted. Result: %s", pair, result)
+
+            missing = await self.lookup_contracts(missing, app_id_bytes)
+            if missing:
+                logger.error("Aggregator contract not available for %s. Aborting.", ", ".join(str(pair) for pair in missing))
+                exit(2)
+
+        await self.read_contract_metadata([pair for pair in pairs if pair not in cached])
+        self.state_cache.save()
+        return cached
+
+    def set_aggregator_version(self, pair: Pair, version: int):
+        """Records the version of the pair's aggregator contract, switching PackedAggregator ones to their ABI"""
+        self.versions[pair] = version
+        if version == PACKED_AGGREGATOR_VERSION:
+            self.contracts[pair] = self.w3.eth.contract(address=self.contracts[pair].address, abi=self.packed_contract_abi)
+
+    async def validate_cached_contracts(self, pairs: list[Pair]):
+        """
+        Checks the contracts loaded from the state cache against the chain.
+
+        Rounds submitted after the cache was last saved are skipped. If the
+        directory points to a different contract or its decimals changed,
+        the entry is dropped and the oracle exits to rediscover it on restart.
+        """
+        if not pairs:
             return
-
-        # Deploy the contract implicitly by calling add_feed().
-        tx_params = self.price_feed_contract.functions.addFeed(
-            "/".join((pair.exchange, pair.pair_base, pair.pair_quote)),
-            "0x0000000000000000000000000000000000000000",
-            False,
-        ).build_transaction({
-            'gasPrice': self.w3.eth.gas_price,
-        })
-        result = self.rofl_utility.submit_tx(tx_params)
-        print(f"Contract deploy submitted. Result: {result}")
-
-        self.detect_contract(pair, app_id_bytes)
-        if pair in self.contracts:
+        calls = []
+        for pair in pairs:
             contract = self.contracts[pair]
-            print(f"Detected aggregator contract {contract.address}")
-        else:
-            print(f"Aggregator contract not available. Aborting.")
-            exit(2)
-
-
-    async def observations_loop(self, pair:Pair):
-        observations = []  # List of (uint256 price, uint64 timestamp) tuples for the current round
-        last_submit = asyncio.get_event_loop().time()
-        print(f"Starting price observation loop for {pair.pair_base}/{pair.pair_quote} on {pair.exchange}...")
-
-        contract = self.contracts[pair]
-        num_decimals = contract.functions.decimals().call()
-        latest_round_data = contract.functions.latestRoundData().call()
-        round_id = latest_round_data[0]
+            calls += [
+                self.price_feed_contract.functions.feeds(pair.compute_feed_hash(self.app_id_bytes)),
+                contract.functions.decimals(),
+                contract.functions.latestRoundData(),
+            ]
+        try:
+            results = await self.rpc_batcher.call_all(calls)
+        except Exception as e:
+            logger.warning("Validating state cache failed: %s", e)
+            return
 
-        # Price fetching loop
+        stale = []
+        for i, pair in enumerate(pairs):
+            address, decimals, latest_round_data = results[3*i:3*i+3]
+            key = self.feed_keys[pair]
+            if address != self.contracts[pair].address or decimals != self.num_decimals[pair]:
+                logger.warning("State cache of %s is stale: contract %s with %d decimals on-chain", pair, address, decimals)
+                self.state_cache.invalidate_feed(key)
+                stale.append(pair)
+                continue
+            if latest_round_data[0] > self.round_ids[pair]:
+                self.round_ids[pair] = latest_round_data[0]
+                self.state_cache.record_round(key, latest_round_data[0])
+            if self.policies[pair].last_answer is None:
+                self.record_onchain_answer(pair, latest_round_data)
+        self.state_cache.save()
+
+        if stale:
+            logger.warning("Aggregator contracts of %s changed. Restarting.", ", ".join(str(pair) for pair in stale))
+            exit(3)
+
+    def record_onchain_answer(self, pair: Pair, latest_round_data: tuple):
+        """Seeds the submit policy of the pair with the answer read from latestRoundData"""
+        _, answer, _, updated_at, _ = latest_round_data
+        if updated_at == 0:
+            return
+        self.round_updated_at[pair] = updated_at
+        # Policies measure time on the event loop's clock.
+        age = max(0.0, time.time() - updated_at)
+        self.policies[pair].record_submission(answer, asyncio.get_event_loop().time() - age)
+
+    def restore_journal(self, pairs: list[Pair]):
+        """
+        Refills the aggregation windows and restores the last round and answer of the pairs from the journal.
+
+        Observations, e.g. of a round which was partially collected before a
+        restart, keep their unix timestamps. Ones older than the window
+        horizon, or a submit period without one, are dropped, so that a long
+        outage doesn't leak stale prices into the next answer. The
+        observation and submission times used for scheduling are moved to
+        the event loop's clock by their age.
+        """
+        if self.journal is None:
+            return
+        feeds = self.journal.replay()
+        loop_now, now = asyncio.get_event_loop().time(), time.time()
+        max_age = self.window_horizon if self.window_horizon is not None else self.submit_period
+        for pair in pairs:
+            state = feeds.get(self.journal_ids[pair])
+            if state is None:
+                continue
+            window = self.observations[pair]
+            fresh = [tick for tick in state.ticks if now - tick[1] <= max_age]
+            if len(fresh) < len(state.ticks):
+                logger.info("Dropping %d journaled observation(s) of %s older than %ss", len(state.ticks) - len(fresh), pair, max_age)
+            for price, timestamp, volume in fresh:
+                window.add(price, int(timestamp), volume)
+            if state.ticks:
+                self.last_observed[pair] = loop_now - (now - state.ticks[-1][1])
+            self.round_ids[pair] = max(self.round_ids[pair], state.round_id)
+            if state.answer is not None and state.submitted_at is not None:
+                self.policies[pair].record_submission(state.answer, loop_now - (now - state.submitted_at))
+            logger.info("Restored %d observation(s) and round %d of %s from the journal", len(window), self.round_ids[pair], pair)
+
+    async def journal_loop(self):
+        """Writes the journaled records out once per fetch period and fsyncs them according to the policy"""
+        loop = asyncio.get_event_loop()
+        last_sync = loop.time()
         while True:
-            round_id+=1
-            price = await EXCHANGE_FETCHERS[pair.exchange](pair.pair_base, pair.pair_quote)
-            if price is None or price == 0:
-                print(f"warning: {pair} price invalid: {price}. Ignoring.")
-                await asyncio.sleep(self.fetch_period)
+            await asyncio.sleep(self.fetch_period)
+            sync = self.journal.fsync == "always" or (self.journal.fsync == "periodic" and loop.time() - last_sync >= self.submit_period)
+            try:
+                # Off the event loop, so that disk latency doesn't delay fetches and submits.
+                await asyncio.to_thread(self.journal.flush, sync)
+            except OSError as e:
+                logger.error("Error writing journal: %s", e)
                 continue
+            if sync:
+                last_sync = loop.time()
 
-            print(f"{pair} price: ${price:.10f}")
-            obs = (int(price * 10**num_decimals), int(asyncio.get_event_loop().time()))
-            observations.append(obs)
-
-            if asyncio.get_event_loop().time() - last_submit > self.submit_period:
-                sorted_observations = sorted(observations)
-                median_price = sorted_observations[int(len(observations)/2)][0]
+    async def save_state_loop(self):
+        """Persists the last submitted rounds once per submit period"""
+        while True:
+            await asyncio.sleep(self.submit_period)
+            try:
+                await asyncio.to_thread(self.state_cache.save)
+            except Exception as e:
+                logger.error("Error saving state cache: %s", e)
+
+    def record_observation(self, pair: Pair, price: float, volume: float | None = None):
+        """Adds the price to the current round of the pair, if its observation loop is running"""
+        if pair not in self.observations or price is None or price == 0:
+            return
+        # Rounds are stamped with unix time, like the contracts' startedAt
+        # and updatedAt. The event loop's clock is only used for scheduling.
+        now = time.time()
+        scaled_price = int(price * 10**self.num_decimals[pair])
+        self.observations[pair].add(scaled_price, int(now), volume)
+        self.last_observed[pair] = asyncio.get_event_loop().time()
+        if self.journal is not None:
+            self.journal.tick(self.journal_ids[pair], scaled_price, now, volume)
+
+    def update_age_metrics(self, pair: Pair):
+        """Exports the staleness of the pair's last observation and on-chain round"""
+        if pair in self.last_observed:
+            OBSERVATION_AGE.set(asyncio.get_event_loop().time() - self.last_observed[pair], pair=str(pair))
+        if pair in self.round_updated_at:
+            ROUND_AGE.set(time.time() - self.round_updated_at[pair], pair=str(pair))
+
+    async def backfill_price_index(self, pairs: list[Pair]):
+        """
+        Indexes the latest on-chain round of each pair and the earlier ones among
+        the preceding round IDs, with batched latestRoundData and getRoundData calls.
+        """
+        for pair in pairs:
+            self.price_index.set_metadata(str(pair), self.contracts[pair].address, self.num_decimals[pair])
+        try:
+            latest = await self.rpc_batcher.call_all([
+                self.contracts[pair].functions.latestRoundData() for pair in pairs
+            ])
+            # Not every round ID is submitted, e.g. only every few fetch periods.
+            span = self.price_index.history * max(1, self.submit_period // self.fetch_period)
+            calls = []
+            for pair, latest_round_data in zip(pairs, latest):
+                for round_id in range(max(1, latest_round_data[0] - span), latest_round_data[0]):
+                    calls.append((pair, self.contracts[pair].functions.getRoundData(round_id)))
+            results = await self.rpc_batcher.call_all([call for _, call in calls])
+        except Exception as e:
+            logger.warning("Backfilling the price index failed: %s", e)
+            return
 
-                tx_params = contract.functions.submitObservation(
-                    round_id,
-                    median_price,
-                    observations[0][1],
-                    observations[-1][1],
-                ).build_transaction({
-                    'gasPrice': self.w3.eth.gas_price,
-                })
+        for pair, result in zip([pair for pair, _ in calls] + pairs, results + latest):
+            round_data = RoundData.from_call(result)
+            if round_data.updated_at != 0:
+                self.price_index.record(str(pair), round_data)
+        logger.info("Indexed %d round(s) of %d pair(s)", sum(len(feed.rounds) for feed in self.price_index.feeds.values()), len(pairs))
+
+    async def serve_metrics(self, request) -> HttpResponse:
+        for pair in self.observations:
+            self.update_age_metrics(pair)
+        return HttpResponse(body=REGISTRY.render().encode(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    def record_stream_price(self, exchange: str, key: PairKey, price: float):
+        """Records the streamed price for the pair on the exchange and keeps it for composite pairs"""
+        self.stream_prices[(exchange, key)] = price
+        for pair in self.stream_pairs.get((exchange, key), []):
+            self.record_observation(pair, price)
+
+    async def fetch_price(self, exchange: str, pair_base: str, pair_quote: str) -> float | None:
+        """Returns the latest streamed price of the pair on the exchange or polls it if the stream is down"""
+        stream = self.streams.get(exchange)
+        if stream is not None and stream.connected and (exchange, (pair_base, pair_quote)) in self.stream_prices:
+            return self.stream_prices[(exchange, (pair_base, pair_quote))]
+        return await self.batchers[exchange].fetch(pair_base, pair_quote)
+
+    async def fetch_prices(self, pair: Pair, deadline: float) -> list[float | None]:
+        """Fetches the pair's price on each of its exchanges, giving up on the ones not done by the deadline"""
+        tasks = [
+            asyncio.ensure_future(self.fetch_price(exchange, pair.pair_base, pair.pair_quote))
+            for exchange in pair.sources
+        ]
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline - asyncio.get_event_loop().time()))
+        finally:
+            for task in tasks:
+                task.cancel()
+        if pending:
+            logger.warning("Fetching %s on %s exceeded the deadline", pair, ", ".join(exchange for exchange, task in zip(pair.sources, tasks) if task in pending))
+        return [task.result() if task.done() and not task.cancelled() and task.exception() is None else None for task in tasks]
+
+    async def fetch_composite_price(self, pair: Pair, deadline: float) -> float | None:
+        """
+        Samples the pair on all its exchanges in the same tick and combines them.
+
+        Prices deviating too far from the others are rejected, and a majority
+        of the exchanges must agree for the sample to count.
+        """
+        prices = await self.fetch_prices(pair, deadline)
+        price = composite_price([p for p in prices if p], len(pair.sources) // 2 + 1)
+        if price is None:
+            logger.warning("%s exchanges disagree or are unavailable: %s", pair, dict(zip(pair.sources, prices)))
+        return price
+
+    def invalidate_gas_limits(self, pair: Pair):
+        """Forgets the cached gas limits of submitting the pair's rounds"""
+        # Packed rounds fall back to submitObservation if they don't fit, see observation_call.
+        for method in ('submitObservation', 'submitPackedObservation'):
+            self.gas_cache.invalidate(self.contracts[pair].address, method)
+
+    def report_submission(self, pair: Pair, round_data: RoundData, future: asyncio.Future):
+        round_id = round_data.round_id
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            SUBMISSIONS.inc(pair=str(pair), result="failed")
+            logger.error("Submitting %s round %d failed: %r", pair, round_id, future.exception())
+            self.invalidate_gas_limits(pair)
+            # Forget the answer, so that the next one is submitted regardless of its deviation.
+            self.policies[pair].last_answer = None
+            return
+        stats = future.result()
+        SUBMIT_SECONDS.observe(stats.latency, pair=str(pair))
+        if stats.gas_used:
+            GAS_USED.inc(stats.gas_used, pair=str(pair))
+        if not submission_succeeded(stats.result):
+            SUBMISSIONS.inc(pair=str(pair), result="failed")
+            # The cached gas limit may have become too low, re-estimate it on the next submit.
+            logger.error("%s round %d transaction failed. Result: %s", pair, round_id, stats.result)
+            self.invalidate_gas_limits(pair)
+            self.policies[pair].last_answer = None
+            return
+        SUBMISSIONS.inc(pair=str(pair), result="ok")
+        self.round_updated_at[pair] = round_data.updated_at
+        if self.price_index is not None:
+            self.price_index.record(str(pair), round_data)
+        if pair in self.feed_keys:
+            self.state_cache.record_round(self.feed_keys[pair], round_id)
+        logger.info("Submitted %s round %d in %.2fs (%d attempt(s), gas used: %s). Result: %s", pair, round_id, stats.latency, stats.attempts, stats.gas_used, stats.result)
+
+    def schedule_observations(self, pairs: list[Pair]):
+        """
+        Adds the fetch ticks of the pairs to the scheduler.
+
+        Pairs whose requests can be merged, i.e. those on an exchange with a
+        bulk endpoint or all composite pairs, share a phase. Other requests
+        are spread over the first FETCH_SPREAD seconds of the period.
+        """
+        groups = {}
+        for pair in pairs:
+            if pair.exchange == COMPOSITE_EXCHANGE or EXCHANGE_ADAPTERS[pair.exchange].bulk is not None:
+                group = pair.exchange
+            else:
+                group = (pair.exchange, pair.pair_base, pair.pair_quote)
+            groups.setdefault(group, []).append(pair)
+
+        spread = min(FETCH_SPREAD, self.fetch_period)
+        now = asyncio.get_event_loop().time()
+        for i, group in enumerate(groups.values()):
+            for pair in group:
+                logger.info("Starting price observations of %s/%s on %s...", pair.pair_base, pair.pair_quote, pair.exchange)
+                self.observations[pair] = AggregationWindow(self.window_size, self.window_horizon)
+                self.last_submit[pair] = now
+                self.scheduler.add(
+                    pair,
+                    [EXCHANGE_CLIENTS[exchange] for exchange in pair.sources],
+                    spread * i / len(groups),
+                    self.priorities[pair],
+                )
 
-                last_submit = asyncio.get_event_loop().time()
-                result = self.rofl_utility.submit_tx(tx_params)
-                print(f"Submitting observations. Result: {result}")
-                observations = []
+    async def observe(self, pair: Pair):
+        """Fetches the price of the pair and submits the aggregated answer if it is due"""
+        self.update_age_metrics(pair)
+        self.round_ids[pair] += 1
+        round_id = self.round_ids[pair]
+        stream = self.streams.get(pair.exchange)
+        if (pair.exchange, (pair.pair_base, pair.pair_quote)) not in self.stream_pairs or not stream.connected:
+            # Fetches may take a share of the period from the tick's deadline, so
+            # that a hung request doesn't delay the following ticks.
+            deadline = self.scheduler.entries[pair].deadline if pair in self.scheduler.entries else None
+            deadline = (deadline or asyncio.get_event_loop().time()) + self.fetch_period * FETCH_BUDGET
+            with span("fetch", pair=pair):
+                if pair.exchange == COMPOSITE_EXCHANGE:
+                    price = await self.fetch_composite_price(pair, deadline)
+                else:
+                    [price] = await self.fetch_prices(pair, deadline)
+            if price is None or price == 0:
+                logger.warning("%s price invalid: %s. Ignoring.", pair, price)
+                return
+
+            logger.debug("%s price: $%.10f", pair, price)
+            self.record_observation(pair, price)
+
+        policy = self.policies[pair]
+        window = self.observations[pair]
+        now = asyncio.get_event_loop().time()
+        # Submits are aligned to multiples of the submit period, so that
+        # all pairs due in the same period can be batched together. With
+        # a deviation threshold, the answer is also checked every tick.
+        period_due = now // self.submit_period > self.last_submit[pair] // self.submit_period
+        if len(window) == 0 or not (period_due or policy.deviation_bps > 0):
+            return
 
-            await asyncio.sleep(self.fetch_period)
+        with span("aggregate", pair=pair, samples=len(window)):
+            answer = self.estimator(window)
+        submit = policy.should_submit(answer, now, self.submit_period, period_due)
+        started_at, updated_at = window.started_at, window.updated_at
+        if period_due:
+            self.last_submit[pair] = now
+        if period_due or submit:
+            window.clear()
+            if self.journal is not None:
+                self.journal.clear(self.journal_ids[pair], time.time())
+        if not submit:
+            if period_due:
+                logger.debug("Skipping %s round %d: answer deviates %.1f bps from the last one.", pair, round_id, policy.deviation(answer))
+            return
 
-    async def run(self) -> None:
-        tasks = []
-        for pair in self.pairs:
-            self.detect_or_deploy_contract(pair)
-            tasks.append(
-                asyncio.create_task(
-                    self.observations_loop(pair)
-                )
+        policy.record_submission(answer, now)
+        if self.journal is not None:
+            self.journal.submit(self.journal_ids[pair], round_id, answer, time.time())
+        logger.info("Submitting observations of %s for round %d.", pair, round_id)
+        with span("submit", pair=pair, round=round_id):
+            future = await self.submit_observation(pair, round_id, answer, started_at, updated_at)
+        round_data = RoundData(round_id, answer, started_at, updated_at)
+        future.add_done_callback(
+            lambda future: self.report_submission(pair, round_data, future)
+        )
+
+    def observation_call(self, pair: Pair, round_id: int, answer: int, started_at: int, updated_at: int) -> ContractFunction:
+        """Returns the aggregator call submitting the round, in compact calldata if the aggregator is a PackedAggregator"""
+        contract = self.contracts[pair]
+        if self.versions.get(pair) == PACKED_AGGREGATOR_VERSION:
+            packed = pack_round(round_id, answer, started_at, updated_at)
+            if packed is not None:
+                return contract.functions.submitPackedObservation(packed)
+        return contract.functions.submitObservation(round_id, answer, started_at, updated_at)
+
+    async def submit_observation(self, pair: Pair, round_id: int, answer: int, started_at: int, updated_at: int) -> asyncio.Future:
+        """Queues the observation for submission on its own or in the next batch"""
+        if self.batch_submitter is not None:
+            # Forwarded to submitObservation, which PackedAggregator supports as well.
+            return self.batch_submitter.submit(
+                self.contracts[pair],
+                round_id,
+                answer,
+                started_at,
+                updated_at,
             )
-            time.sleep(1)
+        contract_function = self.observation_call(pair, round_id, answer, started_at, updated_at)
+        await self.gas_cache.warm(contract_function)
+        return self.tx_submitter.submit(self.gas_cache.build_transaction(contract_function))
+
+    async def own(self, names: list[str]):
+        """
+        Starts observing the pairs, e.g. taken over from a worker which died.
+
+        Their contracts are discovered like on startup, so rounds continue
+        from the latest on-chain one. The observations the previous owner
+        collected for the current round are lost.
+        """
+        pairs = [pair for pair in self.pairs if str(pair) in names and pair not in self.owned]
+        if not pairs:
+            return
+        self.owned += pairs
+        cached = await self.discover_contracts(pairs)
+        self.schedule_observations(pairs)
+        self.restore_journal(pairs)
+        if self.price_index is not None:
+            await self.backfill_price_index(pairs)
+        await self.validate_cached_contracts(cached)
 
-        await asyncio.gather(*tasks)
\ No newline at end of file
+    async def run(self) -> None:
+        tasks = [asyncio.create_task(stream.run()) for stream in self.streams.values()]
+        tasks.append(asyncio.create_task(self.gas_cache.refresh_loop()))
+        tasks.append(asyncio.create_task(monitor_event_loop_lag()))
+        try:
+            await self.contract_utility.connect()
+            if self.metrics_server is not None:
+                await self.metrics_server.start()
+            cached = await self.discover_contracts(self.owned)
+            self.schedule_observations(self.owned)
+            self.restore_journal(self.owned)
+            if self.read_server is not None:
+                await self.read_server.start()
+                tasks.append(asyncio.create_task(self.backfill_price_index(self.owned)))
+            tasks.append(asyncio.create_task(self.scheduler.run()))
+            if self.journal is not None:
+                tasks.append(asyncio.create_task(self.journal_loop()))
+            tasks.append(asyncio.create_task(self.validate_cached_contracts(cached)))
+            tasks.append(asyncio.create_task(self.save_state_loop()))
+
+            await asyncio.gather(*tasks)
+        finally:
+            # Also stops the streams if discovery failed or was cancelled.
+            for task in tasks:
+                task.cancel()
+            self.state_cache.save()
+            if self.journal is not None:
+                self.journal.close()
+            if self.metrics_server is not None:
+                await self.metrics_server.stop()
+            if self.read_server is not None:
+                await self.read_server.stop()
+            await self.tx_submitter.stop()
+            await close_exchange_clients()
+            await self.contract_utility.aclose()
+            await self.rofl_utility.aclose()
@@ -0,0 +1,80 @@
+import asyncio
+import random
+import time
+
+# Statuses telling the client to slow down. Binance answers 418 once an IP is banned.
+BACKOFF_STATUSES = {418, 429}
+
+
+class RateLimiter:
+    """
+    Token bucket with exponential backoff guarding the requests to a single exchange.
+
+    Requests take `weight` tokens out of a bucket of `burst` tokens which is
+    refilled at `rate` tokens per second. A request which would overdraw
+    the bucket reserves its tokens and waits until they are refilled, so
+    concurrent requests are served in order. After a 429, 418 or 5xx
+    response no request is sent for an exponentially growing, jittered
+    delay, or for as long as the exchange's Retry-After header says.
+
+    :param rate: Tokens refilled per second. None disables the token bucket
+    :param burst: Capacity of the bucket
+    :param base_backoff: Upper bound of the first backoff delay in seconds
+    :param max_backoff: Upper bound of any backoff delay in seconds
+    """
+
+    def __init__(self, rate: float | None = None, burst: float = 1.0, base_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.rate = rate
+        self.burst = burst
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.tokens = burst
+        self.failures = 0
+        self.backoff_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def backoff_remaining(self, now: float | None = None) -> float:
+        """Returns the seconds left until requests may be sent again after a failure"""
+        return max(0.0, self.backoff_until - (time.monotonic() if now is None else now))
+
+    def wait_time(self, weight: float = 1, now: float | None = None) -> float:
+        """Returns the seconds a request of the given weight would currently wait"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        wait = self.backoff_remaining(now)
+        if self.rate is not None and self.tokens < weight:
+            wait = max(wait, (weight - self.tokens) / self.rate)
+        return wait
+
+    async def acquire(self, weight: float = 1):
+        """Takes the tokens of a request, waiting for them and for any backoff to pass"""
+        now = time.monotonic()
+        self._refill(now)
+        wait = self.backoff_remaining(now)
+        if self.rate is not None:
+            self.tokens -= weight
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def report(self, status_code: int, retry_after: str | None = None):
+        """Updates the backoff with the HTTP status of a response"""
+        if status_code not in BACKOFF_STATUSES and status_code < 500:
+            self.failures = 0
+            return
+        self.failures += 1
+        # Full jitter keeps clients which failed together from retrying together.
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (self.failures - 1)))
+        if retry_after is not None:
+            try:
+                # Bans outlast max_backoff and retrying early extends them.
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass  # An HTTP date, which the exchanges don't send.
+        self.backoff_until = max(self.backoff_until, time.monotonic() + delay)
@@ -0,0 +1,361 @@
+import bisect
+import csv
+import re
+import typing
+from dataclasses import dataclass
+
+import numpy as np
+
+from .AggregationWindow import ESTIMATORS
+from .SubmitPolicy import SubmitPolicy
+
+# Fills the unused cells of padded windows, so they sort after the prices.
+# Windows of Python ints, see estimate, are padded with infinity instead.
+PADDING = np.iinfo(np.int64).max
+
+# Maximum number of cells of the padded window matrices evaluated at once.
+CHUNK_CELLS = 2**22
+
+# Price lines logged by PriceOracle at debug level.
+LOG_PRICE_LINE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) DEBUG \S+: (\S+) price: \$([0-9.eE+-]+)")
+
+
+@dataclass
+class TickHistory:
+    """Recorded prices of a single pair"""
+    timestamps: np.ndarray  # unix seconds, ascending
+    prices: np.ndarray
+    volumes: np.ndarray | None = None
+
+
+@dataclass
+class ReplayConfig:
+    """Oracle settings a tick history is replayed with"""
+    fetch_period: int
+    submit_period: int
+    estimator: str = "median"
+    deviation_bps: float = 0.0
+    heartbeat: float | None = None
+    window_size: int = 1024
+    window_horizon: float | None = None
+    decimals: int = 10
+
+
+def _histories(rows: dict[str, list[tuple]], with_volume: bool) -> dict[str, TickHistory]:
+    histories = {}
+    for pair, ticks in rows.items():
+        ticks.sort(key=lambda tick: tick[0])
+        columns = np.array(ticks, dtype=np.float64).T
+        histories[pair] = TickHistory(columns[0], columns[1], columns[2] if with_volume else None)
+    return histories
+
+
+def load_csv(path: str) -> dict[str, TickHistory]:
+    """Loads a CSV file with timestamp, pair, price and optionally volume columns"""
+    rows: dict[str, list[tuple]] = {}
+    with open(path, newline="") as file:
+        reader = csv.DictReader(file)
+        with_volume = "volume" in (reader.fieldnames or [])
+        for row in reader:
+            tick = (float(row["timestamp"]), float(row["price"]))
+            rows.setdefault(row["pair"], []).append(tick + ((float(row["volume"]),) if with_volume else ()))
+    return _histories(rows, with_volume)
+
+
+def load_parquet(path: str) -> dict[str, TickHistory]:
+    """Loads a Parquet file with the same columns as load_csv. Requires pyarrow"""
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("reading Parquet files requires pyarrow")
+    table = pyarrow.parquet.read_table(path)
+    columns = {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+    pairs = columns["pair"].astype(str)
+    histories = {}
+    for pair in np.unique(pairs):
+        rows = pairs == pair
+        order = np.argsort(columns["timestamp"][rows], kind="stable")
+        histories[str(pair)] = TickHistory(
+            columns["timestamp"][rows][order].astype(np.float64),
+            columns["price"][rows][order].astype(np.float64),
+            columns["volume"][rows][order].astype(np.float64) if "volume" in columns else None,
+        )
+    return histories
+
+
+def load_log(path: str) -> dict[str, TickHistory]:
+    """Loads the prices from an oracle log written with --log-level debug, in UTC"""
+    rows: dict[str, list[tuple]] = {}
+    with open(path) as file:
+        for line in file:
+            match = LOG_PRICE_LINE.match(line)
+            if match is None:
+                continue
+            date, millis, pair, price = match.groups()
+            timestamp = np.datetime64(date.replace(" ", "T"), "s").astype(np.int64) + int(millis) / 1000
+            rows.setdefault(pair, []).append((float(timestamp), float(price)))
+    return _histories(rows, False)
+
+
+LOADERS = {
+    "csv": load_csv,
+    "parquet": load_parquet,
+    "log": load_log,
+}
+
+
+def sample(history: TickHistory, fetch_period: int, decimals: int) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    """
+    Returns what the oracle would have fetched every `fetch_period` seconds:
+    the timestamps, the latest price scaled to `decimals` and its volume.
+
+    Scaled prices which don't fit 64 bits are returned as Python ints in an
+    object array, like the oracle keeps them.
+    """
+    start = int(np.ceil(history.timestamps[0] / fetch_period)) * fetch_period
+    timestamps = np.arange(start, int(history.timestamps[-1]) + 1, fetch_period, dtype=np.int64)
+    latest = np.searchsorted(history.timestamps, timestamps, side="right") - 1
+    # Same rounding as PriceOracle.record_observation.
+    scaled = history.prices[latest] * 10**decimals
+    if scaled.max(initial=0) < 2**63:
+        prices = scaled.astype(np.int64)
+    else:
+        prices = np.array([int(price) for price in scaled.tolist()], dtype=object)
+    volumes = history.volumes[latest] if history.volumes is not None else None
+    return timestamps, prices, volumes
+
+
+def _gather(values: np.ndarray, starts: np.ndarray, counts: np.ndarray, fill) -> np.ndarray:
+    """Returns a matrix with the `counts[i]` values from `starts[i]` on in row i, padded with `fill`"""
+    columns = np.arange(counts.max(initial=1))
+    valid = columns[None, :] < counts[:, None]
+    indices = np.where(valid, starts[:, None] + columns[None, :], 0)
+    return np.where(valid, values[indices], fill)
+
+
+def estimate(estimator: str,
+             prices: np.ndarray,
+             timestamps: np.ndarray,
+             volumes: np.ndarray | None,
+             starts: np.ndarray,
+             counts: np.ndarray) -> np.ndarray:
+    """
+    Evaluates the estimator on many windows at once. Window i holds the
+    `counts[i]` samples from `starts[i]` on.
+
+    Mirrors the integer arithmetic of the AggregationWindow estimators,
+    so that the answers are the same as the oracle's. If sums of the
+    prices may overflow 64 bits, they are computed on Python ints and the
+    answers returned in an object array.
+    """
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"unknown estimator {estimator}")
+    answers = np.empty(len(starts), dtype=prices.dtype)
+    if len(starts) == 0:
+        return answers
+    rows = np.arange(len(starts))
+    padding = PADDING
+    used = prices[starts.min():(starts + counts).max()]
+    if prices.dtype == object or int(used.max()) * int(counts.max()) >= 2**63:
+        prices, padding = prices.astype(object), float("inf")
+
+    if estimator == "median":
+        window = np.sort(_gather(prices, starts, counts, padding), axis=1)
+        return (window[rows, (counts - 1) // 2] + window[rows, counts // 2]) // 2
+
+    if estimator == "trimmed-mean":
+        window = np.sort(_gather(prices, starts, counts, padding), axis=1)
+        window[window == padding] = 0
+        sums = np.concatenate([np.zeros((len(rows), 1), dtype=window.dtype), np.cumsum(window, axis=1)], axis=1)
+        trimmed = np.minimum((counts * 0.1).astype(np.int64), (counts - 1) // 2)
+        return (sums[rows, counts - trimmed] - sums[rows, trimmed]) // (counts - 2 * trimmed)
+
+    if estimator == "vwap" and volumes is not None:
+        weights = _gather(volumes, starts, counts, 0.0)
+        # Summed in order, like the running sums of AggregationWindow.
+        volume_sums = np.cumsum(weights, axis=1)[:, -1]
+        weighted = np.cumsum(_gather(prices, starts, counts, 0) * weights, axis=1)[:, -1].astype(np.float64)
+        with_volume = volume_sums > 0
+        vwap = weighted[with_volume] / volume_sums[with_volume]
+        answers[with_volume] = vwap.astype(np.int64) if prices.dtype != object else [int(v) for v in vwap.tolist()]
+        # Windows without volume fall back to the TWAP.
+        answers[~with_volume] = estimate("twap", prices, timestamps, None, starts[~with_volume], counts[~with_volume])
+        return answers
+
+    # TWAP, also of the VWAP without volumes.
+    window_prices = _gather(prices, starts, counts, 0)
+    window_timestamps = _gather(timestamps, starts, counts, 0)
+    durations = np.diff(window_timestamps, axis=1)
+    durations[np.arange(durations.shape[1])[None, :] >= (counts - 1)[:, None]] = 0
+    total = window_timestamps[rows, counts - 1] - window_timestamps[:, 0]
+    if prices.dtype != object and int(used.max()) * int(total.max()) >= 2**63:
+        # The sums would overflow 64 bits.
+        window_prices, durations = window_prices.astype(object), durations.astype(object)
+    instant = total == 0
+    answers[~instant] = (window_prices[~instant, :-1] * durations[~instant]).sum(axis=1) // total[~instant]
+    # Windows spanning no time fall back to the median.
+    answers[instant] = estimate("median", prices, timestamps, None, starts[instant], counts[instant])
+    return answers
+
+
+def _period_due(timestamps: np.ndarray, fetch_period: int, submit_period: int) -> np.ndarray:
+    """Marks the samples whose tick closes a submit period, like PriceOracle.observe"""
+    periods = timestamps // submit_period
+    # Observations are scheduled up to a fetch period before the first tick.
+    return np.diff(periods, prepend=(timestamps[0] - fetch_period) // submit_period) > 0
+
+
+def _answers(config: ReplayConfig,
+             prices: np.ndarray,
+             timestamps: np.ndarray,
+             volumes: np.ndarray | None,
+             ticks: np.ndarray,
+             window_starts: np.ndarray) -> np.ndarray:
+    """
+    Returns the answer at each tick of the window from `window_starts` on.
+
+    Windows are evaluated in chunks of similar sizes bounding the memory
+    used, so that little of the padded matrices is padding.
+    """
+    window_size = config.window_size
+    if config.window_horizon is not None:
+        window_size = min(window_size, int(config.window_horizon // config.fetch_period) + 1)
+    starts = np.maximum(window_starts, ticks + 1 - window_size)
+    counts = ticks + 1 - starts
+    answers = np.empty(len(ticks), dtype=prices.dtype)
+    order = np.argsort(counts, kind="stable")
+    sizes = counts[order].tolist()
+    chunk = 0
+    while chunk < len(order):
+        # The padded matrix of a chunk is as wide as its last window.
+        rows = max(1, bisect.bisect_right(range(1, len(order) - chunk + 1), CHUNK_CELLS, key=lambda rows: rows * sizes[chunk + rows - 1]))
+        selected = order[chunk:chunk + rows]
+        answers[selected] = estimate(config.estimator, prices, timestamps, volumes, starts[selected], counts[selected])
+        chunk += rows
+    return answers
+
+
+def _first(mask: typing.Callable[[int, int], np.ndarray], start: int, stop: int) -> int | None:
+    """Returns the first index in [start, stop) where the mask is set, scanning in growing chunks"""
+    size = 64
+    while start < stop:
+        end = min(stop, start + size)
+        found = np.flatnonzero(mask(start, end))
+        if len(found):
+            return start + int(found[0])
+        start, size = end, size * 2
+    return None
+
+
+def simulate(timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray | None, config: ReplayConfig) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Replays the sampled prices through the oracle's aggregation and submit
+    decisions and returns the timestamps and answers of the submissions.
+
+    Windows are evaluated vectorized and every submit decision is made by
+    SubmitPolicy, like in PriceOracle.observe. With a deviation threshold,
+    the answers are computed for all ticks up front and only recomputed for
+    the rest of a period after a submission in its middle, so the loop runs
+    once per submission instead of once per tick.
+    """
+    policy = SubmitPolicy(config.deviation_bps, config.heartbeat)
+    n = len(timestamps)
+    due = _period_due(timestamps, config.fetch_period, config.submit_period)
+    due_ticks = np.flatnonzero(due)
+    indices = np.arange(n)
+    # Windows are cleared after each tick closing a period.
+    cleared = np.zeros(n, dtype=bool)
+    cleared[0] = True
+    cleared[due_ticks[due_ticks < n - 1] + 1] = True
+    window_starts = np.maximum.accumulate(np.where(cleared, indices, 0))
+    submitted_at, answers = [], []
+
+    def submit(tick: int, answer: int):
+        policy.record_submission(answer, float(timestamps[tick]))
+        submitted_at.append(int(timestamps[tick]))
+        answers.append(answer)
+
+    if config.deviation_bps == 0:
+        period_answers = _answers(config, prices, timestamps, volumes, due_ticks, window_starts[due_ticks])
+        for tick, answer in zip(due_ticks.tolist(), period_answers.tolist()):
+            if policy.should_submit(answer, float(timestamps[tick]), config.submit_period, True):
+                submit(tick, answer)
+        return np.array(submitted_at, dtype=np.int64), np.array(answers, dtype=prices.dtype)
+
+    tick_answers = _answers(config, prices, timestamps, volumes, indices, window_starts)
+    due_timestamps = timestamps[due_ticks]
+    tick = 0
+    while tick < n:
+        last = policy.last_answer
+        if last is None or last == 0:
+            candidate = tick
+        else:
+            # Slightly below the threshold, SubmitPolicy has the final say on rounding.
+            threshold = config.deviation_bps * (1 - 1e-9) * abs(last) / 10_000
+            candidate = _first(lambda start, end: np.abs(tick_answers[start:end] - last) >= threshold, tick, n)
+        if config.heartbeat is not None:
+            # The first period end at which the heartbeat would be missed.
+            heartbeat_tick = np.searchsorted(due_ticks, tick)
+            if policy.last_submitted_at is not None:
+                heartbeat_tick = max(heartbeat_tick, np.searchsorted(due_timestamps, policy.last_submitted_at + config.heartbeat - config.submit_period, side="right"))
+            if heartbeat_tick < len(due_ticks):
+                candidate = min(candidate if candidate is not None else n, int(due_ticks[heartbeat_tick]))
+        if candidate is None:
+            break
+
+        answer = int(tick_answers[candidate])
+        if policy.should_submit(answer, float(timestamps[candidate]), config.submit_period, bool(due[candidate])):
+            submit(candidate, answer)
+            if not due[candidate]:
+                # The window restarts in the middle of the period.
+                period = np.searchsorted(due_ticks, candidate)
+                period_end = int(due_ticks[period]) if period < len(due_ticks) else n - 1
+                rest = np.arange(candidate + 1, period_end + 1)
+                tick_answers[rest] = _answers(config, prices, timestamps, volumes, rest, np.full(len(rest), candidate + 1))
+        tick = candidate + 1
+    return np.array(submitted_at, dtype=np.int64), np.array(answers, dtype=prices.dtype)
+
+
+def tracking_error(history: TickHistory, submitted_at: np.ndarray, answers: np.ndarray, decimals: int) -> np.ndarray:
+    """Returns the deviation in basis points of the on-chain answer from each recorded price since the first submission"""
+    latest = np.searchsorted(submitted_at, history.timestamps, side="right") - 1
+    covered = latest >= 0
+    onchain = answers[latest[covered]].astype(np.float64) / 10**decimals
+    prices = history.prices[covered]
+    return np.abs(onchain - prices) / prices * 10_000
+
+
+def _summary(values: np.ndarray) -> dict[str, float]:
+    if len(values) == 0:
+        return {}
+    summary = {"mean": float(values.mean())}
+    for percentile, value in zip((50, 95, 99), np.percentile(values, (50, 95, 99))):
+        summary[f"p{percentile}"] = float(value)
+    summary["max"] = float(values.max())
+    return summary
+
+
+def replay(history: TickHistory, config: ReplayConfig, gas_per_submit: int = 0) -> dict[str, typing.Any]:
+    """
+    Replays the history of a pair and summarizes the submissions and how
+    closely the submitted answers tracked the recorded prices.
+
+    :param history: Recorded prices of the pair
+    :param config: Oracle settings to replay with
+    :param gas_per_submit: Gas used by a single submission, for estimating the total
+    """
+    timestamps, prices, volumes = sample(history, config.fetch_period, config.decimals)
+    submitted_at, answers = simulate(timestamps, prices, volumes, config)
+    return {
+        "fetch_period": config.fetch_period,
+        "submit_period": config.submit_period,
+        "estimator": config.estimator,
+        "deviation_bps": config.deviation_bps,
+        "heartbeat": config.heartbeat,
+        "ticks": len(history.timestamps),
+        "observations": len(timestamps),
+        "submissions": len(submitted_at),
+        "gas": len(submitted_at) * gas_per_submit,
+        "submit_interval": _summary(np.diff(submitted_at).astype(np.float64)),
+        "tracking_error_bps": _summary(tracking_error(history, submitted_at, answers, config.decimals)),
+    }
@@ -1,4 +1,5 @@
 from abc import abstractmethod
+import asyncio
 import bech32
 import typing
 from web3.types import TxParams
@@ -29,4 +30,22 @@ class RoflUtility:
 
     @abstractmethod
     def submit_tx(self, tx: TxParams) -> typing.Any:
-        pass
\ No newline at end of file
+        pass
+
+    # Async variants. By default, the blocking implementation is run in a
+    # worker thread so it doesn't stall the event loop.
+    async def fetch_appid_async(self) -> str:
+        return await asyncio.to_thread(self.fetch_appid)
+
+    async def fetch_key_async(self, id: str) -> str:
+        return await asyncio.to_thread(self.fetch_key, id)
+
+    async def submit_tx_async(self, tx: TxParams) -> typing.Any:
+        return await asyncio.to_thread(self.submit_tx, tx)
+
+    async def fetch_nonce_async(self) -> int | None:
+        """Returns the pending nonce of the signer, or None if the backend assigns nonces itself"""
+        return None
+
+    async def aclose(self):
+        pass
@@ -1,76 +1,105 @@
 import cbor2
 import httpx
-import json
+import logging
 import typing
 from web3.types import TxParams
 
+from .Metrics import ROFL_ERRORS, ROFL_SECONDS, timed
 from .RoflUtility import RoflUtility
 
+logger = logging.getLogger(__name__)
+
 
 class RoflUtilityAppd(RoflUtility):
     ROFL_SOCKET_PATH = "/run/rofl-appd.sock"
 
-    def __init__(self, url: str = ''):
+    def __init__(self, url: str = '', timeout: float = 60.0, connect_timeout: float = 5.0, max_connections: int = 32):
+        """
+        Initializes the rofl-appd client.
+
+        A single pooled client is kept for the lifetime of the object and
+        shared by all callers, one for the blocking and one for the async
+        API.
+
+        :param url: HTTP URL or Unix socket path of rofl-appd. Defaults to ROFL_SOCKET_PATH
+        :param timeout: Timeout in seconds of a single request, including signing and submitting transactions
+        :param connect_timeout: Timeout in seconds for establishing a connection
+        :param max_connections: Maximum number of concurrent requests
+        """
         self.url = url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client: httpx.Client | None = None
+        self._async_client: httpx.AsyncClient | None = None
 
-    def _appd_get(self, path: str, params: typing.Any) -> typing.Any:
-        transport = None
+    def _socket_path(self) -> str | None:
         if self.url and not self.url.startswith('http'):
-            transport = httpx.HTTPTransport(uds=self.url)
-            print(f"Using HTTP socket: {self.url}")
+            return self.url
         elif not self.url:
-            transport = httpx.HTTPTransport(uds=self.ROFL_SOCKET_PATH)
-            print(f"Using unix domain socket: {self.ROFL_SOCKET_PATH}")
+            return self.ROFL_SOCKET_PATH
+        return None
+
+    def _base_url(self) -> str:
+        return self.url if self.url and self.url.startswith('http') else "http://localhost"
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            uds = self._socket_path()
+            transport = httpx.HTTPTransport(uds=uds, limits=self.limits)
+            self._client = httpx.Client(base_url=self._base_url(), transport=transport, timeout=self.timeout)
+            logger.info("Using rofl-appd at %s", uds or self.url)
+        return self._client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            uds = self._socket_path()
+            transport = httpx.AsyncHTTPTransport(uds=uds, limits=self.limits)
+            self._async_client = httpx.AsyncClient(base_url=self._base_url(), transport=transport, timeout=self.timeout)
+            logger.info("Using rofl-appd at %s", uds or self.url)
+        return self._async_client
 
-        client = httpx.Client(transport=transport)
-
-        url = self.url if self.url and self.url.startswith('http') else "http://localhost"
-        print(f"  Getting {params} from {url+path}")
-        response = client.get(url + path, params=params, timeout=None)
-        response.raise_for_status()
+    def _appd_get(self, path: str, params: typing.Any) -> typing.Any:
+        with timed(ROFL_SECONDS, ROFL_ERRORS, method=path):
+            response = self._get_client().get(path, params=params)
+            response.raise_for_status()
         return response
 
     def _appd_post(self, path: str, payload: typing.Any) -> typing.Any:
-        transport = None
-        if self.url and not self.url.startswith('http'):
-            transport = httpx.HTTPTransport(uds=self.url)
-            print(f"Using HTTP socket: {self.url}")
-        elif not self.url:
-            transport = httpx.HTTPTransport(uds=self.ROFL_SOCKET_PATH)
-            print(f"Using unix domain socket: {self.ROFL_SOCKET_PATH}")
-
-        client = httpx.Client(transport=transport)
+        logger.debug("POST %s %s", path, payload)
+        with timed(ROFL_SECONDS, ROFL_ERRORS, method=path):
+            response = self._get_client().post(path, json=payload)
+            response.raise_for_status()
+        return response
 
-        url = self.url if self.url and self.url.startswith('http') else "http://localhost"
-        print(f"  Posting {json.dumps(payload)} to {url+path}")
-        response = client.post(url + path, json=payload, timeout=None)
-        response.raise_for_status()
+    async def _appd_get_async(self, path: str, params: typing.Any) -> typing.Any:
+        with timed(ROFL_SECONDS, ROFL_ERRORS, method=path):
+            response = await self._get_async_client().get(path, params=params)
+            response.raise_for_status()
         return response
 
-    def fetch_appid(self) -> str:
-        path = '/rofl/v1/app/id'
-        response = self._appd_get(path, {})
-        return response.content.decode("utf-8")
+    async def _appd_post_async(self, path: str, payload: typing.Any) -> typing.Any:
+        logger.debug("POST %s %s", path, payload)
+        with timed(ROFL_SECONDS, ROFL_ERRORS, method=path):
+            response = await self._get_async_client().post(path, json=payload)
+            response.raise_for_status()
+        return response
 
-    def fetch_key(self, id: str) -> str:
-        payload = {
+    @staticmethod
+    def _key_payload(id: str) -> typing.Any:
+        return {
             "key_id": id,
             "kind": "secp256k1"
         }
 
-        path = '/rofl/v1/keys/generate'
-
-        response = self._appd_post(path, payload).json()
-        return response["key"]
-
-    def submit_tx(self, tx: TxParams) -> typing.Any:
+    @staticmethod
+    def _tx_payload(tx: TxParams) -> typing.Any:
         payload = {
             "tx": {
                 "kind": "eth",
                 "data": {
                     "gas_limit": tx["gas"],
                     "value": tx["value"],
-                    "data": tx["data"].lstrip("0x"),
+                    "data": tx["data"].removeprefix("0x"),
                 },
             },
             "encrypted": False,
@@ -78,11 +107,57 @@ class RoflUtilityAppd(RoflUtility):
 
         # Contract create transactions don't have "to", others have it.
         if tx.get("to"):
-            payload["tx"]["data"]["to"] = tx["to"].lstrip("0x")
+            payload["tx"]["data"]["to"] = tx["to"].removeprefix("0x")
 
-        path = '/rofl/v1/tx/sign-submit'
+        return payload
 
-        result = self._appd_post(path, payload).json()
+    @staticmethod
+    def _decode_tx_result(result: typing.Any) -> typing.Any:
         if result["data"]:
             result["data"] = cbor2.loads(bytes.fromhex(result["data"]))
-        return result
\ No newline at end of file
+        return result
+
+    def fetch_appid(self) -> str:
+        path = '/rofl/v1/app/id'
+        response = self._appd_get(path, {})
+        return response.content.decode("utf-8")
+
+    def fetch_key(self, id: str) -> str:
+        path = '/rofl/v1/keys/generate'
+
+        response = self._appd_post(path, self._key_payload(id)).json()
+        return response["key"]
+
+    def submit_tx(self, tx: TxParams) -> typing.Any:
+        path = '/rofl/v1/tx/sign-submit'
+
+        result = self._appd_post(path, self._tx_payload(tx)).json()
+        return self._decode_tx_result(result)
+
+    async def fetch_appid_async(self) -> str:
+        path = '/rofl/v1/app/id'
+        response = await self._appd_get_async(path, {})
+        return response.content.decode("utf-8")
+
+    async def fetch_key_async(self, id: str) -> str:
+        path = '/rofl/v1/keys/generate'
+
+        response = (await self._appd_post_async(path, self._key_payload(id))).json()
+        return response["key"]
+
+    async def submit_tx_async(self, tx: TxParams) -> typing.Any:
+        path = '/rofl/v1/tx/sign-submit'
+
+        result = (await self._appd_post_async(path, self._tx_payload(tx))).json()
+        return self._decode_tx_result(result)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
@@ -1,15 +1,20 @@
+import asyncio
 import cbor2
 import typing
 from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
 from web3.types import TxParams
 
+from .Metrics import ROFL_ERRORS, ROFL_SECONDS, timed
 from .RoflUtility import RoflUtility
 
 class RoflUtilityLocalnet(RoflUtility):
-    def __init__(self, w3: Web3 = None):
+    def __init__(self, w3: Web3 = None, receipt_timeout: float = 120.0, poll_interval: float = 0.5):
         self.w3 = w3
         if w3 is None:
             self.w3 = Web3(Web3.HTTPProvider("http://localhost:8545"))
+        self.receipt_timeout = receipt_timeout
+        self.poll_interval = poll_interval
 
     def fetch_appid(self) -> str:
         return "rofl11qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqtdv26p"
@@ -17,15 +22,39 @@ class RoflUtilityLocalnet(RoflUtility):
     def fetch_key(self, id: str) -> str:
         pass
 
-    def submit_tx(self, tx: TxParams) -> typing.Any:
-        # Sign and send the transaction
-        tx_hash = self.w3.eth.send_transaction(tx)
-
-        # Wait for transaction receipt
-        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-
+    def _tx_result(self, tx_receipt: typing.Any) -> typing.Any:
         # Check if transaction was successful
         if tx_receipt['status'] == 1:
             return {"data": cbor2.loads(bytes.fromhex("a1626f6b40")), "tx_receipt": tx_receipt}
         else:
-            return {"tx_receipt": tx_receipt}
\ No newline at end of file
+            return {"tx_receipt": tx_receipt}
+
+    def submit_tx(self, tx: TxParams) -> typing.Any:
+        with timed(ROFL_SECONDS, ROFL_ERRORS, method="submit_tx"):
+            # Sign and send the transaction
+            tx_hash = self.w3.eth.send_transaction(tx)
+
+            # Wait for transaction receipt
+            tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.receipt_timeout)
+        return self._tx_result(tx_receipt)
+
+    async def fetch_nonce_async(self) -> int | None:
+        return await asyncio.to_thread(self.w3.eth.get_transaction_count, self.w3.eth.default_account, 'pending')
+
+    async def submit_tx_async(self, tx: TxParams) -> typing.Any:
+        with timed(ROFL_SECONDS, ROFL_ERRORS, method="submit_tx"):
+            return await self._submit_tx_async(tx)
+
+    async def _submit_tx_async(self, tx: TxParams) -> typing.Any:
+        tx_hash = await asyncio.to_thread(self.w3.eth.send_transaction, tx)
+
+        # Poll for the receipt without holding a worker thread in between.
+        deadline = asyncio.get_running_loop().time() + self.receipt_timeout
+        while True:
+            try:
+                tx_receipt = await asyncio.to_thread(self.w3.eth.get_transaction_receipt, tx_hash)
+                return self._tx_result(tx_receipt)
+            except TransactionNotFound:
+                if asyncio.get_running_loop().time() > deadline:
+                    raise TimeExhausted(f"Transaction {tx_hash.to_0x_hex()} is not in the chain after {self.receipt_timeout} seconds")
+                await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import typing
+from web3 import AsyncWeb3
+from web3.contract.async_contract import AsyncContractFunction
+from web3.contract.contract import ContractFunction
+
+logger = logging.getLogger(__name__)
+
+# View methods whose results don't change unless the oracle changes them
+# itself, see forget.
+IMMUTABLE_FUNCTIONS = frozenset({"decimals", "description", "version"})
+
+# (contract address, method, arguments) of a call.
+CallKey = tuple[str, str, tuple]
+
+
+class RpcBatcher:
+    """
+    Coalesces read-only contract calls into JSON-RPC batches.
+
+    Calls arriving within `window` seconds of the first one are sent as
+    batch requests of at most `max_batch_size` calls, and identical calls
+    share a single result. Results of IMMUTABLE_FUNCTIONS are kept in memory
+    and served without any request. If a batch request fails, e.g. because
+    the endpoint doesn't support batching, its calls are made concurrently
+    one by one.
+
+    Calls are built on the oracle's synchronous contract instances and made
+    on the async web3 instance. Batched calls bypass the Sapphire calldata
+    encryption, so this is only meant for public view methods.
+
+    :param w3: Async web3 instance the calls are made on
+    :param window: Seconds to wait for other calls to join the batch
+    :param max_batch_size: Maximum number of calls in a single batch request
+    """
+
+    def __init__(self, w3: AsyncWeb3, window: float = 0.01, max_batch_size: int = 100):
+        self.w3 = w3
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: dict[CallKey, tuple[ContractFunction, list[asyncio.Future]]] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._results: dict[CallKey, typing.Any] = {}  # call -> result of an immutable function
+        self._functions: dict[tuple[str, str], typing.Any] = {}  # (contract address, method) -> async contract function
+
+    async def call(self, function: ContractFunction) -> typing.Any:
+        """Makes the view call as part of the next batch and returns its result"""
+        key = (function.address, function.fn_name, tuple(function.args))
+        if key in self._results:
+            return self._results[key]
+        future = asyncio.get_running_loop().create_future()
+        if key in self._pending:
+            self._pending[key][1].append(future)
+        else:
+            self._pending[key] = (function, [future])
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def call_all(self, functions: list[ContractFunction]) -> list[typing.Any]:
+        """Makes the view calls in as few batches as possible and returns their results in order"""
+        return await asyncio.gather(*(self.call(function) for function in functions))
+
+    def forget(self, address: str):
+        """Drops the cached results of the contract, e.g. after changing its decimals"""
+        self._results = {key: result for key, result in self._results.items() if key[0] != address}
+
+    def _async_function(self, function: ContractFunction) -> AsyncContractFunction:
+        factory = self._functions.get((function.address, function.fn_name))
+        if factory is None:
+            contract = self.w3.eth.contract(address=function.address, abi=function.contract_abi)
+            factory = self._functions[(function.address, function.fn_name)] = contract.functions[function.fn_name]
+        return factory(*function.args, **function.kwargs)
+
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+
+        keys = list(pending.keys())
+        await asyncio.gather(*(
+            self._flush_chunk(keys[i:i+self.max_batch_size], pending)
+            for i in range(0, len(keys), self.max_batch_size)
+        ))
+
+    async def _flush_chunk(self, keys: list[CallKey], pending: dict):
+        functions = [self._async_function(pending[key][0]) for key in keys]
+        results = None
+        if len(functions) > 1:
+            try:
+                async with self.w3.batch_requests() as batch:
+                    for function in functions:
+                        batch.add(function)
+                    results = await batch.async_execute()
+            except Exception as e:
+                logger.warning("JSON-RPC batch request failed: %s. Falling back to individual calls.", e)
+        if results is None:
+            results = await asyncio.gather(*(function.call() for function in functions), return_exceptions=True)
+
+        for key, result in zip(keys, results):
+            if key[1] in IMMUTABLE_FUNCTIONS and not isinstance(result, BaseException):
+                self._results[key] = result
+            for future in pending[key][1]:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import typing
+from multiprocessing.connection import Connection
+
+from .HashRing import HashRing
+from .HttpServer import HttpResponse, HttpServer
+from .Metrics import REGISTRY, configure_logging
+from .TxSubmitter import TxSubmitter
+
+logger = logging.getLogger(__name__)
+
+# Seconds a stopped worker is given to save its state before it is killed.
+STOP_TIMEOUT = 10.0
+
+# Runs in each worker process as target(worker, connection, pairs, *args).
+WorkerTarget = typing.Callable[..., None]
+
+
+class CoordinatorLink:
+    """
+    Worker's end of the pipe to the ShardCoordinator.
+
+    Stands in for the worker's TxSubmitter: transactions are sent to the
+    coordinator, which assigns their nonces and submits them, and the
+    returned futures resolve to the coordinator's SubmitResult. Pairs
+    assigned to the worker later on, i.e. taken over from a worker which
+    died, are passed to `on_assign`.
+
+    :param connection: Worker's end of the pipe
+    :param on_assign: Coroutine function called with the names of the pairs newly assigned to the worker
+    """
+
+    def __init__(self, connection: Connection, on_assign: typing.Callable[[list[str]], typing.Awaitable] | None = None):
+        self.connection = connection
+        self.on_assign = on_assign
+        self.closed: asyncio.Future | None = None  # Resolved once the coordinator is gone
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._futures: dict[int, asyncio.Future] = {}  # request ID -> future of the submitted transaction
+        self._next_id = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, tx: dict) -> asyncio.Future:
+        """Sends the transaction to the coordinator and returns a future resolving to its SubmitResult"""
+        if self._loop is None:
+            self.start()
+        future = self._loop.create_future()
+        if self.closed.done():
+            future.set_exception(ConnectionError("Coordinator is gone"))
+            return future
+        self._next_id += 1
+        self._futures[self._next_id] = future
+        self.connection.send(("submit", self._next_id, dict(tx)))
+        return future
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self.closed = self._loop.create_future()
+        self._loop.add_reader(self.connection.fileno(), self._receive)
+
+    async def stop(self):
+        if self._loop is not None and not self.closed.done():
+            self._loop.remove_reader(self.connection.fileno())
+        for task in self._tasks:
+            task.cancel()
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+
+    def _receive(self):
+        try:
+            while self.connection.poll():
+                self._handle(*self.connection.recv())
+        except (EOFError, OSError):
+            logger.error("Lost the connection to the coordinator")
+            self._loop.remove_reader(self.connection.fileno())
+            for future in self._futures.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Coordinator is gone"))
+            self._futures.clear()
+            if not self.closed.done():
+                self.closed.set_result(None)
+
+    def _handle(self, kind: str, *message):
+        if kind == "assign":
+            [pairs] = message
+            logger.info("Taking over %s", ", ".join(pairs))
+            if self.on_assign is not None:
+                task = asyncio.ensure_future(self.on_assign(pairs))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return
+
+        request_id, value = message
+        future = self._futures.pop(request_id, None)
+        if future is None or future.done():
+            return
+        if kind == "result":
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+
+class ShardCoordinator:
+    """
+    Shards the pairs over worker processes and submits their transactions.
+
+    Pairs are assigned to the workers by consistent hashing of their names,
+    so a pair is observed by the same worker across restarts. Each worker
+    fetches and aggregates its own pairs and sends its transactions over a
+    pipe to the coordinator, whose single TxSubmitter owns the signer and its
+    nonce sequence.
+
+    If a worker dies, it is dropped from the ring and its pairs are taken
+    over by the remaining workers, without moving any other pair. Once no
+    worker is left, the coordinator exits.
+
+    :param tx_submitter: Submission pipeline shared by all workers
+    :param pairs: Names of all pairs
+    :param workers: Number of worker processes
+    :param target: Function run in each worker process
+    :param args: Additional, picklable arguments of the target
+    :param metrics_port: Port to serve the coordinator's Prometheus metrics on. If None, they are not served
+    """
+
+    def __init__(self,
+                 tx_submitter: TxSubmitter,
+                 pairs: list[str],
+                 workers: int,
+                 target: WorkerTarget,
+                 args: tuple = (),
+                 metrics_port: int | None = None):
+        self.tx_submitter = tx_submitter
+        self.pairs = pairs
+        self.target = target
+        self.args = args
+        self.ring = HashRing(range(workers))
+        self.assignment = self.ring.assign(pairs)  # worker -> names of its pairs
+        # Workers without any pair are not started.
+        for worker, assigned in list(self.assignment.items()):
+            if not assigned:
+                self.ring.remove(worker)
+                del self.assignment[worker]
+        self.processes: dict[int, multiprocessing.Process] = {}
+        self.connections: dict[int, Connection] = {}
+        # Workers are started from a fresh interpreter, not forked from the event loop's threads.
+        self._context = multiprocessing.get_context("spawn")
+        self._done: asyncio.Future | None = None
+
+        self.metrics_server = None
+        if metrics_port is not None:
+            self.metrics_server = HttpServer(port=metrics_port)
+            self.metrics_server.route("/metrics", self.serve_metrics)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._done = loop.create_future()
+        for worker, pairs in self.assignment.items():
+            connection, worker_connection = self._context.Pipe()
+            process = self._context.Process(
+                target=self.target,
+                args=(worker, worker_connection, pairs, *self.args),
+                name=f"worker-{worker}",
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            self.processes[worker] = process
+            self.connections[worker] = connection
+            loop.add_reader(connection.fileno(), self._receive, worker)
+            loop.add_reader(process.sentinel, self._exited, worker)
+            logger.info("Started worker %d (pid %d) with %d pair(s)", worker, process.pid, len(pairs))
+
+    async def stop(self):
+        for worker in list(self.processes):
+            self._detach(worker)
+        processes = list(self.processes.values())
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            await asyncio.to_thread(process.join, STOP_TIMEOUT)
+            if process.is_alive():
+                logger.warning("Worker %s didn't stop in time, killing it", process.name)
+                process.kill()
+                await asyncio.to_thread(process.join)
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+    def _detach(self, worker: int):
+        """Stops watching the worker's pipe and process"""
+        loop = asyncio.get_running_loop()
+        if worker in self.processes:
+            loop.remove_reader(self.processes[worker].sentinel)
+        if worker in self.connections:
+            loop.remove_reader(self.connections[worker].fileno())
+
+    def _receive(self, worker: int):
+        connection = self.connections[worker]
+        try:
+            while connection.poll():
+                kind, request_id, tx = connection.recv()
+                if kind != "submit":
+                    logger.warning("Unknown message %s from worker %d", kind, worker)
+                    continue
+                future = self.tx_submitter.submit(tx)
+                future.add_done_callback(lambda future, request_id=request_id: self._reply(worker, request_id, future))
+        except (EOFError, OSError):
+            # The process sentinel follows shortly.
+            asyncio.get_running_loop().remove_reader(connection.fileno())
+
+    def _reply(self, worker: int, request_id: int, future: asyncio.Future):
+        connection = self.connections.get(worker)
+        if connection is None or future.cancelled():
+            return
+        exception = future.exception()
+        try:
+            try:
+                connection.send(("result", request_id, future.result()) if exception is None else ("error", request_id, exception))
+            except (TypeError, AttributeError, ValueError) as e:
+                # Not picklable, e.g. an exception holding a client object.
+                connection.send(("error", request_id, RuntimeError(repr(exception or e))))
+        except OSError:
+            # The worker died meanwhile, the transaction was submitted regardless.
+            pass
+
+    def _exited(self, worker: int):
+        # Transactions sent right before the worker died are still submitted.
+        self._receive(worker)
+        self._detach(worker)
+        process = self.processes.pop(worker)
+        self.connections.pop(worker).close()
+        process.join()
+        logger.error("Worker %d exited with code %s", worker, process.exitcode)
+        self.rebalance(worker)
+
+    def rebalance(self, worker: int):
+        """Drops the worker from the ring and assigns its pairs to the remaining workers"""
+        self.ring.remove(worker)
+        self.assignment.pop(worker, None)
+        if not self.ring:
+            if not self._done.done():
+                self._done.set_result(None)
+            return
+
+        assignment = self.ring.assign(self.pairs)
+        for node, pairs in assignment.items():
+            taken_over = [pair for pair in pairs if pair not in self.assignment.get(node, [])]
+            if not taken_over:
+                continue
+            logger.info("Worker %d takes over %s from worker %d", node, ", ".join(taken_over), worker)
+            try:
+                self.connections[node].send(("assign", taken_over))
+            except OSError:
+                # Rebalanced again once its sentinel fires.
+                continue
+        self.assignment = assignment
+
+    async def serve_metrics(self, request) -> HttpResponse:
+        return HttpResponse(body=REGISTRY.render().encode(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    async def run(self):
+        try:
+            if self.metrics_server is not None:
+                await self.metrics_server.start()
+            self.start()
+            await self._done
+        finally:
+            await self.stop()
+            if self.metrics_server is not None:
+                await self.metrics_server.stop()
+            await self.tx_submitter.stop()
+            await self.tx_submitter.rofl_utility.aclose()
+        logger.error("All workers exited. Aborting.")
+        exit(1)
+
+
+def run_worker(worker: int, connection: Connection, pairs: list[str], options: dict, log_level: str):
+    """
+    Entry point of a worker process, running PriceOracle(**options) for its pairs.
+
+    Each worker keeps its own state in a subdirectory of the state directory
+    and serves its metrics and rounds on its own ports, offset by its index
+    from the coordinator's.
+    """
+    # Stopped by the coordinator with SIGTERM rather than by the terminal's
+    # SIGINT, so that the coordinator keeps submitting while it shuts down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_logging(log_level)
+    options = dict(options)
+    if options.get("state_dir"):
+        options["state_dir"] = os.path.join(options["state_dir"], f"worker-{worker}")
+    if options.get("metrics_port") is not None:
+        options["metrics_port"] += 1 + worker
+    if options.get("read_port") is not None:
+        options["read_port"] += worker
+    asyncio.run(_run_worker(connection, pairs, options))
+
+
+async def _run_worker(connection: Connection, pairs: list[str], options: dict):
+    from .PriceOracle import PriceOracle
+
+    link = CoordinatorLink(connection)
+    link.start()
+    oracle = PriceOracle(**options, shard=pairs, tx_submitter=link)
+    link.on_assign = oracle.own
+    task = asyncio.create_task(oracle.run())
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    # Workers outliving the coordinator, e.g. if it was killed, stop too.
+    link.closed.add_done_callback(lambda _: task.cancel())
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+
+from .ContractUtility import ContractUtility
+
+logger = logging.getLogger(__name__)
+
+
+class StateCache:
+    """
+    Versioned on-disk cache of the state needed to warm-start the oracle.
+
+    Stores the ABIs extracted from the forge artifacts and, per feed, its
+    aggregator address, decimals, description, version and the last
+    submitted round.
+    Feeds are keyed by (network, directory address, app ID, pair), so a
+    different deployment never picks up a stale entry. Entries are trusted on
+    startup and validated against the chain afterwards.
+
+    The cache lives in a single JSON file which is replaced atomically on
+    save. A file with a different version or an unreadable one is ignored.
+
+    :param path: Path of the cache file. If None, nothing is persisted
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.contracts: dict[str, dict] = {}  # contract name -> {"mtime", "abi", "bytecode"}
+        self.feeds: dict[str, dict] = {}  # feed key -> {"address", "decimals", "description", "round_id", "version"}
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def feed_key(network: str, directory_address: str, app_id: str, pair: str) -> str:
+        return "/".join((network, directory_address.lower(), app_id, pair))
+
+    def load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable state cache %s: %s", self.path, e)
+            return
+        if data.get("version") != self.VERSION:
+            logger.warning("Ignoring state cache %s of version %s", self.path, data.get("version"))
+            return
+        self.contracts = data.get("contracts", {})
+        self.feeds = data.get("feeds", {})
+
+    def save(self):
+        """Writes the cache to disk if anything changed since the last save"""
+        if self.path is None or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"version": self.VERSION, "contracts": self.contracts, "feeds": self.feeds}, file)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def get_contract(self, contract_name: str) -> (str, str):
+        """Returns ABI and bytecode of the contract, parsing its forge artifact only if it changed"""
+        artifact_path = ContractUtility.artifact_path(contract_name)
+        mtime = artifact_path.stat().st_mtime if artifact_path.exists() else None
+        cached = self.contracts.get(contract_name)
+        if cached is not None and (mtime is None or cached["mtime"] == mtime):
+            return cached["abi"], cached["bytecode"]
+
+        abi, bytecode = ContractUtility.get_contract(contract_name)
+        self.contracts[contract_name] = {"mtime": mtime, "abi": abi, "bytecode": bytecode}
+        self._dirty = True
+        return abi, bytecode
+
+    def get_feed(self, key: str) -> dict | None:
+        return self.feeds.get(key)
+
+    def set_feed(self, key: str, address: str, decimals: int, description: str, round_id: int, version: int = 0):
+        self.feeds[key] = {"address": address, "decimals": decimals, "description": description, "round_id": round_id, "version": version}
+        self._dirty = True
+
+    def record_round(self, key: str, round_id: int):
+        """Stores the last submitted round of the feed"""
+        feed = self.feeds.get(key)
+        if feed is not None and round_id > feed["round_id"]:
+            feed["round_id"] = round_id
+            self._dirty = True
+
+    def invalidate_feed(self, key: str):
+        if self.feeds.pop(key, None) is not None:
+            self._dirty = True
@@ -0,0 +1,95 @@
+import json
+
+
+class SubmitPolicy:
+    """
+    Decides whether an answer of a feed is worth submitting on-chain.
+
+    Without a deviation threshold, an answer is submitted every submit
+    period. With one, an answer is submitted as soon as it deviates from the
+    last submitted one by at least `deviation_bps` basis points, even in the
+    middle of a period. Otherwise it is submitted at the end of a period
+    only if waiting for the next one would exceed `heartbeat` seconds since
+    the last submission.
+
+    :param deviation_bps: Minimum deviation from the last answer in basis points. 0 submits every period
+    :param heartbeat: Maximum seconds between submissions. If None, feeds are only updated on deviation
+    """
+
+    def __init__(self, deviation_bps: float = 0.0, heartbeat: float | None = None):
+        self.deviation_bps = deviation_bps
+        self.heartbeat = heartbeat
+        self.last_answer: int | None = None
+        self.last_submitted_at: float | None = None
+
+    def deviation(self, answer: int) -> float:
+        """Returns the deviation of the answer from the last submitted one in basis points"""
+        if self.last_answer is None or self.last_answer == 0:
+            return float("inf")
+        return abs(answer - self.last_answer) * 10_000 / abs(self.last_answer)
+
+    def should_submit(self, answer: int, now: float, submit_period: float, period_due: bool) -> bool:
+        if self.deviation_bps == 0:
+            return period_due
+        if self.deviation(answer) >= self.deviation_bps:
+            return True
+        if not period_due or self.heartbeat is None:
+            return False
+        return self.last_submitted_at is None or now - self.last_submitted_at + submit_period > self.heartbeat
+
+    def record_submission(self, answer: int, submitted_at: float):
+        self.last_answer = answer
+        self.last_submitted_at = submitted_at
+
+
+def parse_pair_values(value: str | None) -> tuple[float | None, dict[str, float]]:
+    """
+    Parses a CLI value which is a number for all pairs or comma-separated
+    overrides for single pairs, e.g. 50,bitstamp.net/btc/usd=20
+
+    :return: The value for all pairs and the per-pair ones
+    """
+    default, values = None, {}
+    if value is None or len(value) == 0:
+        return default, values
+    for item in value.split(","):
+        if "=" in item:
+            pair, v = item.rsplit("=", 1)
+            values[pair] = float(v)
+        else:
+            default = float(item)
+    return default, values
+
+
+def load_submit_policies(pairs: list[str], deviation_bps: str | None, heartbeat: str | None, policy_file: str | None) -> dict[str, SubmitPolicy]:
+    """
+    Builds the submit policy of each pair from the CLI values and the JSON policy file.
+
+    The file maps pair names, or "default" for all pairs, to objects with
+    optional "deviation_bps" and "heartbeat" fields. Per-pair values take
+    precedence over values for all pairs, and CLI values over the file's.
+    """
+    file_policies = {}
+    if policy_file is not None and len(policy_file) > 0:
+        with open(policy_file, "r") as file:
+            file_policies = json.load(file)
+
+    cli_policies = {}
+    for field, value in (("deviation_bps", deviation_bps), ("heartbeat", heartbeat)):
+        default, values = parse_pair_values(value)
+        if default is not None:
+            cli_policies.setdefault("default", {})[field] = default
+        for pair, v in values.items():
+            cli_policies.setdefault(pair, {})[field] = v
+
+    unknown = (file_policies.keys() | cli_policies.keys()) - set(pairs) - {"default"}
+    if unknown:
+        raise ValueError(f"submit policy for unknown pair(s) {", ".join(sorted(unknown))}")
+
+    policies = {}
+    for pair in pairs:
+        params = {}
+        for layer in (file_policies.get("default"), cli_policies.get("default"), file_policies.get(pair), cli_policies.get(pair)):
+            params.update(layer or {})
+        policies[pair] = SubmitPolicy(params.get("deviation_bps", 0.0), params.get("heartbeat"))
+    return policies
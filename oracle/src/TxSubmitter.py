@@ -0,0 +1,189 @@
+import asyncio
+import httpx
+import logging
+from dataclasses import dataclass
+import typing
+from web3.exceptions import TimeExhausted
+from web3.types import TxParams
+
+from .RoflUtility import RoflUtility
+
+logger = logging.getLogger(__name__)
+
+# Errors raised before the transaction reached the backend, so it surely
+# wasn't broadcast. After any other error it may have been.
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, ConnectionRefusedError, FileNotFoundError)
+
+
+@dataclass
+class SubmitResult:
+    """Outcome and statistics of a submitted transaction"""
+    result: typing.Any
+    attempts: int
+    latency: float  # Seconds between enqueueing and the transaction being included.
+    nonce: int | None = None
+    gas_used: int | None = None
+
+
+class TxSubmitter:
+    """
+    Submission pipeline shared by all feeds.
+
+    Transactions are put on a queue and submitted concurrently, up to
+    `max_in_flight` at once. If the backend signs transactions locally,
+    nonces are assigned here so that several transactions can be pending at
+    the same time. A transaction that isn't included in time is replaced by
+    one with the same nonce and a bumped gas price. Other failures are
+    retried up to `max_attempts` times only if the transaction surely
+    wasn't broadcast, i.e. on NOT_SENT_ERRORS or, with a local nonce, if the
+    signer's pending nonce hasn't moved past it. Transactions still queued
+    or in flight on stop are cancelled.
+
+    :param rofl_utility: Backend which signs and submits the transactions
+    :param max_in_flight: Maximum number of transactions submitted concurrently
+    :param max_attempts: Maximum number of submissions of a single transaction
+    :param fee_bump: Gas price multiplier of a replacement transaction
+    :param retry_delay: Seconds to wait before retrying a failed submission
+    """
+
+    def __init__(self,
+                 rofl_utility: RoflUtility,
+                 max_in_flight: int = 16,
+                 max_attempts: int = 3,
+                 fee_bump: float = 1.125,
+                 retry_delay: float = 1.0):
+        self.rofl_utility = rofl_utility
+        self.max_in_flight = max_in_flight
+        self.max_attempts = max_attempts
+        self.fee_bump = fee_bump
+        self.retry_delay = retry_delay
+
+        self._queue: asyncio.Queue | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self._in_flight: set[asyncio.Task] = set()
+        self._nonce_lock = asyncio.Lock()
+        self._next_nonce: int | None = None
+        self._reserved = 0  # Nonces reserved by transactions which aren't done yet
+        self._resync = False  # Whether to re-read the nonce once none is reserved
+
+    def submit(self, tx: TxParams) -> asyncio.Future:
+        """Enqueues the transaction and returns a future resolving to its SubmitResult"""
+        if self._dispatcher is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((dict(tx), future, asyncio.get_running_loop().time()))
+        return future
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for task in list(self._in_flight):
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            future.cancel()
+
+    async def _dispatch(self):
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        while True:
+            tx, future, enqueued = await self._queue.get()
+            try:
+                await semaphore.acquire()
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            task = asyncio.create_task(self._process(tx, future, enqueued))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+            task.add_done_callback(lambda _: semaphore.release())
+
+    async def _reserve_nonce(self) -> int | None:
+        async with self._nonce_lock:
+            if self._next_nonce is None:
+                self._next_nonce = await self.rofl_utility.fetch_nonce_async()
+            if self._next_nonce is None:
+                return None
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            self._reserved += 1
+            return nonce
+
+    async def _process(self, tx: TxParams, future: asyncio.Future, enqueued: float):
+        nonce = None
+        try:
+            nonce = await self._reserve_nonce()
+            if nonce is not None:
+                tx['nonce'] = nonce
+            await self._submit(tx, nonce, future, enqueued)
+        finally:
+            # Resolves the future if the submission was cancelled, e.g. on stop.
+            future.cancel()
+            if nonce is not None:
+                self._reserved -= 1
+                if self._reserved == 0 and self._resync:
+                    # The nonces of failed transactions may have been left
+                    # unused, so the sequence is resynchronized with the chain.
+                    self._next_nonce = None
+                    self._resync = False
+
+    async def _submit(self, tx: TxParams, nonce: int | None, future: asyncio.Future, enqueued: float):
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                result = await self.rofl_utility.submit_tx_async(tx)
+                break
+            except TimeExhausted as e:
+                # Only a replacement with the same nonce can't be included twice.
+                if attempts >= self.max_attempts or nonce is None:
+                    self._fail(future, e)
+                    return
+                if 'gasPrice' in tx:
+                    tx['gasPrice'] = int(tx['gasPrice'] * self.fee_bump) + 1
+                    logger.warning("Transaction with nonce %d stuck, replacing it with gas price %d", nonce, tx['gasPrice'])
+            except Exception as e:
+                if attempts >= self.max_attempts or not await self._not_sent(e, nonce):
+                    self._fail(future, e)
+                    return
+                await asyncio.sleep(self.retry_delay)
+
+        gas_used = None
+        if isinstance(result, dict) and result.get("tx_receipt") is not None:
+            gas_used = result["tx_receipt"].get("gasUsed")
+
+        if not future.done():
+            future.set_result(SubmitResult(
+                result=result,
+                attempts=attempts,
+                latency=asyncio.get_running_loop().time() - enqueued,
+                nonce=nonce,
+                gas_used=gas_used,
+            ))
+
+    async def _not_sent(self, e: Exception, nonce: int | None) -> bool:
+        """Returns whether the failed transaction surely wasn't broadcast, so that it can be resubmitted"""
+        if isinstance(e, NOT_SENT_ERRORS):
+            return True
+        if nonce is None:
+            logger.warning("Not retrying transaction which may have been sent: %r", e)
+            return False
+        try:
+            pending_nonce = await self.rofl_utility.fetch_nonce_async()
+        except Exception as nonce_error:
+            logger.warning("Not retrying transaction with nonce %d, checking its nonce failed: %r", nonce, nonce_error)
+            return False
+        if pending_nonce is None or pending_nonce > nonce:
+            logger.warning("Not retrying transaction with nonce %d which may have been sent: %r", nonce, e)
+            return False
+        return True
+
+    def _fail(self, future: asyncio.Future, e: Exception):
+        self._resync = True
+        if not future.done():
+            future.set_exception(e)
@@ -0,0 +1,64 @@
+import unittest
+
+from ..src.AggregationWindow import AggregationWindow
+
+
+class TestAggregationWindow(unittest.TestCase):
+    def test_median(self):
+        window = AggregationWindow()
+        for t, price in enumerate([30, 10, 20]):
+            window.add(price, t)
+        assert window.median() == 20
+        # True median of an even number of observations, not the upper one.
+        window.add(40, 3)
+        assert window.median() == 25
+
+    def test_max_size(self):
+        window = AggregationWindow(max_size=3)
+        for t, price in enumerate([100, 1, 2, 3]):
+            window.add(price, t)
+        assert len(window) == 3
+        assert window.started_at == 1
+        assert window.median() == 2
+        assert window.twap() == 1  # (1 * 1 + 2 * 1) // 2
+
+    def test_horizon(self):
+        window = AggregationWindow(horizon=10)
+        window.add(100, 0)
+        window.add(200, 5)
+        window.add(300, 15)
+        assert len(window) == 2
+        assert window.started_at == 5
+        assert window.twap() == 200
+
+    def test_estimators(self):
+        window = AggregationWindow()
+        for t, price in enumerate([1000] + [10] * 8 + [0]):
+            window.add(price, t * 10)
+        assert window.trimmed_mean(0.1) == 10
+
+        window = AggregationWindow()
+        window.add(100, 0)
+        window.add(200, 30)
+        window.add(999, 40)
+        assert window.twap() == 125  # (100 * 30 + 200 * 10) // 40
+        # Without volume, VWAP falls back to TWAP.
+        assert window.vwap() == 125
+
+        window = AggregationWindow()
+        window.add(100, 0, volume=3)
+        window.add(200, 1, volume=1)
+        assert window.vwap() == 125
+
+        window.clear()
+        assert len(window) == 0
+        window.add(50, 100)
+        assert window.median() == window.twap() == window.vwap() == 50
+
+    def test_large_prices(self):
+        """Scaled prices beyond 64 bits, which int128 answers allow, are aggregated exactly"""
+        window = AggregationWindow(max_size=2)
+        for t, price in enumerate([2**64, 2**100, 2**100 + 2]):
+            window.add(price, t)
+        assert window.median() == 2**100 + 1
+        assert window.twap() == 2**100
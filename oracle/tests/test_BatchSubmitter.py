@@ -0,0 +1,147 @@
+import asyncio
+import os
+import unittest
+from pathlib import Path
+from web3 import Web3
+
+from ..src.BatchSubmitter import BatchSubmitter, chunk_by_gas
+from ..src.ContractUtility import ContractUtility
+from ..src.GasCache import GasCache
+from ..src.RoflUtilityLocalnet import RoflUtilityLocalnet
+from .test_GasCache import SUBMIT_OBSERVATION_ABI, CountingProvider
+
+SUBMIT_OBSERVATIONS_ABI = [{
+    "type": "function",
+    "name": "submitObservations",
+    "inputs": [{
+        "name": "observations",
+        "type": "tuple[]",
+        "components": [
+            {"name": "feed", "type": "address"},
+            {"name": "roundId", "type": "uint80"},
+            {"name": "answer", "type": "int256"},
+            {"name": "startedAt", "type": "uint256"},
+            {"name": "updatedAt", "type": "uint256"},
+        ],
+    }],
+    "outputs": [],
+    "stateMutability": "nonpayable",
+}]
+
+
+class FakeTxSubmitter:
+    def __init__(self):
+        self.txs = []
+
+    def submit(self, tx):
+        self.txs.append(tx)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result({"batch": len(self.txs)})
+        return future
+
+
+def localnet_available() -> bool:
+    out = Path(__file__).parent.parent.parent / "contracts" / "out"
+    if not out.exists():
+        return False
+    return Web3(Web3.HTTPProvider("http://localhost:8545", request_kwargs={"timeout": 1})).is_connected()
+
+
+class TestBatchSubmitter(unittest.TestCase):
+    def test_chunk_by_gas(self):
+        assert chunk_by_gas([], 100) == []
+        assert chunk_by_gas([40, 40, 40, 40, 40], 100) == [[0, 1], [2, 3], [4]]
+        # An item larger than the limit still gets its own chunk.
+        assert chunk_by_gas([150, 10], 100) == [[0], [1]]
+
+    def test_batch(self):
+        """Observations submitted in the same window end up in a single transaction"""
+        w3 = Web3(CountingProvider())
+        directory = w3.eth.contract(address="0x5FbDB2315678afecb367f032d93F642f64180aa3", abi=SUBMIT_OBSERVATIONS_ABI)
+        feeds = [
+            w3.eth.contract(address=Web3.to_checksum_address(f"0x{i:040x}"), abi=SUBMIT_OBSERVATION_ABI)
+            for i in range(1, 4)
+        ]
+        tx_submitter = FakeTxSubmitter()
+
+        async def submit_all():
+            batch_submitter = BatchSubmitter(directory, GasCache(w3, gas_margin=1), tx_submitter, max_batch_gas=100_000, window=0.01)
+            return await asyncio.gather(*(
+                batch_submitter.submit(feed, 10 + i, 1000 + i, 1, 2) for i, feed in enumerate(feeds)
+            ))
+
+        results = asyncio.run(submit_all())
+        # Each feed estimates to 50000 gas, so only two fit into a batch.
+        assert results == [{"batch": 1}, {"batch": 1}, {"batch": 2}]
+        assert [tx["gas"] for tx in tx_submitter.txs] == [100_000, 50_000]
+        assert all(tx["to"] == directory.address for tx in tx_submitter.txs)
+
+    def test_batch_failure(self):
+        """A batch which can't be submitted fails the futures of its observations only"""
+        w3 = Web3(CountingProvider())
+        directory = w3.eth.contract(address="0x5FbDB2315678afecb367f032d93F642f64180aa3", abi=SUBMIT_OBSERVATIONS_ABI)
+        feeds = [
+            w3.eth.contract(address=Web3.to_checksum_address(f"0x{i:040x}"), abi=SUBMIT_OBSERVATION_ABI)
+            for i in range(1, 4)
+        ]
+
+        class FailingTxSubmitter(FakeTxSubmitter):
+            def submit(self, tx):
+                if not self.txs:
+                    self.txs.append(tx)
+                    raise RuntimeError("queue closed")
+                return super().submit(tx)
+
+        async def submit_all():
+            batch_submitter = BatchSubmitter(directory, GasCache(w3, gas_margin=1), FailingTxSubmitter(), max_batch_gas=100_000, window=0.01)
+            return await asyncio.wait_for(asyncio.gather(*(
+                batch_submitter.submit(feed, 10 + i, 1000 + i, 1, 2) for i, feed in enumerate(feeds)
+            ), return_exceptions=True), timeout=5)
+
+        results = asyncio.run(submit_all())
+        assert [type(result) for result in results[:2]] == [RuntimeError, RuntimeError]
+        assert results[2] == {"batch": 2}
+
+    @unittest.skipUnless(localnet_available(), "requires a running sapphire-localnet and compiled contracts")
+    def test_localnet_gas_per_feed(self):
+        """Compares gas per feed of individual and batched submissions on sapphire-localnet"""
+        w3 = ContractUtility("sapphire-localnet").w3
+        rofl_utility = RoflUtilityLocalnet(w3)
+        directory_abi, directory_bytecode = ContractUtility.get_contract("PriceFeedDirectory")
+        aggregator_abi, _ = ContractUtility.get_contract("SimpleAggregator")
+
+        receipt = rofl_utility.submit_tx(
+            w3.eth.contract(abi=directory_abi, bytecode=directory_bytecode).constructor().build_transaction()
+        )["tx_receipt"]
+        directory = w3.eth.contract(address=receipt["contractAddress"], abi=directory_abi)
+
+        num_feeds = 10
+        feeds = []
+        for i in range(num_feeds):
+            receipt = rofl_utility.submit_tx(
+                directory.functions.addFeed(f"test.org/{os.urandom(4).hex()}/usd", "0x" + "00" * 20, False).build_transaction()
+            )["tx_receipt"]
+            event = directory.events.FeedAdded().process_receipt(receipt)[0]
+            feeds.append(w3.eth.contract(address=event["args"]["aggregator"], abi=aggregator_abi))
+
+        individual_gas = 0
+        for round_id in (1, 2):
+            individual_gas = 0
+            for i, feed in enumerate(feeds):
+                receipt = rofl_utility.submit_tx(
+                    feed.functions.submitObservation(round_id, 1000 + i, 1, 2).build_transaction()
+                )["tx_receipt"]
+                assert receipt["status"] == 1
+                individual_gas += receipt["gasUsed"]
+
+        receipt = rofl_utility.submit_tx(
+            directory.functions.submitObservations([
+                (feed.address, 3, 1000 + i, 1, 2) for i, feed in enumerate(feeds)
+            ]).build_transaction()
+        )["tx_receipt"]
+        assert receipt["status"] == 1
+        batch_gas = receipt["gasUsed"]
+
+        print(f"Gas per feed: {individual_gas // num_feeds} individually, {batch_gas // num_feeds} batched")
+        assert feeds[0].functions.latestRoundData().call()[0] == 3
+        assert batch_gas < individual_gas
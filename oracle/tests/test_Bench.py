@@ -0,0 +1,24 @@
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+class TestBench(unittest.TestCase):
+    def test_smoke(self):
+        """Runs a short benchmark scenario end to end"""
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            subprocess.run(
+                [sys.executable, "-m", "bench", "--pairs", "3", "--duration", "7", "--submit-period", "6", "--rofl-latency", "0", "--output", output.name],
+                cwd=Path(__file__).parent.parent, check=True, capture_output=True, timeout=60,
+            )
+            results = json.load(output)
+
+        result = results["results"][0]
+        assert result["scenario"]["pairs"] == 3
+        assert result["fetch_latency"]["count"] > 0
+        assert result["tick_drift"]["count"] > 0
+        assert result["submitted"] >= 3
+        assert result["submit_failed"] == 0
@@ -0,0 +1,53 @@
+import unittest
+
+from ..src.CircuitBreaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, cooldown=10)
+        for _ in range(2):
+            breaker.check()
+            breaker.record_failure()
+        breaker.record_success()
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert 9 < breaker.open_remaining() <= 10
+        with self.assertRaises(CircuitOpenError):
+            breaker.check()
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=10, max_cooldown=15)
+        breaker.record_failure()
+        breaker.opened_at -= 10
+        assert breaker.state == HALF_OPEN
+
+        # A single probe is let through at a time.
+        breaker.check()
+        with self.assertRaises(CircuitOpenError):
+            breaker.check()
+        assert breaker.open_remaining() > 0
+
+        # A failed probe reopens the circuit for longer.
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.cooldown == 15
+
+        # A cancelled probe lets the next one through.
+        breaker.opened_at -= 15
+        breaker.check()
+        breaker.record_cancelled()
+        assert breaker.state == HALF_OPEN
+        breaker.check()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.cooldown == 10
+        breaker.check()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from ..src.CompositeFeed import composite_price, reject_outliers
+
+
+class TestCompositeFeed(unittest.TestCase):
+    def test_reject_outliers(self):
+        assert reject_outliers([100.0, 100.1, 99.9, 150.0]) == [100.0, 100.1, 99.9]
+        # Identical quotes don't turn a small spread into an outlier.
+        assert reject_outliers([100.0, 100.0, 100.05]) == [100.0, 100.0, 100.05]
+        # Too few samples to tell which one is off.
+        assert reject_outliers([100.0, 150.0]) == [100.0, 150.0]
+
+    def test_composite_price(self):
+        assert composite_price([100.0, 101.0, 99.0], quorum=2) == 100.0
+        assert composite_price([100.0, 100.2, 100.4, 0.01], quorum=3) == 100.2
+        # Quorum not reached after rejecting the outliers.
+        assert composite_price([100.0, 100.0, 100.0, 200.0, 300.0], quorum=4) is None
+        assert composite_price([], quorum=1) is None
@@ -0,0 +1,32 @@
+import asyncio
+import unittest
+
+from ..src.ContractUtility import ContractUtility
+
+
+class TestContractUtility(unittest.TestCase):
+    def test_async_w3(self):
+        """Reads go through the batcher on a Sapphire-wrapped async instance of the same network"""
+        contract_utility = ContractUtility("sapphire-localnet")
+        assert contract_utility.rpc_batcher.w3 is contract_utility.async_w3
+        assert str(contract_utility.async_w3.provider.endpoint_uri) == "http://localhost:8545"
+        assert "sapphire" in [name for _, name in contract_utility.async_w3.middleware_onion.middleware]
+        assert contract_utility.async_w3.eth.default_account == contract_utility.w3.eth.default_account
+
+    def test_connect(self):
+        """Requests share a pool of keep-alive connections"""
+        contract_utility = ContractUtility("sapphire-localnet")
+
+        async def connect():
+            await contract_utility.connect()
+            provider = contract_utility.async_w3.provider
+            session = await provider._request_session_manager.async_cache_and_return_session(provider.endpoint_uri)
+            keep_alive = not session.connector.force_close
+            await contract_utility.aclose()
+            return keep_alive, session.closed
+
+        assert asyncio.run(connect()) == (True, True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import asyncio
+import unittest
+
+from ..bench.FakeExchange import FakeExchange
+from ..src.ExchangeAdapter import EXCHANGE_ADAPTERS, FIRST, lookup
+from ..src.ExchangeClient import EXCHANGE_CLIENTS
+
+
+class TestExchangeAdapter(unittest.TestCase):
+    def test_lookup(self):
+        data = {"result": {"XXBTZUSD": {"c": ["60000.1", "1.0"]}}}
+        assert lookup(data, ("result", FIRST, "c", 0)) == "60000.1"
+
+    def test_format(self):
+        adapter = EXCHANGE_ADAPTERS["coinbase.com"]
+        assert adapter.format(adapter.path, "btc", "usd") == "/products/BTC-USD/ticker"
+
+    def test_fetch(self):
+        """Every adapter fetches single and bulk prices in its exchange's format"""
+        async def fetch_all():
+            exchange = FakeExchange()
+            exchange.markets = {("btc", "usd"), ("eth", "usd")}
+            await exchange.start()
+            base_urls = {name: client.base_url for name, client in EXCHANGE_CLIENTS.items()}
+            mirrors = {name: client.mirrors for name, client in EXCHANGE_CLIENTS.items()}
+            results = {}
+            try:
+                for name, adapter in EXCHANGE_ADAPTERS.items():
+                    client = EXCHANGE_CLIENTS[name]
+                    client.base_url, client.mirrors = exchange.http_url, []
+                    single = await adapter.fetch("btc", "usd")
+                    bulk = await adapter.fetch_bulk([("btc", "usd"), ("eth", "usd")]) if adapter.bulk else None
+                    results[name] = (single, bulk)
+                    await client.aclose()
+            finally:
+                for name, client in EXCHANGE_CLIENTS.items():
+                    client.base_url, client.mirrors = base_urls[name], mirrors[name]
+                await exchange.stop()
+            return results
+
+        results = asyncio.run(fetch_all())
+        assert results.keys() == EXCHANGE_ADAPTERS.keys()
+        for name, (single, bulk) in results.items():
+            assert single > 0, name
+            if EXCHANGE_ADAPTERS[name].bulk:
+                assert bulk.keys() == {("btc", "usd"), ("eth", "usd")}, name
+
+
+if __name__ == '__main__':
+    unittest.main()
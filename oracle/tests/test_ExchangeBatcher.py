@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+
+from ..src.ExchangeBatcher import ExchangeBatcher
+from ..src.ExchangeAdapter import EXCHANGE_ADAPTERS
+
+
+class TestExchangeBatcher(unittest.TestCase):
+    def test_coalesce(self):
+        """Concurrent requests are served by a single bulk request"""
+        bulk_calls = []
+        single_calls = []
+
+        async def fetcher(base, quote):
+            single_calls.append((base, quote))
+            return 1.0
+
+        async def bulk_fetcher(pairs):
+            bulk_calls.append(sorted(pairs))
+            return {pair: float(i + 2) for i, pair in enumerate(sorted(pairs))}
+
+        async def fetch_all():
+            batcher = ExchangeBatcher(fetcher, bulk_fetcher, window=0.01)
+            return await asyncio.gather(
+                batcher.fetch("btc", "usd"),
+                batcher.fetch("eth", "usd"),
+                batcher.fetch("btc", "usd"),
+            )
+
+        assert asyncio.run(fetch_all()) == [2.0, 3.0, 2.0]
+        assert bulk_calls == [[("btc", "usd"), ("eth", "usd")]]
+        assert single_calls == []
+
+    def test_fallback(self):
+        """Pairs missing from the bulk response are fetched individually"""
+        single_calls = []
+
+        async def fetcher(base, quote):
+            single_calls.append((base, quote))
+            return 5.0
+
+        async def bulk_fetcher(pairs):
+            return {("btc", "usd"): 2.0}
+
+        async def fetch_all():
+            batcher = ExchangeBatcher(fetcher, bulk_fetcher, window=0.01)
+            return await asyncio.gather(batcher.fetch("btc", "usd"), batcher.fetch("eth", "usd"))
+
+        assert asyncio.run(fetch_all()) == [2.0, 5.0]
+        assert single_calls == [("eth", "usd")]
+
+    def test_kraken_result_keys(self):
+        assert "XXBTZUSD" in EXCHANGE_ADAPTERS["kraken.com"].result_keys("btc", "usd")
+        assert "XETHZUSD" in EXCHANGE_ADAPTERS["kraken.com"].result_keys("eth", "usd")
+        assert "SOLUSD" in EXCHANGE_ADAPTERS["kraken.com"].result_keys("sol", "usd")
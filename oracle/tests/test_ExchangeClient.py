@@ -0,0 +1,133 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ..src.CircuitBreaker import CircuitOpenError
+from ..src.ExchangeAdapter import EXCHANGE_ADAPTERS
+from ..src.ExchangeClient import EXCHANGE_CLIENTS, ExchangeClient
+
+
+class TickerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        TickerHandler.connections += 1
+
+    def do_GET(self):
+        time.sleep(getattr(self.server, "delay", 0))
+        body = json.dumps({"symbol": "BTCUSDT", "lastPrice": "50000.12", "path": self.path, "server": self.server.server_address[1]}).encode()
+        self.send_response(getattr(self.server, "status", 200))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestExchangeClient(unittest.TestCase):
+    def setUp(self):
+        TickerHandler.connections = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), TickerHandler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reuse(self):
+        """Sequential requests are served over a single pooled connection"""
+        client = ExchangeClient(self.base_url, http2=False)
+
+        async def fetch_many():
+            try:
+                return [(await client.get("/ticker", params={"n": i})).json() for i in range(5)]
+            finally:
+                await client.aclose()
+
+        results = asyncio.run(fetch_many())
+        assert [r["path"] for r in results] == [f"/ticker?n={i}" for i in range(5)]
+        assert TickerHandler.connections == 1
+
+    def test_fetcher_uses_shared_client(self):
+        client = EXCHANGE_CLIENTS["binance.com"]
+        orig_base_url = client.base_url
+        client.base_url = self.base_url
+
+        async def fetch():
+            try:
+                return await EXCHANGE_ADAPTERS["binance.com"].fetch("btc", "usdt")
+            finally:
+                await client.aclose()
+
+        try:
+            assert asyncio.run(fetch()) == 50000.12
+        finally:
+            client.base_url = orig_base_url
+
+    def test_hedging(self):
+        """A request slower than the hedging delay is raced by one to a mirror"""
+        slow = ThreadingHTTPServer(("127.0.0.1", 0), TickerHandler)
+        slow.delay = 2
+        threading.Thread(target=slow.serve_forever, daemon=True).start()
+        client = ExchangeClient(f"http://127.0.0.1:{slow.server_address[1]}", http2=False, mirrors=[self.base_url], hedge_delay=0.1)
+
+        async def fetch():
+            try:
+                start = time.monotonic()
+                response = await client.get("/ticker")
+                return response.json(), time.monotonic() - start
+            finally:
+                await client.aclose()
+
+        try:
+            result, latency = asyncio.run(fetch())
+            assert result["server"] == self.server.server_address[1]
+            assert latency < 1
+        finally:
+            slow.shutdown()
+            slow.server_close()
+
+    def test_cancelled(self):
+        """Requests cancelled by the caller don't count as failures of the exchange"""
+        self.server.delay = 0.5
+        client = ExchangeClient(self.base_url, http2=False)
+
+        async def fetch_cancelled():
+            try:
+                for _ in range(client.breaker.failure_threshold + 1):
+                    with self.assertRaises(asyncio.TimeoutError):
+                        await asyncio.wait_for(client.get("/ticker"), timeout=0.01)
+            finally:
+                await client.aclose()
+
+        asyncio.run(fetch_cancelled())
+        assert client.breaker.failures == 0
+        assert client.unavailable_for() == 0
+
+    def test_circuit_breaker(self):
+        """Consecutive failures open the circuit and further requests fail fast"""
+        self.server.status = 500
+        client = ExchangeClient(self.base_url, http2=False)
+        client.limiter.base_backoff = 0
+
+        async def fetch_many():
+            statuses = []
+            try:
+                for _ in range(client.breaker.failure_threshold + 1):
+                    statuses.append((await client.get("/ticker")).status_code)
+            except CircuitOpenError:
+                statuses.append("open")
+            finally:
+                await client.aclose()
+            return statuses
+
+        assert asyncio.run(fetch_many()) == [500] * client.breaker.failure_threshold + ["open"]
+        assert client.unavailable_for() > 0
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import unittest
+from websockets.asyncio.server import serve
+
+from ..src.ExchangeStream import BinanceStreamAdapter, BitstampStreamAdapter, ExchangeStream, StreamAdapter
+
+
+class TestExchangeStream(unittest.TestCase):
+    def test_stream_reconnect(self):
+        """Prices are streamed and pairs are resubscribed after the connection drops"""
+        subscriptions = []
+
+        async def handler(websocket):
+            subscriptions.append(json.loads(await websocket.recv()))
+            price = 100 * len(subscriptions)
+            await websocket.send(json.dumps({"result": None, "id": 1}))
+            await websocket.send(json.dumps({"e": "24hrTicker", "s": "BTCUSDT", "c": f"{price}.5"}))
+            await websocket.send(json.dumps({"e": "24hrTicker", "s": "ETHUSDT", "c": f"{price}.25"}))
+            # Drop the first connection to exercise the reconnect path.
+            if len(subscriptions) > 1:
+                await websocket.wait_closed()
+
+        async def stream_prices():
+            prices = []
+            async with serve(handler, "127.0.0.1", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                stream = ExchangeStream(
+                    BinanceStreamAdapter(f"ws://127.0.0.1:{port}"),
+                    [("btc", "usdt"), ("eth", "usdt")],
+                    lambda pair, price: prices.append((pair, price)),
+                    max_reconnect_delay=0.1,
+                )
+                task = asyncio.create_task(stream.run())
+                for _ in range(100):
+                    if len(prices) == 4:
+                        break
+                    await asyncio.sleep(0.05)
+                connected = stream.connected
+                task.cancel()
+            return prices, connected
+
+        prices, connected = asyncio.run(stream_prices())
+        assert connected
+        assert prices == [
+            (("btc", "usdt"), 100.5),
+            (("eth", "usdt"), 100.25),
+            (("btc", "usdt"), 200.5),
+            (("eth", "usdt"), 200.25),
+        ]
+        assert len(subscriptions) == 2
+        assert subscriptions[1] == {"method": "SUBSCRIBE", "params": ["btcusdt@ticker", "ethusdt@ticker"], "id": 1}
+
+    def test_bitstamp_parse(self):
+        adapter = BitstampStreamAdapter("wss://ws.bitstamp.net")
+        assert adapter.parse({"event": "trade", "channel": "live_trades_btcusd", "data": {"price": 50000.5}}) == [("btcusd", 50000.5)]
+        assert adapter.parse({"event": "bts:subscription_succeeded", "channel": "live_trades_btcusd", "data": {}}) == []
+        with self.assertRaises(ConnectionError):
+            adapter.parse({"event": "bts:request_reconnect", "channel": "", "data": ""})
+
+    def test_incomplete_adapter(self):
+        """Adapters must implement the whole interface"""
+        class NoParseAdapter(StreamAdapter):
+            def symbol(self, pair_base: str, pair_quote: str) -> str:
+                return pair_base + pair_quote
+
+            def subscribe_messages(self, symbols: list[str]) -> list:
+                return []
+
+        with self.assertRaises(TypeError):
+            NoParseAdapter("wss://example.com")
@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+
+from ..src.ExchangeClient import ExchangeClient
+from ..src.FetchScheduler import FetchScheduler
+
+
+def run_scheduler(scheduler: FetchScheduler, entries: list[tuple], duration: float):
+    """Adds the entries and runs the scheduler for `duration` seconds"""
+    async def run():
+        for entry in entries:
+            scheduler.add(*entry)
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(duration)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    asyncio.run(run())
+
+
+class TestFetchScheduler(unittest.TestCase):
+    def test_phases(self):
+        ticks = []
+        async def tick(key):
+            ticks.append((key, asyncio.get_running_loop().time()))
+
+        run_scheduler(FetchScheduler(0.2, tick), [("a", [], 0.0), ("b", [], 0.1)], 0.9)
+        assert [key for key, _ in ticks[:4]] in (["a", "b", "a", "b"], ["b", "a", "b", "a"])
+        for key, phase in (("a", 0.0), ("b", 0.1)):
+            for _, at in filter(lambda t: t[0] == key, ticks):
+                # Ticks start at their offset into the period.
+                assert abs((at - phase + 0.05) % 0.2 - 0.05) < 0.03
+
+    def test_overrun(self):
+        ticks = []
+        async def tick(key):
+            ticks.append(key)
+            await asyncio.sleep(0.25)
+
+        run_scheduler(FetchScheduler(0.1, tick), [("slow", [])], 0.75)
+        # A tick isn't started while the previous one is still running.
+        assert 2 <= len(ticks) <= 3
+
+    def test_backoff_and_shedding(self):
+        ticks = []
+        async def tick(key):
+            ticks.append(key)
+
+        backing_off = ExchangeClient("http://backing-off")
+        backing_off.limiter.backoff_until = float("inf")
+        exhausted = ExchangeClient("http://exhausted", rate=0.001)
+        exhausted.limiter.tokens = 0
+
+        run_scheduler(FetchScheduler(0.05, tick, max_stride=4), [
+            ("backoff", [backing_off], 0.0, 1),
+            ("high", [exhausted], 0.0, 1),
+            ("low", [exhausted], 0.0, 0),
+        ], 1.0)
+        assert "backoff" not in ticks
+        # The high priority pair waits for the rate limit, the low priority one is sampled less often.
+        assert ticks.count("high") >= 15
+        assert 0 < ticks.count("low") <= ticks.count("high") // 3
+
+    def test_partially_unavailable(self):
+        """Entries with several exchanges only skip their ticks while all of them are unavailable"""
+        ticks = []
+        async def tick(key):
+            ticks.append(key)
+
+        backing_off = ExchangeClient("http://backing-off")
+        backing_off.limiter.backoff_until = float("inf")
+        rate_limited = ExchangeClient("http://rate-limited")
+        rate_limited.limiter.report(429, "3600")
+
+        run_scheduler(FetchScheduler(0.05, tick), [
+            ("composite", [backing_off, ExchangeClient("http://available")]),
+            ("unavailable", [backing_off, rate_limited]),
+        ], 0.5)
+        assert ticks.count("composite") >= 5
+        assert "unavailable" not in ticks
+
+    def test_open_circuit(self):
+        """An open circuit only silences the entries relying on that exchange alone"""
+        ticks = []
+        async def tick(key):
+            ticks.append(key)
+
+        broken = ExchangeClient("http://broken")
+        for _ in range(broken.breaker.failure_threshold):
+            broken.breaker.record_failure()
+
+        run_scheduler(FetchScheduler(0.05, tick), [
+            ("composite", [broken, ExchangeClient("http://a"), ExchangeClient("http://b")]),
+            ("broken", [broken]),
+        ], 0.5)
+        assert ticks.count("composite") >= 5
+        assert "broken" not in ticks
+
+
+if __name__ == '__main__':
+    unittest.main()
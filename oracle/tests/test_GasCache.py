@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from web3 import AsyncWeb3, Web3
+from web3.providers.async_base import AsyncBaseProvider
+from web3.providers.base import BaseProvider
+
+from ..src.GasCache import GasCache
+
+SUBMIT_OBSERVATION_ABI = [{
+    "type": "function",
+    "name": "submitObservation",
+    "inputs": [
+        {"name": "_roundId", "type": "uint80"},
+        {"name": "_answer", "type": "int256"},
+        {"name": "_startedAt", "type": "uint256"},
+        {"name": "_updatedAt", "type": "uint256"},
+    ],
+    "outputs": [],
+    "stateMutability": "nonpayable",
+}]
+
+
+class CountingProvider(BaseProvider):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def make_request(self, method, params):
+        self.calls.append(method)
+        results = {
+            "eth_gasPrice": hex(100_000_000_000),
+            "eth_chainId": hex(23293),
+            "eth_estimateGas": hex(50_000),
+        }
+        return {"jsonrpc": "2.0", "id": 1, "result": results[method]}
+
+
+class AsyncCountingProvider(AsyncBaseProvider):
+    def __init__(self):
+        super().__init__()
+        self.provider = CountingProvider()
+        self.calls = self.provider.calls
+
+    async def make_request(self, method, params):
+        return self.provider.make_request(method, params)
+
+
+class TestGasCache(unittest.TestCase):
+    def test_build_transaction(self):
+        provider = CountingProvider()
+        w3 = Web3(provider)
+        contract = w3.eth.contract(address="0x5FbDB2315678afecb367f032d93F642f64180aa3", abi=SUBMIT_OBSERVATION_ABI)
+        gas_cache = GasCache(w3, gas_margin=1.2)
+
+        tx = gas_cache.build_transaction(contract.functions.submitObservation(1, 2, 3, 4))
+        assert tx["gas"] == 60_000
+        assert tx["gasPrice"] == 100_000_000_000
+        assert tx["chainId"] == 23293
+        assert {"eth_chainId", "eth_estimateGas", "eth_gasPrice"} == set(provider.calls)
+
+        # Warm cache: no RPC calls in the hot path.
+        provider.calls.clear()
+        gas_cache.build_transaction(contract.functions.submitObservation(2, 3, 4, 5))
+        assert provider.calls == []
+
+        # Failed transaction: gas limit is re-estimated.
+        gas_cache.invalidate(contract.address, "submitObservation")
+        gas_cache.build_transaction(contract.functions.submitObservation(3, 4, 5, 6))
+        assert "eth_estimateGas" in provider.calls
+        assert "eth_gasPrice" not in provider.calls
+
+    def test_warm(self):
+        """Gas parameters are fetched on the async instance, after which building makes no RPC calls"""
+        provider = CountingProvider()
+        async_provider = AsyncCountingProvider()
+        w3 = Web3(provider)
+        w3.eth.default_account = "0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266"
+        contract = w3.eth.contract(address="0x5FbDB2315678afecb367f032d93F642f64180aa3", abi=SUBMIT_OBSERVATION_ABI)
+        gas_cache = GasCache(w3, AsyncWeb3(async_provider), gas_margin=1.2)
+
+        asyncio.run(gas_cache.warm(contract.functions.submitObservation(1, 2, 3, 4)))
+        assert {"eth_chainId", "eth_estimateGas", "eth_gasPrice"} == set(async_provider.calls)
+        tx = gas_cache.build_transaction(contract.functions.submitObservation(1, 2, 3, 4))
+        assert (tx["gas"], tx["gasPrice"], tx["chainId"]) == (60_000, 100_000_000_000, 23293)
+        assert provider.calls == []
+
+        async_provider.calls.clear()
+        asyncio.run(gas_cache.warm(contract.functions.submitObservation(2, 3, 4, 5)))
+        assert async_provider.calls == []
@@ -0,0 +1,37 @@
+import unittest
+
+from ..src.HashRing import HashRing
+
+
+class TestHashRing(unittest.TestCase):
+    def test_assign(self):
+        keys = [f"binance.com/t{i}/usd" for i in range(1000)]
+        ring = HashRing(range(4))
+        assignment = ring.assign(keys)
+        assert sorted(key for owned in assignment.values() for key in owned) == sorted(keys)
+        # Spread roughly evenly.
+        assert all(150 < len(owned) < 350 for owned in assignment.values()), [len(owned) for owned in assignment.values()]
+        # Stable across instances, i.e. processes and restarts.
+        assert HashRing(range(4)).assign(keys) == assignment
+
+    def test_remove(self):
+        keys = [f"kraken.com/t{i}/usd" for i in range(1000)]
+        ring = HashRing(range(4))
+        before = ring.assign(keys)
+        ring.remove(2)
+        after = ring.assign(keys)
+        assert 2 not in ring and len(ring) == 3
+        # Only the removed node's keys move, and they are spread over the others.
+        for node in (0, 1, 3):
+            assert set(before[node]) <= set(after[node])
+        assert all(set(after[node]) - set(before[node]) for node in (0, 1, 3))
+
+        ring.add(2)
+        assert ring.assign(keys) == before
+
+        ring = HashRing()
+        assert ring.node("kraken.com/btc/usd") is None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import unittest
+
+from ..src.HttpServer import HttpResponse, HttpServer
+from ..src.Metrics import Counter, Gauge, Histogram, RateLimitFilter, Registry, timed
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self):
+        registry = Registry()
+        errors = Counter("errors_total", "Errors", ("exchange", "kind"), registry=registry)
+        age = Gauge("age_seconds", "Age", ("pair",), registry=registry)
+        errors.inc(exchange="kraken.com", kind="timeout")
+        errors.inc(2, exchange="kraken.com", kind="timeout")
+        age.set(1.5, pair='a"b')
+        assert registry.render() == (
+            "# HELP errors_total Errors\n"
+            "# TYPE errors_total counter\n"
+            'errors_total{exchange="kraken.com",kind="timeout"} 3\n'
+            "# HELP age_seconds Age\n"
+            "# TYPE age_seconds gauge\n"
+            'age_seconds{pair="a\\"b"} 1.5\n'
+        )
+
+    def test_histogram(self):
+        registry = Registry()
+        latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry)
+        for value in (0.05, 0.1, 0.5, 3):
+            latency.observe(value)
+        lines = registry.render().splitlines()[2:]
+        assert lines == [
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1.0"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 3.65",
+            "latency_seconds_count 4",
+        ]
+
+    def test_timed(self):
+        registry = Registry()
+        latency = Histogram("latency_seconds", "Latency", ("method",), registry=registry)
+        errors = Counter("errors_total", "Errors", ("method",), registry=registry)
+        with timed(latency, errors, method="ok"):
+            pass
+        with self.assertRaises(ValueError):
+            with timed(latency, errors, method="failing"):
+                raise ValueError()
+        assert latency._values[("ok",)][2] == 1
+        assert latency._values[("failing",)][2] == 1
+        assert errors._values == {("failing",): 1}
+
+    def test_rate_limit_filter(self):
+        log_filter = RateLimitFilter(interval=60, burst=2)
+        def record(msg):
+            return logging.LogRecord("oracle", logging.WARNING, __file__, 0, msg, (), None)
+        assert [log_filter.filter(record("Error: %s")) for _ in range(4)] == [True, True, False, False]
+        assert log_filter.filter(record("Other: %s"))
+
+        # The window expired.
+        log_filter._windows[("oracle", "Error: %s")][0] -= 60
+        r = record("Error: %s")
+        assert log_filter.filter(r)
+        assert r.msg == "Error: %s [2 similar message(s) suppressed]"
+
+    def test_rate_limit_filter_args(self):
+        """Records of the same template with different arguments have separate budgets"""
+        log_filter = RateLimitFilter(interval=60, burst=2)
+        def record(*args):
+            return logging.LogRecord("oracle", logging.WARNING, __file__, 0, "Fetching %s on %s exceeded the deadline", args, None)
+        assert [log_filter.filter(record("kraken.com/btc/usd", "kraken.com")) for _ in range(3)] == [True, True, False]
+        assert [log_filter.filter(record("bitstamp.net/eth/usd", "bitstamp.net")) for _ in range(3)] == [True, True, False]
+
+    def test_http_server(self):
+        async def run():
+            server = HttpServer(host="127.0.0.1")
+            async def metrics(request):
+                return HttpResponse(body=b"up 1\n")
+            server.route("/metrics", metrics)
+            await server.start()
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                responses = []
+                for path in ("/metrics", "/missing"):
+                    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+                    status = await reader.readline()
+                    headers = {}
+                    while (line := await reader.readline()) != b"\r\n":
+                        name, _, value = line.decode().partition(":")
+                        headers[name.lower()] = value.strip()
+                    responses.append((status.split()[1], await reader.readexactly(int(headers["content-length"]))))
+                writer.close()
+                return responses
+            finally:
+                await server.stop()
+
+        assert asyncio.run(run()) == [(b"200", b"up 1\n"), (b"404", b"not found\n")]
+
+
+if __name__ == '__main__':
+    unittest.main()
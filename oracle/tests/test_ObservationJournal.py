@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from ..src.ObservationJournal import RECORD, ObservationJournal, feed_id
+
+
+class TestObservationJournal(unittest.TestCase):
+    def test_replay(self):
+        a, b = feed_id("kraken.com/btc/usd"), feed_id("bitstamp.net/btc/usd")
+        with tempfile.TemporaryDirectory() as dir:
+            journal = ObservationJournal(dir)
+            journal.tick(a, 100, 1000.0)
+            journal.tick(b, 200, 1000.5, 3.5)
+            journal.clear(a, 1001.0)
+            journal.submit(a, 7, 100, 1001.0)
+            journal.tick(a, 101, 1002.0)
+            journal.close()
+
+            # A restart appends to a new segment.
+            journal = ObservationJournal(dir)
+            journal.tick(a, 102, 1003.0)
+            journal.close()
+
+            feeds = ObservationJournal(dir).replay()
+            assert feeds[a].ticks == [(101, 1002.0, None), (102, 1003.0, None)]
+            assert (feeds[a].round_id, feeds[a].answer, feeds[a].submitted_at) == (7, 100, 1001.0)
+            assert feeds[b].ticks == [(200, 1000.5, 3.5)]
+            assert feeds[b].answer is None
+
+    def test_rotation_and_retention(self):
+        with tempfile.TemporaryDirectory() as dir:
+            journal = ObservationJournal(dir, segment_size=4 * RECORD.size, max_segments=2)
+            for i in range(10):
+                journal.tick(1, i, float(i))
+            journal.close()
+
+            assert sorted(os.listdir(dir)) == ["00000002.v2.journal", "00000003.v2.journal"]
+            assert [price for price, _, _ in journal.replay()[1].ticks] == [4, 5, 6, 7, 8, 9]
+
+    def test_wide_values(self):
+        """Values of up to 128 bits are journaled, wider ones are skipped"""
+        with tempfile.TemporaryDirectory() as dir:
+            journal = ObservationJournal(dir)
+            journal.tick(1, 2**100, 1000.0)
+            journal.tick(1, -2**127, 1001.0)
+            journal.tick(1, 2**127, 1002.0)
+            journal.submit(1, 3, 2**64 + 5, 1003.0)
+            journal.close()
+
+            feed = journal.replay()[1]
+            assert [price for price, _, _ in feed.ticks] == [2**100, -2**127]
+            assert feed.answer == 2**64 + 5
+
+    def test_torn_record(self):
+        with tempfile.TemporaryDirectory() as dir:
+            journal = ObservationJournal(dir)
+            journal.tick(1, 100, 1000.0)
+            journal.tick(1, 101, 1001.0)
+            journal.close()
+            path = os.path.join(dir, os.listdir(dir)[0])
+            os.truncate(path, RECORD.size + 10)
+
+            assert journal.replay()[1].ticks == [(100, 1000.0, None)]
+
+
+if __name__ == '__main__':
+    unittest.main()
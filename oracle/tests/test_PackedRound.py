@@ -0,0 +1,36 @@
+import unittest
+
+from ..src.PackedRound import pack_round, unpack_round
+
+
+class TestPackedRound(unittest.TestCase):
+    def test_round_trip(self):
+        for round_data in [
+            (1, 60_000 * 10**10, 1_700_000_000, 1_700_000_060),
+            (2**32 - 1, -(2**127), 2**64 - 2**32, 2**64 - 1),
+            (7, 2**127 - 1, 5, 5),
+            (0, -1, 100, 2**32 + 99),
+        ]:
+            packed = pack_round(*round_data)
+            assert 0 <= packed < 2**256
+            assert unpack_round(packed) == round_data, round_data
+
+    def test_layout(self):
+        # The layout decoded by PackedAggregator.submitPackedObservation.
+        packed = pack_round(3, -2, 10, 70)
+        assert packed >> 224 == 3
+        assert packed >> 192 & 0xffffffff == 60
+        assert packed >> 128 & 0xffffffffffffffff == 70
+        assert packed & (2**128 - 1) == 2**128 - 2
+
+    def test_out_of_range(self):
+        assert pack_round(2**32, 1, 0, 0) is None
+        assert pack_round(1, 2**127, 0, 0) is None
+        assert pack_round(1, 1, 0, 2**64) is None
+        assert pack_round(1, 1, 0, 2**32) is None
+        assert pack_round(1, 1, 10, 5) is None
+        assert pack_round(1, 1, -1, 5) is None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+import httpx
+
+from ..src.HttpServer import HttpServer
+from ..src.PriceIndex import PriceIndex, RoundData
+
+
+class TestPriceIndex(unittest.TestCase):
+    def test_record(self):
+        index = PriceIndex(history=2)
+        index.set_metadata("bitstamp.net/btc/usd", "0x01", 10)
+        for round_id in (5, 7, 6):
+            index.record("bitstamp.net/btc/usd", RoundData(round_id, round_id * 100, round_id, round_id))
+        # A backfilled round doesn't replace a newer one.
+        assert index.latest("bitstamp.net/btc/usd") == RoundData(7, 700, 7, 7)
+        assert index.round("bitstamp.net/btc/usd", 6).answer == 600
+        assert index.round("bitstamp.net/btc/usd", 5) is None
+
+        version = index.version
+        index.record("bitstamp.net/btc/usd", RoundData(7, 700, 7, 7))
+        assert index.version == version
+        assert index.latest("kraken.com/btc/usd") is None
+
+    def test_serve(self):
+        async def run():
+            index = PriceIndex()
+            index.set_metadata("bitstamp.net/btc/usd", "0x01", 2)
+            index.record("bitstamp.net/btc/usd", RoundData(1, 6_000_000, 10, 11))
+            server = HttpServer(host="127.0.0.1")
+            index.add_routes(server)
+            await server.start()
+            try:
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}") as client:
+                    response = await client.get("/feeds")
+                    assert response.json()["bitstamp.net/btc/usd"]["latest"]["price"] == 60_000
+                    etag = response.headers["etag"]
+
+                    response = await client.get("/feed", params={"pair": "bitstamp.net/btc/usd", "round": 1})
+                    assert response.json()["answer"] == 6_000_000
+                    assert (await client.get("/feed", params={"pair": "bitstamp.net/btc/usd", "round": 2})).status_code == 404
+                    assert (await client.get("/feed", params={"pair": "kraken.com/btc/usd"})).status_code == 404
+
+                    # Not modified, immediately without waiting.
+                    response = await client.get("/feeds", headers={"If-None-Match": etag})
+                    assert response.status_code == 304
+
+                    # A long poll is answered as soon as a round is recorded.
+                    poll = asyncio.create_task(client.get("/feed", params={"pair": "bitstamp.net/btc/usd", "wait": 10}, headers={"If-None-Match": etag}))
+                    await asyncio.sleep(0.1)
+                    assert not poll.done()
+                    index.record("bitstamp.net/btc/usd", RoundData(2, 6_100_000, 20, 21))
+                    response = await asyncio.wait_for(poll, 1)
+                    assert response.status_code == 200
+                    assert response.json()["latest"]["round_id"] == 2
+                    assert [r["round_id"] for r in response.json()["rounds"]] == [2, 1]
+                    assert response.headers["etag"] != etag
+
+                    # A long poll times out with 304.
+                    etag = response.headers["etag"]
+                    response = await client.get("/feed", params={"pair": "bitstamp.net/btc/usd", "wait": 0.1}, headers={"If-None-Match": etag})
+                    assert response.status_code == 304
+            finally:
+                await server.stop()
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from ..src.PriceOracle import PriceOracle, parse_pairs
+from ..src.StateCache import StateCache
+from ..src.TxSubmitter import SubmitResult
+
+DIRECTORY_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+
+
+def make_oracle(state_dir: str, pairs: str, fetch_period: int = 10, submit_period: int = 60, **kwargs) -> PriceOracle:
+    """Returns an oracle of the pairs on localnet, with the contract ABIs seeded instead of read from forge artifacts"""
+    with open(os.path.join(state_dir, "state.json"), "w") as file:
+        json.dump({
+            "version": StateCache.VERSION,
+            "contracts": {name: {"mtime": None, "abi": [], "bytecode": "0x"} for name in ("SimpleAggregator", "PackedAggregator", "PriceFeedDirectory")},
+            "feeds": {},
+        }, file)
+    return PriceOracle(None, DIRECTORY_ADDRESS, "sapphire-localnet", pairs, "", fetch_period, submit_period, state_dir=state_dir, **kwargs)
+
+
+class TestPriceOracle(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_restore_journal(self):
+        """Journaled observations are restored unless they are older than the window horizon"""
+        async def restore(window_horizon):
+            oracle = make_oracle(self.dir.name, "bitstamp.net/btc/usd", window_horizon=window_horizon)
+            [pair] = oracle.pairs
+            oracle.round_ids[pair] = 0
+            oracle.schedule_observations([pair])
+            oracle.restore_journal([pair])
+            oracle.journal.close()
+            return oracle.observations[pair]
+
+        now = time.time()
+        oracle = make_oracle(self.dir.name, "bitstamp.net/btc/usd")
+        feed = oracle.journal_ids[oracle.pairs[0]]
+        # Collected before an outage of two hours.
+        for i in range(3):
+            oracle.journal.tick(feed, 100 + i, now - 7200 + i)
+        oracle.journal.tick(feed, 200, now - 30)
+        oracle.journal.tick(feed, 201, now - 1)
+        oracle.journal.close()
+
+        window = asyncio.run(restore(None))
+        assert (len(window), window.median()) == (2, 200)
+        window = asyncio.run(restore(10))
+        assert (len(window), window.median()) == (1, 201)
+
+    def test_parse_pairs(self):
+        pairs = parse_pairs("bitstamp.net/btc/usd,composite/btc/usd=bitstamp.net,kraken.com,binance.com,kraken.com/eth/usd,invalid")
+        assert [str(pair) for pair in pairs] == ["bitstamp.net/btc/usd", "composite/btc/usd", "kraken.com/eth/usd"]
+        assert pairs[1].sources == ["bitstamp.net", "kraken.com", "binance.com"]
+        assert pairs[2].sources == ["kraken.com"]
+        # Only composite pairs list their exchanges.
+        assert parse_pairs("kraken.com/btc/usd=bitstamp.net") == []
+
+        with self.assertRaises(ValueError):
+            parse_pairs("composite/btc/usd=bitstamp.net,bitstamp.net")
+        with self.assertRaises(ValueError):
+            parse_pairs("composite/btc/usd=bitstamp.net")
+
+    def test_fetch_composite_price(self):
+        """Outliers are rejected and a majority of the exchanges must agree"""
+        oracle = make_oracle(self.dir.name, "composite/btc/usd=bitstamp.net,kraken.com,binance.com,coinbase.com,binance.us")
+        [pair] = oracle.pairs
+
+        async def fetch(quotes):
+            async def fetch_price(exchange, pair_base, pair_quote):
+                quote = quotes[exchange]
+                if quote == "hang":
+                    await asyncio.sleep(10)
+                if isinstance(quote, Exception):
+                    raise quote
+                return quote
+            oracle.fetch_price = fetch_price
+            return await oracle.fetch_composite_price(pair, asyncio.get_running_loop().time() + 0.1)
+
+        quotes = {"bitstamp.net": 100.0, "kraken.com": 100.2, "binance.com": 99.8, "coinbase.com": 100.1, "binance.us": 150.0}
+        assert asyncio.run(fetch(quotes)) == 100.05
+        # Three exchanges still agree after rejecting the outlier.
+        assert asyncio.run(fetch(quotes | {"kraken.com": ConnectionError()})) == 100.0
+        assert asyncio.run(fetch(quotes | {"coinbase.com": "hang"})) == 100.0
+        # Only two of them if both fail.
+        assert asyncio.run(fetch(quotes | {"kraken.com": ConnectionError(), "coinbase.com": "hang"})) is None
+    def test_observe(self):
+        """Answers are submitted on deviation, at the end of a period only when the heartbeat is due"""
+        oracle = make_oracle(self.dir.name, "bitstamp.net/btc/usd", submit_period=600, deviation_bps="50", heartbeat="3600")
+        [pair] = oracle.pairs
+        policy = oracle.policies[pair]
+        submitted = []
+
+        async def submit_observation(pair, round_id, answer, started_at, updated_at):
+            submitted.append((round_id, answer))
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(SubmitResult({"data": {"ok": ""}}, 1, 0.0))
+            return future
+
+        async def observe(price, period_due=False):
+            async def fetch_price(exchange, pair_base, pair_quote):
+                return price
+            oracle.fetch_price = fetch_price
+            now = asyncio.get_running_loop().time()
+            oracle.last_submit[pair] = now - oracle.submit_period if period_due else now
+            await oracle.observe(pair)
+            await asyncio.sleep(0)
+            return submitted.pop() if submitted else None
+
+        async def run():
+            oracle.submit_observation = submit_observation
+            oracle.num_decimals[pair] = 2
+            oracle.round_ids[pair] = 7
+            oracle.schedule_observations([pair])
+            # The latest round was submitted 50 minutes ago.
+            oracle.record_onchain_answer(pair, (7, 10000, 0, int(time.time()) - 3000, 7))
+            assert policy.last_answer == 10000
+
+            # 20 bps off the on-chain answer.
+            assert await observe(100.2) is None
+            # The median of both deviates by 60 bps, submitted in the middle of the period.
+            assert await observe(101.0) == (9, 10060)
+            assert len(oracle.observations[pair]) == 0
+            assert await observe(101.0) is None
+            # Within the heartbeat at the end of the period, the answer isn't submitted and the round restarts.
+            assert await observe(101.0, period_due=True) is None
+            assert len(oracle.observations[pair]) == 0
+            # The heartbeat would be missed by waiting for the next period.
+            policy.last_submitted_at -= 3100
+            assert await observe(100.9, period_due=True) == (12, 10090)
+
+        asyncio.run(run())
+
+    def test_observe_seeded_heartbeat(self):
+        """An old on-chain round forces a submission at the end of the first period"""
+        oracle = make_oracle(self.dir.name, "bitstamp.net/btc/usd", submit_period=600, deviation_bps="50", heartbeat="3600")
+        [pair] = oracle.pairs
+        submitted = []
+
+        async def submit_observation(pair, round_id, answer, started_at, updated_at):
+            submitted.append(answer)
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(SubmitResult({"data": {"ok": ""}}, 1, 0.0))
+            return future
+
+        async def fetch_price(exchange, pair_base, pair_quote):
+            return 100.0
+
+        async def run():
+            oracle.submit_observation = submit_observation
+            oracle.fetch_price = fetch_price
+            oracle.num_decimals[pair] = 2
+            oracle.round_ids[pair] = 7
+            oracle.schedule_observations([pair])
+            oracle.record_onchain_answer(pair, (7, 10000, 0, int(time.time()) - 3100, 7))
+            oracle.last_submit[pair] -= oracle.submit_period
+            await oracle.observe(pair)
+
+        asyncio.run(run())
+        assert submitted == [10000]
+
+
+if __name__ == '__main__':
+    unittest.main()
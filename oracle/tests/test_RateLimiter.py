@@ -0,0 +1,53 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from ..src.RateLimiter import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_token_bucket(self):
+        limiter = RateLimiter(rate=10, burst=2)
+        assert limiter.wait_time() == 0
+
+        async def acquire_all():
+            start = time.monotonic()
+            for _ in range(4):
+                await limiter.acquire()
+            return time.monotonic() - start
+
+        # The burst is served at once, the rest at the rate.
+        assert 0.15 < asyncio.run(acquire_all()) < 0.5
+        assert limiter.wait_time() > 0
+
+    def test_unlimited(self):
+        limiter = RateLimiter()
+        asyncio.run(limiter.acquire(1000))
+        assert limiter.wait_time(1000) == 0
+
+    def test_backoff(self):
+        limiter = RateLimiter(base_backoff=1, max_backoff=8)
+        with mock.patch("random.uniform", side_effect=lambda low, high: high):
+            limiter.report(429)
+            assert 0.9 < limiter.backoff_remaining() <= 1
+            limiter.report(503)
+            assert 1.9 < limiter.backoff_remaining() <= 2
+            for _ in range(5):
+                limiter.report(500)
+            assert limiter.backoff_remaining() <= 8
+
+            # Successful responses reset the exponent, but not the pending backoff.
+            limiter.report(200)
+            assert limiter.failures == 0
+            assert limiter.backoff_remaining() > 0
+
+    def test_retry_after(self):
+        limiter = RateLimiter(max_backoff=8)
+        limiter.report(418, "120")
+        assert limiter.backoff_remaining() > 100
+        assert limiter.wait_time() > 100
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ..src.AggregationWindow import ESTIMATORS, AggregationWindow
+from ..src.Replay import ReplayConfig, TickHistory, estimate, load_csv, load_log, replay, sample, simulate
+from ..src.SubmitPolicy import SubmitPolicy
+
+
+def reference_simulate(timestamps, prices, volumes, config):
+    """Tick by tick replay with the oracle's AggregationWindow and SubmitPolicy, like PriceOracle.observe"""
+    window = AggregationWindow(config.window_size, config.window_horizon)
+    policy = SubmitPolicy(config.deviation_bps, config.heartbeat)
+    last_submit = timestamps[0] - config.fetch_period
+    submissions = []
+    for i, (now, price) in enumerate(zip(timestamps.tolist(), prices.tolist())):
+        window.add(price, now, None if volumes is None else float(volumes[i]))
+        period_due = now // config.submit_period > last_submit // config.submit_period
+        if not (period_due or config.deviation_bps > 0):
+            continue
+        answer = ESTIMATORS[config.estimator](window)
+        submit = policy.should_submit(answer, now, config.submit_period, period_due)
+        if period_due:
+            last_submit = now
+        if period_due or submit:
+            window.clear()
+        if submit:
+            policy.record_submission(answer, now)
+            submissions.append((now, answer))
+    return submissions
+
+
+def random_walk(rng, n, volumes=False):
+    timestamps = np.cumsum(rng.uniform(0.5, 3, n)) + 1_700_000_000
+    prices = 60_000 * np.exp(np.cumsum(rng.normal(0, 0.0005, n)))
+    return TickHistory(timestamps, prices, rng.uniform(0, 2, n) if volumes else None)
+
+
+class TestReplay(unittest.TestCase):
+    def test_estimators(self):
+        rng = np.random.default_rng(1)
+        # Sums of the larger prices overflow 64 bits.
+        prices = np.concatenate([rng.integers(1, 10**15, 250), rng.integers(2**61, 2**63 - 1, 250)])
+        timestamps = np.cumsum(rng.integers(0, 5, 500))
+        volumes = rng.uniform(0, 3, 500)
+        starts = rng.integers(0, 400, 50)
+        counts = rng.integers(1, 100, 50)
+        for estimator, reference in ESTIMATORS.items():
+            answers = estimate(estimator, prices, timestamps, volumes, starts, counts)
+            for start, count, answer in zip(starts, counts, answers):
+                window = AggregationWindow()
+                for i in range(start, start + count):
+                    window.add(int(prices[i]), int(timestamps[i]), float(volumes[i]))
+                assert answer == reference(window), estimator
+
+    def test_unknown_estimator(self):
+        timestamps, prices = np.arange(0, 60, 10), np.full(6, 100)
+        with self.assertRaises(ValueError):
+            simulate(timestamps, prices, None, ReplayConfig(fetch_period=10, submit_period=60, estimator="mode"))
+
+    def test_matches_oracle(self):
+        rng = np.random.default_rng(2)
+        history = random_walk(rng, 5000, volumes=True)
+        configs = [
+            ReplayConfig(fetch_period=5, submit_period=60),
+            ReplayConfig(fetch_period=10, submit_period=60, estimator="twap", window_size=4),
+            ReplayConfig(fetch_period=5, submit_period=30, estimator="trimmed-mean", deviation_bps=10),
+            ReplayConfig(fetch_period=5, submit_period=60, estimator="vwap", deviation_bps=20, heartbeat=600),
+            ReplayConfig(fetch_period=7, submit_period=60, deviation_bps=5, window_horizon=30),
+        ]
+        for config in configs:
+            timestamps, prices, volumes = sample(history, config.fetch_period, config.decimals)
+            submitted_at, answers = simulate(timestamps, prices, volumes, config)
+            expected = reference_simulate(timestamps, prices, volumes, config)
+            assert list(zip(submitted_at.tolist(), answers.tolist())) == expected, config
+
+    def test_wide_prices(self):
+        """Prices scaled beyond 64 bits are replayed as Python ints, like the oracle keeps them"""
+        rng = np.random.default_rng(3)
+        history = random_walk(rng, 2000, volumes=True)
+        history.prices /= 1000
+        for estimator in ESTIMATORS:
+            for deviation_bps in (0, 10):
+                config = ReplayConfig(fetch_period=5, submit_period=60, estimator=estimator, deviation_bps=deviation_bps, decimals=18)
+                timestamps, prices, volumes = sample(history, config.fetch_period, config.decimals)
+                assert prices.dtype == object and max(prices) >= 2**63
+                submitted_at, answers = simulate(timestamps, prices, volumes, config)
+                expected = reference_simulate(timestamps, prices, volumes, config)
+                assert list(zip(submitted_at.tolist(), answers.tolist())) == expected, config
+        assert replay(history, ReplayConfig(fetch_period=5, submit_period=60, decimals=18))["tracking_error_bps"]["max"] < 100
+
+    def test_replay(self):
+        history = TickHistory(np.arange(0, 600, 1.0), np.full(600, 100.0))
+        result = replay(history, ReplayConfig(fetch_period=10, submit_period=60), gas_per_submit=50_000)
+        assert result["submissions"] == 10
+        assert result["gas"] == 500_000
+        assert result["submit_interval"]["max"] == 60
+        assert result["tracking_error_bps"]["max"] == 0
+
+        # A constant price is only submitted once with a deviation threshold.
+        result = replay(history, ReplayConfig(fetch_period=10, submit_period=60, deviation_bps=10))
+        assert result["submissions"] == 1
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, "ticks.csv")
+            with open(path, "w") as file:
+                file.write("timestamp,pair,price,volume\n20,kraken.com/btc/usd,101.5,2\n10,kraken.com/btc/usd,100,1\n10,bitstamp.net/btc/usd,99,3\n")
+            histories = load_csv(path)
+            assert histories["kraken.com/btc/usd"].timestamps.tolist() == [10, 20]
+            assert histories["kraken.com/btc/usd"].prices.tolist() == [100, 101.5]
+            assert histories["bitstamp.net/btc/usd"].volumes.tolist() == [3]
+
+            path = os.path.join(dir, "oracle.log")
+            with open(path, "w") as file:
+                file.write("1970-01-01 00:00:10,500 DEBUG src.PriceOracle: kraken.com/btc/usd price: $100.0000000000\n")
+                file.write("1970-01-01 00:00:11,000 INFO src.PriceOracle: Submitting observations of kraken.com/btc/usd for round 1.\n")
+            histories = load_log(path)
+            assert histories["kraken.com/btc/usd"].timestamps.tolist() == [10.5]
+            assert histories["kraken.com/btc/usd"].prices.tolist() == [100]
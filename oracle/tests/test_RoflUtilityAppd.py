@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import socketserver
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+
+from ..src.RoflUtilityAppd import RoflUtilityAppd
+
+
+class AppdHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    posted = []
+
+    def setup(self):
+        super().setup()
+        AppdHandler.connections += 1
+
+    def _reply(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(b"rofl1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqtdv26p")
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        AppdHandler.posted.append((self.path, payload))
+        # CBOR-encoded {"ok": b""}
+        self._reply(json.dumps({"data": "a1626f6b40"}).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TestRoflUtilityAppd(unittest.TestCase):
+    def setUp(self):
+        AppdHandler.connections = 0
+        AppdHandler.posted = []
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmpdir.name, "appd.sock")
+        self.server = UnixHTTPServer(self.socket_path, AppdHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_sync(self):
+        appd = RoflUtilityAppd(self.socket_path, timeout=5)
+        try:
+            assert appd.fetch_appid() == "rofl1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqtdv26p"
+            result = appd.submit_tx({"gas": 100000, "value": 0, "data": "0x00ab", "to": "0x0000000000000000000000000000000000000001"})
+        finally:
+            appd.close()
+
+        assert result == {"data": {"ok": b""}}
+        assert AppdHandler.posted[0][0] == "/rofl/v1/tx/sign-submit"
+        assert AppdHandler.posted[0][1]["tx"]["data"]["data"] == "00ab"
+        assert AppdHandler.posted[0][1]["tx"]["data"]["to"] == "0000000000000000000000000000000000000001"
+        assert AppdHandler.connections == 1
+
+    def test_async(self):
+        """Async calls share a single pooled client"""
+        appd = RoflUtilityAppd(self.socket_path, timeout=5)
+
+        async def submit_all():
+            try:
+                app_id = await appd.fetch_appid_async()
+                for i in range(3):
+                    await appd.submit_tx_async({"gas": 100000 + i, "value": 0, "data": "0x01"})
+                return app_id
+            finally:
+                await appd.aclose()
+
+        assert asyncio.run(submit_all()) == "rofl1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqtdv26p"
+        assert [p[1]["tx"]["data"]["gas_limit"] for p in AppdHandler.posted] == [100000, 100001, 100002]
+        assert "to" not in AppdHandler.posted[0][1]["tx"]["data"]
+        assert AppdHandler.connections == 1
@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+from eth_abi import encode
+from web3 import AsyncWeb3, Web3
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import BaseProvider
+
+from ..src.RpcBatcher import RpcBatcher
+
+ABI = [
+    {"type": "function", "name": "decimals", "inputs": [], "outputs": [{"name": "", "type": "uint8"}], "stateMutability": "view"},
+    {"type": "function", "name": "getRoundData", "inputs": [{"name": "_roundId", "type": "uint80"}], "outputs": [{"name": "", "type": "uint8"}], "stateMutability": "view"},
+]
+
+
+class AsyncBatchingProvider(AsyncJSONBaseProvider):
+    def __init__(self, supports_batch: bool = True):
+        super().__init__()
+        self.supports_batch = supports_batch
+        self.requests = []
+
+    def _response(self, params):
+        # Each contract returns the last byte of its address, plus the round ID if given.
+        data = bytes.fromhex(params[0]["data"][2:])
+        value = int(params[0]["to"][-2:], 16) + (int.from_bytes(data[4:36]) if len(data) > 4 else 0)
+        return {"jsonrpc": "2.0", "id": 1, "result": "0x" + encode(["uint8"], [value]).hex()}
+
+    async def make_request(self, method, params):
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 1, "result": hex(23293)}
+        self.requests.append([method])
+        return self._response(params)
+
+    async def make_batch_request(self, requests):
+        if not self.supports_batch:
+            raise ValueError("batching not supported")
+        self.requests.append([method for method, _ in requests])
+        return [self._response(params) for _, params in requests]
+
+
+def contract(i: int):
+    # Calls are built on synchronous contract instances, like the oracle's.
+    return Web3(BaseProvider()).eth.contract(address=Web3.to_checksum_address(f"0x{i:040x}"), abi=ABI)
+
+
+class TestRpcBatcher(unittest.TestCase):
+    def test_batch(self):
+        """Concurrent calls are sent in batches of at most max_batch_size calls"""
+        provider = AsyncBatchingProvider()
+        batcher = RpcBatcher(AsyncWeb3(provider), max_batch_size=3)
+        calls = [contract(i).functions.getRoundData(0) for i in range(1, 6)]
+        assert asyncio.run(batcher.call_all(calls)) == [1, 2, 3, 4, 5]
+        assert sorted(provider.requests) == [["eth_call"] * 2, ["eth_call"] * 3]
+
+    def test_coalesce(self):
+        """Calls made within the window share a batch and identical calls a single result"""
+        provider = AsyncBatchingProvider()
+        batcher = RpcBatcher(AsyncWeb3(provider), window=0.01)
+
+        async def call():
+            return await asyncio.gather(
+                batcher.call(contract(1).functions.getRoundData(1)),
+                batcher.call(contract(1).functions.getRoundData(2)),
+                batcher.call(contract(1).functions.getRoundData(1)),
+                batcher.call(contract(2).functions.getRoundData(1)),
+            )
+
+        assert asyncio.run(call()) == [2, 3, 2, 3]
+        assert provider.requests == [["eth_call"] * 3]
+
+    def test_fallback(self):
+        provider = AsyncBatchingProvider(supports_batch=False)
+        batcher = RpcBatcher(AsyncWeb3(provider))
+        assert asyncio.run(batcher.call_all([contract(1).functions.decimals(), contract(2).functions.decimals()])) == [1, 2]
+        assert provider.requests == [["eth_call"], ["eth_call"]]
+
+    def test_immutable(self):
+        """Immutable results are cached until the oracle changes them"""
+        provider = AsyncBatchingProvider()
+        batcher = RpcBatcher(AsyncWeb3(provider))
+
+        async def call():
+            return [
+                await batcher.call(contract(1).functions.decimals()),
+                await batcher.call(contract(1).functions.decimals()),
+                await batcher.call(contract(1).functions.getRoundData(1)),
+                await batcher.call(contract(1).functions.getRoundData(1)),
+            ]
+
+        assert asyncio.run(call()) == [1, 1, 2, 2]
+        assert provider.requests == [["eth_call"]] * 3
+
+        batcher.forget(contract(1).address)
+        asyncio.run(batcher.call(contract(1).functions.decimals()))
+        assert len(provider.requests) == 4
+
+
+if __name__ == '__main__':
+    unittest.main()
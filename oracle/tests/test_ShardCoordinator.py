@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from ..src.HashRing import HashRing
+from ..src.RoflUtility import RoflUtility
+from ..src.ShardCoordinator import CoordinatorLink, ShardCoordinator
+from ..src.TxSubmitter import TxSubmitter
+
+
+class FakeRoflUtility(RoflUtility):
+    """Signs locally and includes transactions after a delay"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.sent = []
+
+    async def fetch_nonce_async(self) -> int | None:
+        return 7
+
+    async def submit_tx_async(self, tx):
+        self.sent.append(dict(tx))
+        await asyncio.sleep(self.delay)
+        return {"tx_receipt": {"status": 1, "gasUsed": 21000}}
+
+
+def submitting_worker(worker, connection, pairs, failing):
+    """Submits a transaction for each of its pairs, including the ones taken over, and exits if it is failing"""
+    async def run():
+        link = CoordinatorLink(connection)
+        link.start()
+
+        async def own(names):
+            results = await asyncio.gather(*(link.submit({"data": name, "worker": worker}) for name in names))
+            assert all(result.result["tx_receipt"]["status"] == 1 for result in results)
+        link.on_assign = own
+
+        await own(pairs)
+        if worker != failing:
+            await link.closed
+
+    asyncio.run(run())
+    if worker == failing:
+        exit(5)
+
+
+class TestShardCoordinator(unittest.TestCase):
+    def test_shards(self):
+        """Transactions of all workers share a nonce sequence, and the pairs of a dead worker are taken over"""
+        pairs = [f"bitstamp.net/t{i}/usd" for i in range(12)]
+        failing = HashRing(range(3)).node(pairs[0])
+        rofl_utility = FakeRoflUtility(delay=0.05)
+
+        async def run():
+            coordinator = ShardCoordinator(TxSubmitter(rofl_utility), pairs, 3, submitting_worker, (failing,))
+            initial = {worker: list(owned) for worker, owned in coordinator.assignment.items()}
+            coordinator.start()
+            try:
+                expected = len(pairs) + len(initial[failing])
+                async with asyncio.timeout(60):
+                    while len(rofl_utility.sent) < expected:
+                        await asyncio.sleep(0.1)
+                    # Let the submissions complete.
+                    await asyncio.sleep(0.5)
+            finally:
+                await coordinator.stop()
+            return coordinator, initial
+
+        coordinator, initial = asyncio.run(run())
+        assert len(rofl_utility.sent) == len(pairs) + len(initial[failing])
+        # No nonce is used twice across the workers.
+        assert sorted(tx["nonce"] for tx in rofl_utility.sent) == list(range(7, 7 + len(rofl_utility.sent)))
+
+        assert failing not in coordinator.assignment
+        for worker, owned in coordinator.assignment.items():
+            assert set(initial[worker]) <= set(owned)
+        taken_over = {tx["data"]: tx["worker"] for tx in rofl_utility.sent if tx["worker"] != failing and tx["data"] in initial[failing]}
+        assert sorted(taken_over) == sorted(initial[failing])
+        assert all(pair in coordinator.assignment[worker] for pair, worker in taken_over.items())
+
+
+if __name__ == '__main__':
+    unittest.main()
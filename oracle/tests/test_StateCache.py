@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ..src.ContractUtility import ContractUtility
+from ..src.StateCache import StateCache
+
+DIRECTORY_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+
+
+class TestStateCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "state.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_feeds(self):
+        key = StateCache.feed_key("sapphire-localnet", DIRECTORY_ADDRESS, "rofl1abc", "bitstamp.net/btc/usd")
+        state_cache = StateCache(self.path)
+        state_cache.set_feed(key, "0x" + "11" * 20, 10, "bitstamp.net/btc/usd", 5, 2)
+        state_cache.record_round(key, 7)
+        state_cache.record_round(key, 6)
+        state_cache.save()
+
+        state_cache = StateCache(self.path)
+        assert state_cache.get_feed(key) == {"address": "0x" + "11" * 20, "decimals": 10, "description": "bitstamp.net/btc/usd", "round_id": 7, "version": 2}
+        # Feeds of other deployments are not shared.
+        assert state_cache.get_feed(StateCache.feed_key("sapphire-localnet", DIRECTORY_ADDRESS, "rofl1xyz", "bitstamp.net/btc/usd")) is None
+
+        state_cache.invalidate_feed(key)
+        state_cache.save()
+        assert StateCache(self.path).get_feed(key) is None
+
+    def test_version_mismatch(self):
+        with open(self.path, "w") as file:
+            json.dump({"version": StateCache.VERSION + 1, "feeds": {"a": {}}}, file)
+        assert StateCache(self.path).feeds == {}
+
+    def test_get_contract(self):
+        artifact_path = os.path.join(self.dir.name, "Test.json")
+        with open(artifact_path, "w") as file:
+            json.dump({"abi": [{"type": "constructor"}], "bytecode": {"object": "0x00"}}, file)
+
+        with mock.patch.object(ContractUtility, "artifact_path", return_value=Path(artifact_path)):
+            state_cache = StateCache(self.path)
+            assert state_cache.get_contract("Test") == ([{"type": "constructor"}], "0x00")
+            state_cache.save()
+
+            # Unchanged artifact is served from the cache without parsing it.
+            with mock.patch.object(ContractUtility, "get_contract") as get_contract:
+                assert StateCache(self.path).get_contract("Test") == ([{"type": "constructor"}], "0x00")
+                get_contract.assert_not_called()
+
+            # A rebuilt artifact is parsed again.
+            with open(artifact_path, "w") as file:
+                json.dump({"abi": [], "bytecode": {"object": "0x01"}}, file)
+            os.utime(artifact_path, (0, 0))
+            assert StateCache(self.path).get_contract("Test") == ([], "0x01")
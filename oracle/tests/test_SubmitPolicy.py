@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import unittest
+
+from ..src.SubmitPolicy import SubmitPolicy, load_submit_policies, parse_pair_values
+
+
+class TestSubmitPolicy(unittest.TestCase):
+    def test_every_period(self):
+        policy = SubmitPolicy()
+        policy.record_submission(1000, 0)
+        assert not policy.should_submit(1000, 30, 60, period_due=False)
+        assert policy.should_submit(1000, 60, 60, period_due=True)
+
+    def test_deviation(self):
+        policy = SubmitPolicy(deviation_bps=50)
+        # Nothing submitted yet.
+        assert policy.should_submit(1000, 0, 60, period_due=False)
+        policy.record_submission(10000, 0)
+        assert not policy.should_submit(10049, 60, 60, period_due=True)
+        # Deviation exceeded in the middle of a period.
+        assert policy.should_submit(9950, 90, 60, period_due=False)
+
+    def test_heartbeat(self):
+        policy = SubmitPolicy(deviation_bps=50, heartbeat=300)
+        policy.record_submission(10000, 0)
+        assert not policy.should_submit(10000, 180, 60, period_due=True)
+        # Waiting for the next period would exceed the heartbeat.
+        assert not policy.should_submit(10000, 250, 60, period_due=False)
+        assert policy.should_submit(10000, 250, 60, period_due=True)
+
+    def test_parse_pair_values(self):
+        assert parse_pair_values(None) == (None, {})
+        assert parse_pair_values("50") == (50.0, {})
+        assert parse_pair_values("bitstamp.net/btc/usd=20,50") == (50.0, {"bitstamp.net/btc/usd": 20.0})
+
+    def test_load_submit_policies(self):
+        pairs = ["bitstamp.net/btc/usd", "kraken.com/eth/usd", "composite/btc/usd"]
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, "policy.json")
+            with open(path, "w") as file:
+                json.dump({
+                    "default": {"deviation_bps": 100, "heartbeat": 3600},
+                    "kraken.com/eth/usd": {"deviation_bps": 10},
+                    "composite/btc/usd": {"heartbeat": 600},
+                }, file)
+            policies = load_submit_policies(pairs, "25,composite/btc/usd=5", None, path)
+
+        assert (policies["bitstamp.net/btc/usd"].deviation_bps, policies["bitstamp.net/btc/usd"].heartbeat) == (25, 3600)
+        # The file's per-pair value beats the CLI value for all pairs.
+        assert (policies["kraken.com/eth/usd"].deviation_bps, policies["kraken.com/eth/usd"].heartbeat) == (10, 3600)
+        assert (policies["composite/btc/usd"].deviation_bps, policies["composite/btc/usd"].heartbeat) == (5, 600)
+
+        with self.assertRaises(ValueError):
+            load_submit_policies(pairs, "coinbase.com/btc/usd=5", None, None)
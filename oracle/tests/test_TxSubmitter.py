@@ -0,0 +1,168 @@
+import asyncio
+import httpx
+import unittest
+from web3.exceptions import TimeExhausted
+
+from ..src.RoflUtility import RoflUtility
+from ..src.TxSubmitter import TxSubmitter
+
+
+class FakeRoflUtility(RoflUtility):
+    """Signs locally and includes transactions after a delay, timing out the first attempt of stuck ones"""
+
+    def __init__(self, delay: float, stuck_nonces: set[int] = frozenset()):
+        self.delay = delay
+        self.stuck_nonces = set(stuck_nonces)
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def fetch_nonce_async(self) -> int | None:
+        return 7
+
+    async def submit_tx_async(self, tx):
+        self.sent.append(dict(tx))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if tx["nonce"] in self.stuck_nonces:
+                self.stuck_nonces.remove(tx["nonce"])
+                raise TimeExhausted("stuck")
+            return {"tx_receipt": {"status": 1, "gasUsed": 21000}}
+        finally:
+            self.in_flight -= 1
+
+
+class TestTxSubmitter(unittest.TestCase):
+    def test_pipelined(self):
+        """Transactions are submitted concurrently with consecutive local nonces"""
+        rofl_utility = FakeRoflUtility(delay=0.2)
+
+        async def submit_all():
+            submitter = TxSubmitter(rofl_utility)
+            start = asyncio.get_running_loop().time()
+            results = await asyncio.gather(*(submitter.submit({"gasPrice": 100, "data": "0x"}) for _ in range(10)))
+            elapsed = asyncio.get_running_loop().time() - start
+            await submitter.stop()
+            return results, elapsed
+
+        results, elapsed = asyncio.run(submit_all())
+        assert sorted(r.nonce for r in results) == list(range(7, 17))
+        assert all(r.gas_used == 21000 and r.attempts == 1 for r in results)
+        assert rofl_utility.max_in_flight == 10
+        assert elapsed < 1.0
+
+    def test_replace_by_fee(self):
+        """A stuck transaction is replaced with the same nonce and a higher gas price"""
+        rofl_utility = FakeRoflUtility(delay=0.01, stuck_nonces={7})
+
+        async def submit():
+            submitter = TxSubmitter(rofl_utility)
+            result = await submitter.submit({"gasPrice": 100, "data": "0x"})
+            await submitter.stop()
+            return result
+
+        result = asyncio.run(submit())
+        assert result.attempts == 2
+        assert [(tx["nonce"], tx["gasPrice"]) for tx in rofl_utility.sent] == [(7, 100), (7, 113)]
+
+    def test_failure(self):
+        class FailingRoflUtility(RoflUtility):
+            async def submit_tx_async(self, tx):
+                raise RuntimeError("rejected")
+
+        async def submit():
+            submitter = TxSubmitter(FailingRoflUtility(), max_attempts=2, retry_delay=0)
+            try:
+                return await submitter.submit({"data": "0x"})
+            finally:
+                await submitter.stop()
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(submit())
+
+    def test_retry_not_sent(self):
+        """Failures are only retried if the transaction surely wasn't broadcast"""
+        class TimeoutRoflUtility(FakeRoflUtility):
+            def __init__(self, broadcast: bool):
+                super().__init__(delay=0)
+                self.broadcast = broadcast
+                self.pending_nonce = 7
+
+            async def fetch_nonce_async(self) -> int | None:
+                return self.pending_nonce
+
+            async def submit_tx_async(self, tx):
+                self.sent.append(dict(tx))
+                if len(self.sent) == 1:
+                    if self.broadcast:
+                        self.pending_nonce += 1
+                    raise httpx.ReadTimeout("timed out")
+                return {"tx_receipt": {"status": 1, "gasUsed": 21000}}
+
+        async def submit(rofl_utility):
+            submitter = TxSubmitter(rofl_utility, retry_delay=0)
+            try:
+                return await submitter.submit({"data": "0x"})
+            finally:
+                await submitter.stop()
+
+        rofl_utility = TimeoutRoflUtility(broadcast=False)
+        assert asyncio.run(submit(rofl_utility)).attempts == 2
+        assert [tx["nonce"] for tx in rofl_utility.sent] == [7, 7]
+
+        rofl_utility = TimeoutRoflUtility(broadcast=True)
+        with self.assertRaises(httpx.ReadTimeout):
+            asyncio.run(submit(rofl_utility))
+        assert len(rofl_utility.sent) == 1
+
+    def test_resync_nonce(self):
+        """The nonce is re-read after a failure only once no reserved nonce is outstanding"""
+        class FailFirstRoflUtility(FakeRoflUtility):
+            def __init__(self):
+                super().__init__(delay=0.05)
+                self.nonce_reads = 0
+
+            async def fetch_nonce_async(self) -> int | None:
+                self.nonce_reads += 1
+                return 7
+
+            async def submit_tx_async(self, tx):
+                if not self.sent:
+                    self.sent.append(dict(tx))
+                    await asyncio.sleep(0.01)
+                    raise RuntimeError("rejected")
+                return await super().submit_tx_async(tx)
+
+        rofl_utility = FailFirstRoflUtility()
+
+        async def submit():
+            submitter = TxSubmitter(rofl_utility, max_attempts=1)
+            first, second = submitter.submit({"data": "0x"}), submitter.submit({"data": "0x"})
+            with self.assertRaises(RuntimeError):
+                await first
+            # Nonce 8 is still in flight, so the next transaction continues the sequence.
+            third = await submitter.submit({"data": "0x"})
+            await second
+            fourth = await submitter.submit({"data": "0x"})
+            await submitter.stop()
+            return third, fourth
+
+        third, fourth = asyncio.run(submit())
+        assert third.nonce == 9
+        assert rofl_utility.nonce_reads == 2
+        assert fourth.nonce == 7
+
+    def test_stop(self):
+        """Queued and in-flight transactions are cancelled on stop"""
+        rofl_utility = FakeRoflUtility(delay=10)
+
+        async def submit():
+            submitter = TxSubmitter(rofl_utility, max_in_flight=1)
+            futures = [submitter.submit({"data": "0x"}) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            await submitter.stop()
+            return futures
+
+        assert all(future.cancelled() for future in asyncio.run(submit()))